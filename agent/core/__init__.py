@@ -0,0 +1,56 @@
+"""Agent core: session state, decision rules, tool execution and the ReAct agent.
+
+Attributes are resolved lazily (PEP 562): state and rules load without LangChain;
+``StudyBuddyAgent`` / ``ToolExecutor`` pull in the tools on first access.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from agent.core.agent import StudyBuddyAgent
+    from agent.core.agent_base import AgentBase
+    from agent.core.decision_rules import DecisionRules
+    from agent.core.quiz_workflow import QuizWorkflow
+    from agent.core.retry_manager import RetryManager
+    from agent.core.state import ConceptProgress, ConceptStatus, DifficultyLevel, StudySessionState
+    from agent.core.tool_executor import ToolExecutor
+
+_LAZY_ATTRS = {
+    "StudyBuddyAgent": "agent.core.agent",
+    "AgentBase": "agent.core.agent_base",
+    "DecisionRules": "agent.core.decision_rules",
+    "QuizWorkflow": "agent.core.quiz_workflow",
+    "RetryManager": "agent.core.retry_manager",
+    "ConceptProgress": "agent.core.state",
+    "ConceptStatus": "agent.core.state",
+    "DifficultyLevel": "agent.core.state",
+    "StudySessionState": "agent.core.state",
+    "ToolExecutor": "agent.core.tool_executor",
+}
+
+__all__ = [
+    "AgentBase",
+    "ConceptProgress",
+    "ConceptStatus",
+    "DecisionRules",
+    "DifficultyLevel",
+    "QuizWorkflow",
+    "RetryManager",
+    "StudyBuddyAgent",
+    "StudySessionState",
+    "ToolExecutor",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
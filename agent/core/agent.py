@@ -1,19 +1,23 @@
 import uuid
-from typing import Any, Dict, List, Optional, Union
-
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 from agent.chains.decision_chain import create_step_chain
 from agent.core.decision_rules import DecisionRules
 from agent.core.state import DifficultyLevel, StudySessionState
 from agent.core.tool_executor import ToolExecutor
 
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+    from langchain_openai import ChatOpenAI
+
+    from agent.utils.fake_llm import FakeChatModel
+    from agent.utils.llm_client import DirectChatClient
+
 
 class StudyBuddyAgent:
     def __init__(
         self,
-        llm: Optional[Union[ChatGroq, ChatOpenAI]] = None,
+        llm: Optional[Union["ChatGroq", "ChatOpenAI", "FakeChatModel", "DirectChatClient"]] = None,
         session_state: Optional[StudySessionState] = None,
         topic: Optional[str] = None,
         max_iterations: int = 50,
@@ -1,9 +1,7 @@
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import BaseTool
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
 
 from agent.core.state import StudySessionState
 from agent.tools.adapter_tool import adapt_difficulty
@@ -12,11 +10,18 @@ from agent.tools.planner_tool import plan_learning_path
 from agent.tools.quizzer_tool import generate_quiz
 from agent.tools.teacher_tool import teach_concept
 
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+    from langchain_openai import ChatOpenAI
+
+    from agent.utils.fake_llm import FakeChatModel
+    from agent.utils.llm_client import DirectChatClient
+
 
 class ToolExecutor:
     def __init__(
         self,
-        llm: Union[ChatGroq, ChatOpenAI],
+        llm: Union["ChatGroq", "ChatOpenAI", "FakeChatModel", "DirectChatClient"],
         state: Optional[StudySessionState] = None,
     ):
         self.llm = llm
@@ -0,0 +1,52 @@
+"""LangChain tools used by the agent and the web API.
+
+Attributes are resolved lazily (PEP 562): ``from agent.tools import evaluate_response``
+loads only the evaluator module, not the LLM-backed tools.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from agent.tools.adapter_tool import adapt_difficulty
+    from agent.tools.evaluator_tool import evaluate_response
+    from agent.tools.planner_tool import aplan_learning_path, plan_learning_path
+    from agent.tools.quizzer_tool import agenerate_quiz, generate_quiz
+    from agent.tools.teacher_tool import ateach_concept_payload, teach_concept, teach_concept_payload
+
+_LAZY_ATTRS = {
+    "adapt_difficulty": "agent.tools.adapter_tool",
+    "evaluate_response": "agent.tools.evaluator_tool",
+    "plan_learning_path": "agent.tools.planner_tool",
+    "aplan_learning_path": "agent.tools.planner_tool",
+    "generate_quiz": "agent.tools.quizzer_tool",
+    "agenerate_quiz": "agent.tools.quizzer_tool",
+    "teach_concept": "agent.tools.teacher_tool",
+    "teach_concept_payload": "agent.tools.teacher_tool",
+    "ateach_concept_payload": "agent.tools.teacher_tool",
+}
+
+__all__ = [
+    "adapt_difficulty",
+    "agenerate_quiz",
+    "aplan_learning_path",
+    "ateach_concept_payload",
+    "evaluate_response",
+    "generate_quiz",
+    "plan_learning_path",
+    "teach_concept",
+    "teach_concept_payload",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
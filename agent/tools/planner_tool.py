@@ -1,9 +1,11 @@
-from typing import List
+from typing import Any, List
 
 from langchain_core.tools import tool
 
 from agent.core.state import DifficultyLevel
-from agent.utils.llm_client import call_with_retry, get_llm_client
+from agent.tools.prompt_layout import material_prefix
+from agent.utils.deadline import DeadlineExceededError
+from agent.utils.llm_client import async_call_with_retry, call_with_retry, generation_budget, get_llm_client
 
 
 @tool
@@ -45,12 +47,60 @@ def plan_learning_path(
         ]
     """
     llm = get_llm_client()
+    prompt = _build_plan_prompt(topic, difficulty_level, max_concepts, source_material)
 
+    try:
+        response = call_with_retry(
+            llm.invoke,
+            prompt,
+            tool="plan_learning_path",
+            difficulty=difficulty_level,
+            **_plan_budget(max_concepts),
+        )
+    except Exception as exc:
+        return _plan_error(exc, topic, difficulty_level)
+
+    return _parse_plan_response(str(response.content), difficulty_level, max_concepts)
+
+
+async def aplan_learning_path(
+    topic: str,
+    difficulty_level: str = "beginner",
+    max_concepts: int = 10,
+    source_material: str = "",
+) -> List[dict]:
+    """Async variant of :func:`plan_learning_path` built on ``llm.ainvoke``."""
+    llm = get_llm_client()
+    prompt = _build_plan_prompt(topic, difficulty_level, max_concepts, source_material)
+
+    try:
+        response = await async_call_with_retry(
+            llm.ainvoke,
+            prompt,
+            tool="plan_learning_path",
+            difficulty=difficulty_level,
+            **_plan_budget(max_concepts),
+        )
+    except Exception as exc:
+        return _plan_error(exc, topic, difficulty_level)
+
+    return _parse_plan_response(str(response.content), difficulty_level, max_concepts)
+
+
+def _plan_budget(max_concepts: int) -> dict[str, Any]:
+    """Token cap scaled to *max_concepts*, and a stop at the first line past the last wanted concept."""
+    budget = generation_budget("plan_learning_path", items=max_concepts)
+    budget["stop"] = [*budget.get("stop", []), f"\n{max_concepts + 1}."]
+    return budget
+
+
+def _build_plan_prompt(
+    topic: str,
+    difficulty_level: str,
+    max_concepts: int,
+    source_material: str,
+) -> str:
     if source_material.strip():
-        material_section = f"""
---- BEGIN UPLOADED STUDY MATERIAL ---
-{source_material[:3000]}
---- END UPLOADED STUDY MATERIAL ---"""
         source_instruction = f"""
 You are building a learning path STRICTLY from the uploaded material above.
 
@@ -66,7 +116,6 @@ Rules:
 - Overall difficulty level: {difficulty_level}
 """
     else:
-        material_section = ""
         source_instruction = f"""
 Break down the topic "{topic}" into up to {max_concepts} key concepts.
 
@@ -77,8 +126,7 @@ Requirements:
 - Each concept should be specific and focused
 """
 
-    prompt = f"""Task: produce a numbered learning-path list.
-{material_section}
+    return f"""{material_prefix(source_material)}Task: produce a numbered learning-path list.
 {source_instruction}
 Return ONLY a numbered list of concept names, one per line. No explanations, no headers.
 Format:
@@ -86,12 +134,14 @@ Format:
 2. Concept Name
 ..."""
 
-    try:
-        response = call_with_retry(llm.invoke, prompt)
-    except Exception as exc:
-        return [{"error": str(exc), "error_code": "llm_error", "concept_name": topic, "difficulty": difficulty_level, "order": 1}]
 
-    content = str(response.content).strip()
+def _plan_error(exc: Exception, topic: str, difficulty_level: str) -> List[dict[str, Any]]:
+    error_code = "deadline_exceeded" if isinstance(exc, DeadlineExceededError) else "llm_error"
+    return [{"error": str(exc), "error_code": error_code, "concept_name": topic, "difficulty": difficulty_level, "order": 1}]
+
+
+def _parse_plan_response(raw: str, difficulty_level: str, max_concepts: int) -> List[dict[str, Any]]:
+    content = raw.strip()
     
     concepts = []
     lines = content.split('\n')
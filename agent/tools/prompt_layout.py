@@ -0,0 +1,25 @@
+"""
+Prompt Layout
+
+Shared layout for the planner, teacher and quizzer prompts. Uploaded material
+goes first, in one fixed block that is byte-identical for every call on the
+same document, and the per-call instructions (concept, difficulty, retry hints)
+follow it. Providers that cache prompt prefixes (OpenAI, Groq, vLLM with prefix
+caching) can then reuse the expensive part of the prompt across every plan,
+lesson and quiz in a session; cached-token counts appear in
+``llm_cached_prompt_tokens`` on ``GET /metrics``.
+"""
+
+# Callers that pre-truncate material (``SessionState.get_content_context``) should
+# use the same budget, so every tool sees the same text.
+MATERIAL_CONTEXT_CHARS = 4000
+
+_MATERIAL_HEADER = "--- BEGIN UPLOADED STUDY MATERIAL ---"
+_MATERIAL_FOOTER = "--- END UPLOADED STUDY MATERIAL ---"
+
+
+def material_prefix(source_material: str) -> str:
+    """Cache-friendly prompt prefix holding the uploaded material ('' when there is none)."""
+    if not source_material.strip():
+        return ""
+    return f"{_MATERIAL_HEADER}\n{source_material[:MATERIAL_CONTEXT_CHARS]}\n{_MATERIAL_FOOTER}\n\n"
@@ -1,9 +1,12 @@
+import json
 import random
 from typing import Any, Dict
 
 from langchain_core.tools import tool
 
-from agent.utils.llm_client import call_with_retry, get_llm_client
+from agent.tools.prompt_layout import material_prefix
+from agent.utils.deadline import DeadlineExceededError
+from agent.utils.llm_client import async_call_with_retry, call_with_retry, generation_budget, get_llm_client
 
 
 def _shuffle_mc_options(question: dict[str, Any]) -> None:
@@ -40,7 +43,107 @@ def generate_quiz(
             questions MUST be grounded in this content, not general knowledge.
     """
     llm = get_llm_client()
-    
+    prompt = _build_quiz_prompt(concept_name, difficulty_level, num_questions, source_material)
+
+    try:
+        response = call_with_retry(
+            llm.invoke,
+            prompt,
+            tool="generate_quiz",
+            difficulty=difficulty_level,
+            **generation_budget("generate_quiz", items=num_questions),
+        )
+    except Exception as exc:
+        return _quiz_llm_error(exc, concept_name, difficulty_level)
+
+    last_raw = str(response.content).strip()
+    valid_questions = _extract_valid_mc_questions(last_raw)
+
+    if len(valid_questions) < num_questions:
+        # Try up to two stricter regeneration attempts if model returned invalid question shapes.
+        # These must be fresh completions, so they bypass the response cache.
+        strict_prompt = _strict_quiz_prompt(prompt)
+        for strict_attempt in (1, 2):
+            try:
+                retry_response = call_with_retry(
+                    llm.invoke,
+                    strict_prompt,
+                    max_attempts=2,
+                    cache=False,
+                    tool="generate_quiz",
+                    difficulty=difficulty_level,
+                    retry_attempt=strict_attempt,
+                    **generation_budget("generate_quiz", items=num_questions),
+                )
+                last_raw = str(retry_response.content).strip()
+                retry_questions = _extract_valid_mc_questions(last_raw)
+                if len(retry_questions) >= len(valid_questions):
+                    valid_questions = retry_questions
+                if len(valid_questions) >= num_questions:
+                    break
+            except Exception:
+                break
+
+    return _quiz_result(concept_name, difficulty_level, num_questions, valid_questions, last_raw)
+
+
+async def agenerate_quiz(
+    concept_name: str,
+    difficulty_level: str = "beginner",
+    num_questions: int = 3,
+    question_types: str = "multiple_choice",
+    source_material: str = "",
+) -> Dict[str, Any]:
+    """Async variant of :func:`generate_quiz` built on ``llm.ainvoke``."""
+    llm = get_llm_client()
+    prompt = _build_quiz_prompt(concept_name, difficulty_level, num_questions, source_material)
+
+    try:
+        response = await async_call_with_retry(
+            llm.ainvoke,
+            prompt,
+            tool="generate_quiz",
+            difficulty=difficulty_level,
+            **generation_budget("generate_quiz", items=num_questions),
+        )
+    except Exception as exc:
+        return _quiz_llm_error(exc, concept_name, difficulty_level)
+
+    last_raw = str(response.content).strip()
+    valid_questions = _extract_valid_mc_questions(last_raw)
+
+    if len(valid_questions) < num_questions:
+        strict_prompt = _strict_quiz_prompt(prompt)
+        for strict_attempt in (1, 2):
+            try:
+                retry_response = await async_call_with_retry(
+                    llm.ainvoke,
+                    strict_prompt,
+                    max_attempts=2,
+                    cache=False,
+                    tool="generate_quiz",
+                    difficulty=difficulty_level,
+                    retry_attempt=strict_attempt,
+                    **generation_budget("generate_quiz", items=num_questions),
+                )
+                last_raw = str(retry_response.content).strip()
+                retry_questions = _extract_valid_mc_questions(last_raw)
+                if len(retry_questions) >= len(valid_questions):
+                    valid_questions = retry_questions
+                if len(valid_questions) >= num_questions:
+                    break
+            except Exception:
+                break
+
+    return _quiz_result(concept_name, difficulty_level, num_questions, valid_questions, last_raw)
+
+
+def _build_quiz_prompt(
+    concept_name: str,
+    difficulty_level: str,
+    num_questions: int,
+    source_material: str,
+) -> str:
     difficulty_guide = {
         "beginner": {
             "complexity": "simple, fundamental questions",
@@ -61,19 +164,15 @@ def generate_quiz(
     
     guide = difficulty_guide.get(difficulty_level.lower(), difficulty_guide["beginner"])
 
-    material_block = ""
+    grounding = ""
     if source_material.strip():
-        material_block = f"""
---- BEGIN UPLOADED STUDY MATERIAL ---
-{source_material[:4000]}
---- END UPLOADED STUDY MATERIAL ---
-
+        grounding = """
 IMPORTANT: Every question MUST be based strictly on the study material above.
 Do NOT use general knowledge. Only ask about content present in the material.
 """
 
-    prompt = f"""Create a quiz with {num_questions} questions about "{concept_name}" at {difficulty_level} level.
-{material_block}
+    return f"""{material_prefix(source_material)}Create a quiz with {num_questions} questions about "{concept_name}" at {difficulty_level} level.
+{grounding}
 
 Difficulty Level Guidelines:
 - Question Complexity: {guide['complexity']}
@@ -119,84 +218,80 @@ Return the quiz in this EXACT JSON format:
 IMPORTANT: correct_answer for multiple_choice MUST be the exact full text of one of the options, never a letter.
 Return ONLY valid JSON, no additional text before or after."""
 
-    def _extract_valid_mc_questions(raw: str) -> list[dict[str, Any]]:
-        import json
 
-        json_start = raw.find("{")
-        json_end = raw.rfind("}") + 1
-        if json_start == -1 or json_end <= json_start:
-            return []
-        parsed = json.loads(raw[json_start:json_end])
-        questions = parsed.get("questions") or []
-        valid_questions: list[dict[str, Any]] = []
-
-        for question in questions:
-            options = question.get("options")
-            correct_answer = question.get("correct_answer")
-            if question.get("question_type") != "multiple_choice":
-                continue
-            if not isinstance(options, list) or len(options) != 4:
-                continue
-            if any(not isinstance(option, str) or not option.strip() for option in options):
-                continue
-            normalized_options = [option.strip() for option in options]
-            if not isinstance(correct_answer, str) or correct_answer.strip() not in normalized_options:
-                continue
-
-            q_out = {
-                "question_number": len(valid_questions) + 1,
-                "question_type": "multiple_choice",
-                "question": str(question.get("question", "")).strip(),
-                "options": normalized_options,
-                "correct_answer": correct_answer.strip(),
-                "explanation": str(question.get("explanation", "")).strip(),
-            }
-            _shuffle_mc_options(q_out)
-            valid_questions.append(q_out)
-
-        return valid_questions
+def _strict_quiz_prompt(prompt: str) -> str:
+    return (
+        prompt
+        + "\n\nCRITICAL VALIDATION RULES:"
+        + "\n- Output ONLY multiple_choice questions"
+        + "\n- Each question MUST include exactly 4 non-empty string options"
+        + "\n- correct_answer MUST exactly match one option"
+        + "\n- Do not output null options"
+    )
 
+
+def _extract_valid_mc_questions(raw: str) -> list[dict[str, Any]]:
+    json_start = raw.find("{")
+    json_end = raw.rfind("}") + 1
+    if json_start == -1 or json_end <= json_start:
+        return []
     try:
-        response = call_with_retry(llm.invoke, prompt)
-    except Exception as exc:
-        error_msg = str(exc)
-        error_code = "rate_limit" if any(s in error_msg.lower() for s in ("rate limit", "429", "ratelimit")) else "llm_error"
-        return {
-            "concept_name": concept_name,
-            "difficulty_level": difficulty_level,
-            "questions": [],
-            "total_questions": 0,
-            "error": error_msg,
-            "error_code": error_code,
+        parsed = json.loads(raw[json_start:json_end])
+    except json.JSONDecodeError:
+        # Usually a completion cut off at its token budget; the caller retries with the strict prompt.
+        return []
+    questions = parsed.get("questions") or []
+    valid_questions: list[dict[str, Any]] = []
+
+    for question in questions:
+        options = question.get("options")
+        correct_answer = question.get("correct_answer")
+        if question.get("question_type") != "multiple_choice":
+            continue
+        if not isinstance(options, list) or len(options) != 4:
+            continue
+        if any(not isinstance(option, str) or not option.strip() for option in options):
+            continue
+        normalized_options = [option.strip() for option in options]
+        if not isinstance(correct_answer, str) or correct_answer.strip() not in normalized_options:
+            continue
+
+        q_out = {
+            "question_number": len(valid_questions) + 1,
+            "question_type": "multiple_choice",
+            "question": str(question.get("question", "")).strip(),
+            "options": normalized_options,
+            "correct_answer": correct_answer.strip(),
+            "explanation": str(question.get("explanation", "")).strip(),
         }
+        _shuffle_mc_options(q_out)
+        valid_questions.append(q_out)
 
-    content = str(response.content).strip()
-    last_raw = content
-    valid_questions = _extract_valid_mc_questions(content)
+    return valid_questions
 
-    if len(valid_questions) < num_questions:
-        # Try up to two stricter regeneration attempts if model returned invalid question shapes
-        strict_prompt = (
-            prompt
-            + "\n\nCRITICAL VALIDATION RULES:"
-            + "\n- Output ONLY multiple_choice questions"
-            + "\n- Each question MUST include exactly 4 non-empty string options"
-            + "\n- correct_answer MUST exactly match one option"
-            + "\n- Do not output null options"
-        )
-        for _ in range(2):
-            try:
-                retry_response = call_with_retry(llm.invoke, strict_prompt, max_attempts=2)
-                retry_content = str(retry_response.content).strip()
-                last_raw = retry_content
-                retry_questions = _extract_valid_mc_questions(retry_content)
-                if len(retry_questions) >= len(valid_questions):
-                    valid_questions = retry_questions
-                if len(valid_questions) >= num_questions:
-                    break
-            except Exception:
-                break
 
+def _quiz_llm_error(exc: Exception, concept_name: str, difficulty_level: str) -> Dict[str, Any]:
+    error_msg = str(exc)
+    error_code = "rate_limit" if any(s in error_msg.lower() for s in ("rate limit", "429", "ratelimit")) else "llm_error"
+    if isinstance(exc, DeadlineExceededError):
+        error_code = "deadline_exceeded"
+    return {
+        "concept_name": concept_name,
+        "difficulty_level": difficulty_level,
+        "questions": [],
+        "total_questions": 0,
+        "error": error_msg,
+        "error_code": error_code,
+    }
+
+
+def _quiz_result(
+    concept_name: str,
+    difficulty_level: str,
+    num_questions: int,
+    valid_questions: list[dict[str, Any]],
+    last_raw: str,
+) -> Dict[str, Any]:
     if valid_questions:
         final_questions = valid_questions[:num_questions]
         return {
@@ -215,4 +310,3 @@ Return ONLY valid JSON, no additional text before or after."""
         "error_code": "invalid_quiz_format",
         "raw_response": last_raw[:500],
     }
-
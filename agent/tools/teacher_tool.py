@@ -6,7 +6,9 @@ from typing import Any, Optional, cast
 
 from langchain_core.tools import tool
 
-from agent.utils.llm_client import call_with_retry, get_llm_client
+from agent.tools.prompt_layout import material_prefix
+from agent.utils.deadline import DeadlineExceededError
+from agent.utils.llm_client import async_call_with_retry, call_with_retry, get_llm_client
 
 # Average adult reading speed for explanatory prose (words per minute)
 _TEACH_READ_WPM = 200
@@ -190,13 +192,9 @@ def _build_teach_prompt(
 
     guide = difficulty_guide.get(difficulty_level.lower(), difficulty_guide["beginner"])
 
-    material_block = ""
+    grounding = ""
     if source_material.strip():
-        material_block = f"""
---- BEGIN USER-UPLOADED STUDY MATERIAL ---
-{source_material[:3000]}
---- END USER-UPLOADED STUDY MATERIAL ---
-
+        grounding = """
 IMPORTANT: Base your explanation primarily on the study material above.
 Use the material's own examples, terminology, and structure where possible.
 """
@@ -238,7 +236,7 @@ Use the material's own examples, terminology, and structure where possible.
 
     ctx_line = f"Context from the learner or prior steps: {context}\n" if context else ""
 
-    return f"""Create a clear lesson for the concept "{concept_name}" at {difficulty_level} level.
+    return f"""{material_prefix(source_material)}Create a clear lesson for the concept "{concept_name}" at {difficulty_level} level.
 
 Difficulty Level Guidelines:
 - Vocabulary: {guide["vocabulary"]}
@@ -246,7 +244,7 @@ Difficulty Level Guidelines:
 - Depth: {guide["depth"]}
 - Technical Terms: {guide["technical_terms"]}
 
-{ctx_line}{material_block}{retry_instructions}
+{ctx_line}{grounding}{retry_instructions}
 
 Respond with ONLY a valid JSON object (no markdown code fences, no commentary before or after). Use exactly these keys:
 - "explanation": one string containing GitHub-flavored Markdown. Structure with ## headings such as Introduction, Core Explanation, and Examples. Match depth to {difficulty_level}.
@@ -283,19 +281,66 @@ def teach_concept_payload(
     )
 
     try:
-        response = call_with_retry(llm.invoke, prompt)
+        response = call_with_retry(
+            llm.invoke,
+            prompt,
+            tool="teach_concept",
+            difficulty=difficulty_level,
+            retry_attempt=retry_attempt or 0,
+        )
+    except Exception as exc:
+        return _teach_error(exc)
+
+    return _teach_result(str(response.content))
+
+
+async def ateach_concept_payload(
+    concept_name: str,
+    difficulty_level: str = "beginner",
+    context: str = "",
+    retry_attempt: Optional[int] = None,
+    alternative_strategy: Optional[str] = None,
+    source_material: str = "",
+) -> dict[str, Any]:
+    """Async variant of :func:`teach_concept_payload` built on ``llm.ainvoke``."""
+    llm = get_llm_client()
+    prompt = _build_teach_prompt(
+        concept_name,
+        difficulty_level,
+        context,
+        source_material,
+        retry_attempt,
+        alternative_strategy,
+    )
+
+    try:
+        response = await async_call_with_retry(
+            llm.ainvoke,
+            prompt,
+            tool="teach_concept",
+            difficulty=difficulty_level,
+            retry_attempt=retry_attempt or 0,
+        )
     except Exception as exc:
-        error_msg = str(exc)
-        if any(s in error_msg.lower() for s in ("rate limit", "429", "ratelimit")):
-            return {"error": "[error:rate_limit] The LLM is currently rate-limited. Please wait a moment and try again."}
-        return {"error": f"[error:llm_error] Could not generate explanation: {error_msg}"}
+        return _teach_error(exc)
+
+    return _teach_result(str(response.content))
+
 
-    content = str(response.content).strip()
+def _teach_error(exc: Exception) -> dict[str, Any]:
+    error_msg = str(exc)
+    if isinstance(exc, DeadlineExceededError):
+        return {"error": "[error:deadline_exceeded] The lesson could not be generated before the request deadline."}
+    if any(s in error_msg.lower() for s in ("rate limit", "429", "ratelimit")):
+        return {"error": "[error:rate_limit] The LLM is currently rate-limited. Please wait a moment and try again."}
+    return {"error": f"[error:llm_error] Could not generate explanation: {error_msg}"}
+
+
+def _teach_result(raw: str) -> dict[str, Any]:
+    content = raw.strip()
     if content.startswith("[error:"):
         return {"error": content}
-
-    parsed = _parse_teach_json_response(content)
-    return parsed
+    return _parse_teach_json_response(content)
 
 
 @tool
@@ -1,14 +1,37 @@
-from agent.utils.content_loader import (
-    ContentSection,
-    LoadedContent,
-    SUPPORTED_EXTENSIONS,
-    load_content,
-    load_json_file,
-    load_markdown_file,
-    load_pdf_file,
-    load_text_file,
-)
-from agent.utils.llm_client import get_llm_client, initialize_llm
+"""Utilities: content loading and LLM client helpers.
+
+Attributes are resolved lazily (PEP 562) so importing ``agent.utils`` — or only
+``load_content`` — does not pull in LangChain, httpx or the provider SDKs.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from agent.utils.content_loader import (
+        SUPPORTED_EXTENSIONS,
+        ContentSection,
+        LoadedContent,
+        load_content,
+        load_json_file,
+        load_markdown_file,
+        load_pdf_file,
+        load_text_file,
+    )
+    from agent.utils.llm_client import get_llm_client, initialize_llm
+
+_LAZY_ATTRS = {
+    "ContentSection": "agent.utils.content_loader",
+    "LoadedContent": "agent.utils.content_loader",
+    "SUPPORTED_EXTENSIONS": "agent.utils.content_loader",
+    "load_content": "agent.utils.content_loader",
+    "load_json_file": "agent.utils.content_loader",
+    "load_markdown_file": "agent.utils.content_loader",
+    "load_pdf_file": "agent.utils.content_loader",
+    "load_text_file": "agent.utils.content_loader",
+    "get_llm_client": "agent.utils.llm_client",
+    "initialize_llm": "agent.utils.llm_client",
+}
 
 __all__ = [
     "ContentSection",
@@ -22,3 +45,16 @@ __all__ = [
     "load_pdf_file",
     "load_text_file",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
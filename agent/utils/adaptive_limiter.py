@@ -0,0 +1,321 @@
+"""
+Adaptive Concurrency Limiter
+
+AIMD (additive-increase / multiplicative-decrease) in-flight limits for outbound
+LLM calls, one window per (provider, model). Healthy completions grow the window
+by about one slot per window's worth of calls; a 429/503 or a latency spike well
+above the smoothed baseline shrinks it by a constant factor. Callers beyond the
+window — threads and coroutines alike — queue for up to ``queue_timeout``
+seconds before :class:`ConcurrencyLimitError` is raised, and are admitted by
+priority class and weighted fair share across tenants and sessions
+(:mod:`agent.utils.fair_scheduler`).
+
+Opt-in with ``LLM_CONCURRENCY_ENABLED``. The window starts at the provider's
+HTTP connection-pool size (``LLM_HTTP_MAX_CONNECTIONS``), the concurrency the
+deployment already allowed, unless ``LLM_CONCURRENCY_INITIAL`` is set. With
+adaptation off but scheduling on (``LLM_SCHED_ENABLED``, the default) the window
+is kept fixed at that size, so queued calls are still admitted fairly.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Optional, Union
+
+from agent.utils.fair_scheduler import FairQueue, Flow, SchedulerSettings, observe_wait
+from agent.utils.llm_metrics import get_metrics
+
+_LABELS = ("provider", "model")
+_LIMIT = get_metrics().gauge("llm_concurrency_limit", "Current adaptive in-flight limit.", _LABELS)
+_IN_FLIGHT = get_metrics().gauge("llm_concurrency_in_flight", "LLM calls holding a concurrency slot.", _LABELS)
+_QUEUE_DEPTH = get_metrics().gauge("llm_concurrency_queue_depth", "Callers waiting for a concurrency slot.", _LABELS)
+_REJECTED = get_metrics().counter(
+    "llm_concurrency_rejected_total", "Callers that timed out waiting for a concurrency slot.", _LABELS
+)
+
+
+class ConcurrencyLimitError(Exception):
+    """Raised when a caller waits longer than ``queue_timeout`` for a slot."""
+
+
+@dataclass(frozen=True)
+class LimiterSettings:
+    enabled: bool = False
+    initial: float = 20.0
+    min_limit: float = 1.0
+    max_limit: float = 64.0
+    backoff: float = 0.5
+    latency_tolerance: float = 2.0
+    queue_timeout: float = 30.0
+    adaptive: bool = True
+
+    @classmethod
+    def from_env(cls, provider: str = "") -> "LimiterSettings":
+        """Read ``LLM_CONCURRENCY_*``; ``LLM_<PROVIDER>_CONCURRENCY_*`` overrides them for one provider."""
+
+        def raw(name: str) -> str:
+            scoped = os.getenv(f"LLM_{provider.upper()}_CONCURRENCY_{name}", "").strip() if provider else ""
+            return scoped or os.getenv(f"LLM_CONCURRENCY_{name}", "").strip()
+
+        def number(name: str, default: float) -> float:
+            try:
+                return float(raw(name) or default)
+            except ValueError:
+                return default
+
+        def pool_size() -> float:
+            scoped = os.getenv(f"LLM_{provider.upper()}_HTTP_MAX_CONNECTIONS", "").strip() if provider else ""
+            try:
+                return float(scoped or os.getenv("LLM_HTTP_MAX_CONNECTIONS", "").strip() or cls.initial)
+            except ValueError:
+                return cls.initial
+
+        initial = number("INITIAL", pool_size())
+        return cls(
+            enabled=raw("ENABLED").lower() in ("1", "true", "yes", "on"),
+            initial=initial,
+            min_limit=max(1.0, number("MIN", 1)),
+            max_limit=number("MAX", max(64.0, initial)),
+            backoff=min(0.95, max(0.1, number("BACKOFF", 0.5))),
+            latency_tolerance=number("LATENCY_TOLERANCE", 2.0),
+            queue_timeout=number("QUEUE_TIMEOUT", 30),
+        )
+
+
+class _Waiter:
+    """A queued caller; :meth:`grant` hands it a slot from whichever thread releases one."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.granted = False
+        self.loop = loop
+        self.event: Union[threading.Event, asyncio.Future[None]]
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.event = loop.create_future()
+
+    def grant(self) -> None:
+        self.granted = True
+        if isinstance(self.event, threading.Event):
+            self.event.set()
+        elif self.loop is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if isinstance(self.event, asyncio.Future) and not self.event.done():
+            self.event.set_result(None)
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        settings: Optional[LimiterSettings] = None,
+        provider: str = "",
+        model: str = "",
+        scheduler: Optional[SchedulerSettings] = None,
+    ) -> None:
+        self.settings = settings or LimiterSettings()
+        self.labels = {"provider": provider, "model": model}
+        scheduler = scheduler or SchedulerSettings()
+        self._lock = threading.Lock()
+        self._limit = min(self.settings.max_limit, max(self.settings.min_limit, self.settings.initial))
+        self._in_flight = 0
+        self._waiters: FairQueue[_Waiter] = FairQueue(
+            scheduler.tenant_weights,
+            fair=scheduler.enabled,
+            idle_seconds=scheduler.idle_seconds,
+            aging_seconds=scheduler.aging_seconds,
+        )
+        self._baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._counters = {"acquired": 0, "queued": 0, "rejected": 0, "increases": 0, "decreases": 0}
+        self._publish_locked()
+
+    @property
+    def limit(self) -> int:
+        with self._lock:
+            return int(self._limit)
+
+    def _publish_locked(self) -> None:
+        _LIMIT.set(int(self._limit), **self.labels)
+        _IN_FLIGHT.set(self._in_flight, **self.labels)
+        _QUEUE_DEPTH.set(len(self._waiters), **self.labels)
+        self._waiters.publish(**self.labels)
+
+    def _try_take_locked(self) -> bool:
+        if not self._waiters and self._in_flight < int(self._limit):
+            self._in_flight += 1
+            self._counters["acquired"] += 1
+            return True
+        return False
+
+    def _grant_waiters_locked(self) -> None:
+        while self._waiters and self._in_flight < int(self._limit):
+            waiter, _ = self._waiters.pop()
+            self._in_flight += 1
+            self._counters["acquired"] += 1
+            waiter.grant()
+
+    def _enqueue_locked(self, waiter: _Waiter, flow: Flow, cost: float) -> None:
+        self._waiters.push(waiter, flow, cost)
+        self._counters["queued"] += 1
+        self._publish_locked()
+
+    def _abandon(self, waiter: _Waiter, waited: float) -> None:
+        """Timeout path: keep a slot granted in the meantime, else leave the queue and raise."""
+        with self._lock:
+            if waiter.granted:
+                return
+            self._waiters.remove(waiter)
+            self._counters["rejected"] += 1
+            _REJECTED.inc(**self.labels)
+            self._publish_locked()
+            limit = int(self._limit)
+        raise ConcurrencyLimitError(
+            f"LLM concurrency limit for {self.labels['provider']}/{self.labels['model']}: "
+            f"queued {waited:.1f}s with {limit} in flight — too many requests"
+        )
+
+    def acquire(self, timeout: Optional[float] = None, flow: Optional[Flow] = None, cost: float = 1.0) -> float:
+        """Block for a slot; return the seconds spent queueing.
+
+        *flow* and *cost* (estimated tokens) decide the caller's place in the queue.
+        """
+        flow = flow or Flow()
+        with self._lock:
+            if self._try_take_locked():
+                self._publish_locked()
+                observe_wait(flow=flow, seconds=0.0, **self.labels)
+                return 0.0
+            waiter = _Waiter()
+            self._enqueue_locked(waiter, flow, cost)
+        started = time.monotonic()
+        assert isinstance(waiter.event, threading.Event)
+        if not waiter.event.wait(self.settings.queue_timeout if timeout is None else timeout):
+            self._abandon(waiter, time.monotonic() - started)
+        waited = time.monotonic() - started
+        observe_wait(flow=flow, seconds=waited, **self.labels)
+        return waited
+
+    async def aacquire(self, timeout: Optional[float] = None, flow: Optional[Flow] = None, cost: float = 1.0) -> float:
+        """Async :meth:`acquire`; the event loop stays free while queued."""
+        loop = asyncio.get_running_loop()
+        flow = flow or Flow()
+        with self._lock:
+            if self._try_take_locked():
+                self._publish_locked()
+                observe_wait(flow=flow, seconds=0.0, **self.labels)
+                return 0.0
+            waiter = _Waiter(loop)
+            self._enqueue_locked(waiter, flow, cost)
+        started = time.monotonic()
+        assert isinstance(waiter.event, asyncio.Future)
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter.event), self.settings.queue_timeout if timeout is None else timeout
+            )
+        except asyncio.TimeoutError:
+            self._abandon(waiter, time.monotonic() - started)
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._in_flight -= 1
+                    self._grant_waiters_locked()
+                else:
+                    self._waiters.remove(waiter)
+                self._publish_locked()
+            raise
+        waited = time.monotonic() - started
+        observe_wait(flow=flow, seconds=waited, **self.labels)
+        return waited
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        """Return a slot and adapt the window from the call's outcome.
+
+        *overloaded* marks a 429/503; *latency* (successful calls only) feeds the
+        smoothed baseline used to detect latency spikes. Leave both unset for
+        outcomes that say nothing about provider capacity. A fixed window
+        (``adaptive=False``) ignores both.
+        """
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if not self.settings.adaptive:
+                latency, overloaded = None, False
+            now = time.monotonic()
+            spike = (
+                latency is not None
+                and self._baseline is not None
+                and latency > self.settings.latency_tolerance * self._baseline
+            )
+            if overloaded or spike:
+                # Several in-flight calls usually fail together; shrink once per baseline interval.
+                if now - self._last_decrease >= (self._baseline or 0.0):
+                    self._limit = max(self.settings.min_limit, self._limit * self.settings.backoff)
+                    self._last_decrease = now
+                    self._counters["decreases"] += 1
+            elif latency is not None:
+                if self._limit < self.settings.max_limit:
+                    self._limit = min(self.settings.max_limit, self._limit + 1.0 / self._limit)
+                    self._counters["increases"] += 1
+            if latency is not None:
+                self._baseline = latency if self._baseline is None else 0.9 * self._baseline + 0.1 * latency
+            self._grant_waiters_locked()
+            self._publish_locked()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": int(self._limit),
+                "adaptive": self.settings.adaptive,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "queues": self._waiters.depths(),
+                "baseline_latency_seconds": round(self._baseline, 3) if self._baseline is not None else None,
+                **self._counters,
+            }
+
+
+class LimiterBoard:
+    """Lazily created adaptive limiters keyed by (provider, model).
+
+    Without explicit *settings*, each provider reads its own from the environment;
+    queue scheduling comes from *scheduler* or ``LLM_SCHED_*``. A provider whose
+    limiter is disabled still gets a fixed window while scheduling is on.
+    """
+
+    def __init__(
+        self, settings: Optional[LimiterSettings] = None, scheduler: Optional[SchedulerSettings] = None
+    ) -> None:
+        self.settings = settings
+        self.scheduler = scheduler or SchedulerSettings.from_env()
+        self._lock = threading.Lock()
+        self._provider_settings: dict[str, LimiterSettings] = {}
+        self._limiters: dict[tuple[str, str], AdaptiveLimiter] = {}
+
+    def _settings_for(self, provider: str) -> LimiterSettings:
+        if self.settings is not None:
+            return self.settings
+        settings = self._provider_settings.get(provider)
+        if settings is None:
+            settings = self._provider_settings[provider] = LimiterSettings.from_env(provider)
+        return settings
+
+    def get(self, provider: str, model: str) -> Optional[AdaptiveLimiter]:
+        with self._lock:
+            settings = self._settings_for(provider)
+            if not settings.enabled:
+                if not self.scheduler.enabled:
+                    return None
+                settings = replace(settings, adaptive=False)
+            limiter = self._limiters.get((provider, model))
+            if limiter is None:
+                limiter = AdaptiveLimiter(settings, provider, model, self.scheduler)
+                self._limiters[(provider, model)] = limiter
+            return limiter
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {f"{p}/{m}": limiter.stats() for (p, m), limiter in limiters.items()}
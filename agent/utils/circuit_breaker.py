@@ -0,0 +1,122 @@
+"""
+Circuit Breaker
+
+Per-provider circuit breakers for outbound LLM calls. After enough consecutive
+transient failures a breaker opens and callers fail fast (or fail over) instead
+of retrying against a provider that is down; after a cool-down it lets a limited
+number of half-open probes through and closes again on success.
+"""
+
+import os
+import threading
+import time
+from enum import Enum
+from typing import Any
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's breaker is open and no fallback is configured."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._counters = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0}
+
+    def _maybe_half_open_locked(self, now: float) -> None:
+        if self._state is BreakerState.OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = BreakerState.HALF_OPEN
+            self._probes_in_flight = 0
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            self._maybe_half_open_locked(time.monotonic())
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed (reserving a probe slot when half-open)."""
+        with self._lock:
+            self._maybe_half_open_locked(time.monotonic())
+            if self._state is BreakerState.CLOSED:
+                return True
+            if self._state is BreakerState.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+                self._probes_in_flight += 1
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._counters["successes"] += 1
+            self._failures = 0
+            self._probes_in_flight = 0
+            self._state = BreakerState.CLOSED
+
+    def record_neutral(self) -> None:
+        """Release a half-open probe slot for an outcome that says nothing about health."""
+        with self._lock:
+            if self._state is BreakerState.HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._counters["failures"] += 1
+            self._failures += 1
+            if self._state is BreakerState.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state is not BreakerState.OPEN:
+                    self._counters["opened"] += 1
+                self._state = BreakerState.OPEN
+                self._opened_at = time.monotonic()
+                self._probes_in_flight = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open_locked(time.monotonic())
+            return {
+                "state": self._state.value,
+                "consecutive_failures": self._failures,
+                **self._counters,
+            }
+
+
+class BreakerBoard:
+    """Lazily created breakers keyed by provider name."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "") or 5),
+                    recovery_timeout=float(os.getenv("LLM_BREAKER_RECOVERY_SECONDS", "") or 30),
+                )
+                self._breakers[provider] = breaker
+            return breaker
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {provider: breaker.stats() for provider, breaker in breakers.items()}
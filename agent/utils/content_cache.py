@@ -0,0 +1,254 @@
+"""
+Parsed-Content Cache
+
+Content-addressed cache of parsed uploads. An entry is keyed by the upload's
+SHA-256, its file name (which supplies the fallback title and ``source_file``)
+and :data:`~agent.utils.content_loader.LOADER_VERSION`, so the same lecture PDF
+uploaded by a whole class is parsed once. Every session that uploads it then
+references one shared, read-only :class:`CachedContent` instead of its own copy.
+
+Entries live in an in-memory LRU bounded by count and text size, and, with
+``CONTENT_CACHE_DIR`` set, in JSON files on disk that survive restarts and are
+evicted least-recently-used past ``CONTENT_CACHE_DISK_MAX_BYTES``. Concurrent
+misses for the same upload share one parse.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from agent.utils.content_loader import LOADER_VERSION, LoadedContent
+from agent.utils.llm_metrics import get_metrics
+from agent.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_LOOKUPS = get_metrics().counter(
+    "content_cache_lookups_total", "Parsed-content cache lookups by result (memory, disk or miss).", ("result",)
+)
+
+
+def content_key(sha256: str, filename: str) -> str:
+    """Cache key for an upload with digest *sha256* named *filename*."""
+    payload = json.dumps([LOADER_VERSION, Path(filename).name, sha256])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _text_size(content: LoadedContent) -> int:
+    return len(content.raw_text) + sum(len(s.body) for s in content.sections)
+
+
+class CachedContent:
+    """One parsed upload shared by every session that uploaded the same file.
+
+    ``shared`` is the serialised form sessions store in ``loaded_content``; both
+    it and ``content`` must be treated as read-only.
+    """
+
+    __slots__ = ("content", "shared", "size")
+
+    def __init__(self, content: LoadedContent) -> None:
+        self.content = content
+        self.shared = content.model_dump()
+        self.size = _text_size(content)
+
+
+class ContentCache:
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 64,
+        max_bytes: int = 256 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+    ) -> None:
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedContent] = OrderedDict()
+        self._bytes = 0
+        self._flight = SingleFlight()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ContentCache":
+        def number(name: str, default: int) -> int:
+            try:
+                return int(os.getenv(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        return cls(
+            enabled=os.getenv("CONTENT_CACHE_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off"),
+            max_entries=max(1, number("CONTENT_CACHE_MAX_ENTRIES", 64)),
+            max_bytes=number("CONTENT_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+            disk_dir=os.getenv("CONTENT_CACHE_DIR", "").strip() or None,
+            disk_max_bytes=number("CONTENT_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024),
+        )
+
+    # -- memory tier -------------------------------------------------------
+
+    def _remember(self, key: str, entry: CachedContent) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._counters["evictions"] += 1
+
+    def _from_memory(self, key: str) -> Optional[CachedContent]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    # -- disk tier ---------------------------------------------------------
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        return self.disk_dir / f"{key}.json" if self.disk_dir is not None else None
+
+    def _from_disk(self, key: str) -> Optional[CachedContent]:
+        path = self._disk_path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            content = LoadedContent.model_validate_json(path.read_bytes())
+            os.utime(path)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable parsed-content cache file %s: %s", path, exc)
+            return None
+        return CachedContent(content)
+
+    def _to_disk(self, key: str, entry: CachedContent) -> None:
+        path = self._disk_path(key)
+        if path is None or self.disk_dir is None:
+            return
+        try:
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(entry.content.model_dump_json(), encoding="utf-8")
+            os.replace(tmp, path)
+            older = sorted((p for p in self.disk_dir.glob("*.json") if p != path), key=lambda p: p.stat().st_mtime)
+            total = path.stat().st_size + sum(p.stat().st_size for p in older)
+            for victim in older:
+                if total <= self.disk_max_bytes:
+                    break
+                total -= victim.stat().st_size
+                victim.unlink(missing_ok=True)
+                with self._lock:
+                    self._counters["disk_evictions"] += 1
+        except OSError as exc:
+            logger.warning("Could not write parsed-content cache file %s: %s", path, exc)
+
+    # -- lookups -----------------------------------------------------------
+
+    def get(self, sha256: str, filename: str) -> Optional[CachedContent]:
+        """Return the cached parse of this upload from memory or disk, or ``None``."""
+        if not self.enabled:
+            return None
+        key = content_key(sha256, filename)
+        entry = self._lookup(key)
+        if entry is None:
+            self._count("misses", "miss")
+        return entry
+
+    def _lookup(self, key: str) -> Optional[CachedContent]:
+        entry = self._from_memory(key)
+        if entry is not None:
+            self._count("memory_hits", "memory")
+            return entry
+        entry = self._from_disk(key)
+        if entry is not None:
+            self._count("disk_hits", "disk")
+            self._remember(key, entry)
+        return entry
+
+    def put(self, sha256: str, filename: str, content: LoadedContent) -> CachedContent:
+        """Cache a fresh parse (memory, and disk when configured) and return the shared entry."""
+        entry = CachedContent(content)
+        if self.enabled:
+            key = content_key(sha256, filename)
+            self._remember(key, entry)
+            self._to_disk(key, entry)
+        return entry
+
+    async def aget_or_load(
+        self, sha256: str, filename: str, load: Callable[[], Awaitable[LoadedContent]]
+    ) -> CachedContent:
+        """Return the shared parse of this upload, running *load* once on a miss.
+
+        Concurrent callers with the same upload wait for the same parse.
+        """
+        if not self.enabled:
+            return CachedContent(await load())
+        key = content_key(sha256, filename)
+        entry = self._from_memory(key)
+        if entry is not None:
+            self._count("memory_hits", "memory")
+            return entry
+
+        async def fill() -> CachedContent:
+            cached = await asyncio.to_thread(self._lookup, key)
+            if cached is not None:
+                return cached
+            self._count("misses", "miss")
+            fresh = CachedContent(await load())
+            self._remember(key, fresh)
+            await asyncio.to_thread(self._to_disk, key, fresh)
+            return fresh
+
+        result: CachedContent = await self._flight.ado(key, fill)
+        return result
+
+    def _count(self, counter: str, result: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+        _LOOKUPS.inc(result=result)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            entries, size = len(self._entries), self._bytes
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = lookups - counters["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "text_bytes": size,
+            "disk_dir": str(self.disk_dir) if self.disk_dir is not None else None,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self._flight.stats()["collapsed"],
+            **counters,
+        }
+
+
+_CACHE: Optional[ContentCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_content_cache() -> ContentCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ContentCache.from_env()
+        return _CACHE
@@ -3,15 +3,36 @@ Content Loader Utility
 
 Loads and parses user-uploaded study materials (text, PDF, Markdown)
 into structured content the agent can use for teaching and quiz generation.
+
+Every loader reads from a path, or from the upload's bytes when ``data`` is
+given (see :func:`load_content_bytes`), so the web API can parse uploads in
+memory without a temp-file round trip. PDFs with at least
+``PDF_PARALLEL_MIN_PAGES`` pages have their page text extracted across a pool
+of worker processes (the one case where upload bytes are spooled to a temp
+file, so that each worker opens it instead of receiving a pickled copy).
 """
 
 import json
+import logging
+import math
+import multiprocessing
+import os
 import re
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any, Optional
+from typing import IO, Any, Iterator, Optional, Union
 
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger(__name__)
+
+# Bump whenever a loader's output changes: it is part of every parsed-content cache key
+# (agent/utils/content_cache.py), so stale parses are never served after an upgrade.
+LOADER_VERSION = "1"
+
 
 class ContentSection(BaseModel):
     """A single section extracted from uploaded content."""
@@ -85,12 +106,12 @@ def _pdf_plausible_embedded_title(doc: object) -> str:
     return raw
 
 
-def load_text_file(file_path: str) -> LoadedContent:
-    """Load a plain .txt file."""
+def load_text_file(file_path: str, data: Optional[bytes] = None) -> LoadedContent:
+    """Load a plain .txt file (from *data* instead of disk when given)."""
     path = Path(file_path)
-    _validate_file(path, {".txt"})
+    _validate_file(path, {".txt"}, in_memory=data is not None)
 
-    text = path.read_text(encoding="utf-8")
+    text = _read_text(path, data)
     sections = _split_into_sections(text, source_file=path.name)
 
     return LoadedContent(
@@ -98,16 +119,16 @@ def load_text_file(file_path: str) -> LoadedContent:
         source_file=path.name,
         sections=sections,
         raw_text=text,
-        metadata={"format": "text", "size_bytes": path.stat().st_size},
+        metadata={"format": "text", "size_bytes": _size_bytes(path, data)},
     )
 
 
-def load_markdown_file(file_path: str) -> LoadedContent:
+def load_markdown_file(file_path: str, data: Optional[bytes] = None) -> LoadedContent:
     """Load a Markdown (.md) file, splitting on headings."""
     path = Path(file_path)
-    _validate_file(path, {".md", ".markdown"})
+    _validate_file(path, {".md", ".markdown"}, in_memory=data is not None)
 
-    text = path.read_text(encoding="utf-8")
+    text = _read_text(path, data)
     sections = _parse_markdown_sections(text, source_file=path.name)
 
     title = path.stem
@@ -119,33 +140,38 @@ def load_markdown_file(file_path: str) -> LoadedContent:
         source_file=path.name,
         sections=sections,
         raw_text=text,
-        metadata={"format": "markdown", "size_bytes": path.stat().st_size},
+        metadata={"format": "markdown", "size_bytes": _size_bytes(path, data)},
     )
 
 
-def load_pdf_file(file_path: str) -> LoadedContent:
+def load_pdf_file(file_path: str, data: Optional[bytes] = None, parallel: Optional[bool] = None) -> LoadedContent:
     """
     Load a PDF file. Requires the ``pymupdf`` (fitz) package.
 
+    With *data*, the document is opened from memory (``fitz.open(stream=...)``).
+    *parallel* forces (``True``) or disables (``False``) page extraction across
+    worker processes; by default it is used from ``PDF_PARALLEL_MIN_PAGES`` pages.
     Falls back to a helpful error if pymupdf is not installed.
     """
     path = Path(file_path)
-    _validate_file(path, {".pdf"})
+    _validate_file(path, {".pdf"}, in_memory=data is not None)
 
+    source: Union[str, bytes] = data if data is not None else str(path)
     try:
-        import fitz  # type: ignore[import-untyped]
+        doc = _open_pdf(source)
     except ImportError:
         raise ImportError(
             "pymupdf is required to load PDF files. "
             "Install it with: pip install pymupdf"
         )
-
-    doc = fitz.open(str(path))
     sections: list[ContentSection] = []
     all_text_parts: list[str] = []
 
-    for page_num, page in enumerate(doc, start=1):
-        page_text = page.get_text()  # type: ignore[union-attr]
+    page_texts = _parallel_page_texts(source, doc.page_count, parallel)
+    if page_texts is None:
+        page_texts = [page.get_text() for page in doc]
+
+    for page_num, page_text in enumerate(page_texts, start=1):
         if page_text.strip():
             sections.append(
                 ContentSection(
@@ -170,14 +196,14 @@ def load_pdf_file(file_path: str) -> LoadedContent:
         raw_text="\n\n".join(all_text_parts),
         metadata={
             "format": "pdf",
-            "size_bytes": path.stat().st_size,
+            "size_bytes": _size_bytes(path, data),
             "page_count": len(sections),
             **({"pdf_embedded_title": embedded_title} if embedded_title else {}),
         },
     )
 
 
-def load_json_file(file_path: str) -> LoadedContent:
+def load_json_file(file_path: str, data: Optional[bytes] = None) -> LoadedContent:
     """Load a structured JSON study-material file.
 
     Expected shape (flexible):
@@ -185,14 +211,14 @@ def load_json_file(file_path: str) -> LoadedContent:
     or a plain list of strings.
     """
     path = Path(file_path)
-    _validate_file(path, {".json"})
+    _validate_file(path, {".json"}, in_memory=data is not None)
 
-    data = json.loads(path.read_text(encoding="utf-8"))
+    parsed = json.loads(_read_text(path, data))
     sections: list[ContentSection] = []
 
-    if isinstance(data, dict):
-        title = data.get("title", path.stem)
-        for idx, sec in enumerate(data.get("sections", [])):
+    if isinstance(parsed, dict):
+        title = parsed.get("title", path.stem)
+        for idx, sec in enumerate(parsed.get("sections", [])):
             if isinstance(sec, dict):
                 sections.append(
                     ContentSection(
@@ -210,9 +236,9 @@ def load_json_file(file_path: str) -> LoadedContent:
                         section_index=idx,
                     )
                 )
-    elif isinstance(data, list):
+    elif isinstance(parsed, list):
         title = path.stem
-        for idx, item in enumerate(data):
+        for idx, item in enumerate(parsed):
             body = item if isinstance(item, str) else json.dumps(item)
             sections.append(
                 ContentSection(
@@ -225,7 +251,7 @@ def load_json_file(file_path: str) -> LoadedContent:
         title = path.stem
         sections.append(
             ContentSection(
-                body=str(data),
+                body=str(parsed),
                 source_file=path.name,
                 section_index=0,
             )
@@ -238,7 +264,7 @@ def load_json_file(file_path: str) -> LoadedContent:
         source_file=path.name,
         sections=sections,
         raw_text=raw_text,
-        metadata={"format": "json", "size_bytes": path.stat().st_size},
+        metadata={"format": "json", "size_bytes": _size_bytes(path, data)},
     )
 
 
@@ -284,13 +310,33 @@ def load_content(file_path: str) -> LoadedContent:
     return loader(file_path)
 
 
+def load_content_bytes(source: Union[bytes, IO[bytes]], filename: str) -> LoadedContent:
+    """Parse an upload held in memory (bytes or a binary stream), picking the loader from *filename*.
+
+    Nothing is written to disk; *filename* only supplies the extension, title and
+    ``source_file``.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    ext = Path(filename).suffix.lower()
+    loader = _LOADERS.get(ext)
+    if loader is None:
+        raise ValueError(
+            f"Unsupported file type: '{ext}'. "
+            f"Supported types: {', '.join(sorted(SUPPORTED_EXTENSIONS))}"
+        )
+    data = source if isinstance(source, bytes) else source.read()
+    return loader(filename, data)
+
+
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
 
-def _validate_file(path: Path, allowed_suffixes: set[str]) -> None:
-    if not path.exists():
+def _validate_file(path: Path, allowed_suffixes: set[str], in_memory: bool = False) -> None:
+    if not in_memory and not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
     if path.suffix.lower() not in allowed_suffixes:
         raise ValueError(
@@ -298,16 +344,137 @@ def _validate_file(path: Path, allowed_suffixes: set[str]) -> None:
         )
 
 
-def _split_into_sections(
+def _open_pdf(source: Union[str, bytes]) -> Any:
+    import fitz  # type: ignore[import-untyped]
+
+    return fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
+
+
+def _pdf_page_texts(path: str, start: int, stop: int) -> list[str]:
+    """Text of pages ``[start, stop)``; runs in a worker process, which opens its own copy."""
+    doc = _open_pdf(path)
+    try:
+        return [doc[i].get_text() for i in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _pdf_parallel_settings() -> tuple[int, int]:
+    """``(PDF_PARALLEL_MIN_PAGES, PDF_PARALLEL_WORKERS)``, read on every call."""
+    min_pages = _env_int("PDF_PARALLEL_MIN_PAGES", 64)
+    workers = max(1, _env_int("PDF_PARALLEL_WORKERS", min(8, os.cpu_count() or 1)))
+    return min_pages, workers
+
+
+_PDF_POOL: Optional[Executor] = None
+_PDF_POOL_WORKERS = 0
+_PDF_POOL_LOCK = threading.Lock()
+
+
+def _pdf_pool(workers: int) -> Executor:
+    global _PDF_POOL, _PDF_POOL_WORKERS
+    with _PDF_POOL_LOCK:
+        stale = _PDF_POOL if _PDF_POOL is not None and _PDF_POOL_WORKERS != workers else None
+        if _PDF_POOL is None or stale is not None:
+            # spawn, not fork: the web API's threads and sockets must not be copied into workers.
+            _PDF_POOL = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _PDF_POOL_WORKERS = workers
+        pool = _PDF_POOL
+    if stale is not None:
+        stale.shutdown(wait=False)
+    return pool
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the PDF extraction workers (they are restarted on the next large PDF)."""
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        pool, _PDF_POOL = _PDF_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _parallel_page_texts(source: Union[str, bytes], page_count: int, parallel: Optional[bool]) -> Optional[list[str]]:
+    """Page texts extracted in page order across worker processes, or ``None`` to extract serially.
+
+    Workers get a file path, never the document: upload bytes are written to one
+    temp file that every worker opens, instead of being pickled once per chunk.
+    """
+    min_pages, workers = _pdf_parallel_settings()
+    if parallel is False or workers < 2 or page_count < 2:
+        return None
+    if parallel is None and page_count < min_pages:
+        return None
+    step = math.ceil(page_count / workers)
+    spooled: Optional[str] = None
+    try:
+        if isinstance(source, bytes):
+            fd, spooled = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(source)
+        path = spooled or str(source)
+        pool = _pdf_pool(workers)
+        futures = [
+            pool.submit(_pdf_page_texts, path, start, min(start + step, page_count))
+            for start in range(0, page_count, step)
+        ]
+        return [text for future in futures for text in future.result()]
+    except BrokenProcessPool as exc:
+        logger.warning("PDF worker pool failed (%s); extracting pages serially", exc)
+        shutdown_pdf_pool()
+        return None
+    finally:
+        if spooled is not None:
+            os.unlink(spooled)
+
+
+def _read_text(path: Path, data: Optional[bytes]) -> str:
+    """UTF-8 text from *data* or the file, with newlines normalised as ``read_text`` does."""
+    if data is None:
+        return path.read_text(encoding="utf-8")
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _size_bytes(path: Path, data: Optional[bytes]) -> int:
+    return len(data) if data is not None else path.stat().st_size
+
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_MARKDOWN_HEADING = re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE)
+
+
+def _iter_paragraphs(text: str) -> Iterator[str]:
+    """Blank-line-separated chunks of *text*, like ``re.split`` but lazily."""
+    start = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        yield text[start:match.start()]
+        start = match.end()
+    yield text[start:]
+
+
+def iter_text_sections(
     text: str,
     source_file: str = "",
     min_section_length: int = 50,
-) -> list[ContentSection]:
-    """Split plain text into sections by blank-line-separated paragraphs."""
-    paragraphs = re.split(r"\n\s*\n", text.strip())
-    sections: list[ContentSection] = []
+) -> Iterator[ContentSection]:
+    """Yield plain-text sections one blank-line-separated paragraph at a time.
 
-    for idx, para in enumerate(paragraphs):
+    A short first line becomes the section title; paragraphs shorter than
+    *min_section_length* are merged into the section before them. Each section
+    is yielded once no further paragraph can merge into it, so memory and time
+    stay linear in the input.
+    """
+    title = ""
+    parts: list[str] = []
+    index = 0
+    for para in _iter_paragraphs(text.strip()):
         para = para.strip()
         if not para:
             continue
@@ -315,68 +482,74 @@ def _split_into_sections(
         # Treat a short first line as a heading
         lines = para.split("\n", 1)
         if len(lines) == 2 and len(lines[0]) < 80:
-            title = lines[0].strip()
+            para_title = lines[0].strip()
             body = lines[1].strip()
         else:
-            title = ""
+            para_title = ""
             body = para
 
-        if len(body) < min_section_length and idx > 0 and sections:
+        if len(body) < min_section_length and parts:
             # Merge tiny paragraphs into previous section
-            sections[-1].body += "\n\n" + body
+            parts.append(body)
             continue
 
-        sections.append(
-            ContentSection(
-                title=title,
-                body=body,
-                source_file=source_file,
-                section_index=len(sections),
-            )
-        )
+        if parts:
+            yield ContentSection(title=title, body="\n\n".join(parts), source_file=source_file, section_index=index)
+            index += 1
+        title, parts = para_title, [body]
 
-    return sections
+    if parts:
+        yield ContentSection(title=title, body="\n\n".join(parts), source_file=source_file, section_index=index)
 
 
-def _parse_markdown_sections(
+def _split_into_sections(
     text: str,
     source_file: str = "",
+    min_section_length: int = 50,
 ) -> list[ContentSection]:
-    """Split Markdown into sections based on headings (# / ## / ###)."""
-    heading_pattern = re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE)
-    matches = list(heading_pattern.finditer(text))
+    """Split plain text into sections by blank-line-separated paragraphs."""
+    return list(iter_text_sections(text, source_file, min_section_length))
 
-    if not matches:
-        # No headings — treat as a single section
-        return _split_into_sections(text, source_file)
 
-    sections: list[ContentSection] = []
+def iter_markdown_sections(
+    text: str,
+    source_file: str = "",
+) -> Iterator[ContentSection]:
+    """Yield Markdown sections split on headings (# / ## / ###) in a single pass.
 
+    Text before the first heading becomes an "Introduction" section; without
+    any heading the text is split like plain text.
+    """
+    matches = _MARKDOWN_HEADING.finditer(text)
+    current = next(matches, None)
+    if current is None:
+        # No headings — treat as a single section
+        yield from iter_text_sections(text, source_file)
+        return
+
+    index = 0
     # Content before the first heading
-    pre_heading = text[: matches[0].start()].strip()
+    pre_heading = text[: current.start()].strip()
     if pre_heading:
-        sections.append(
-            ContentSection(
-                title="Introduction",
-                body=pre_heading,
-                source_file=source_file,
-                section_index=0,
-            )
+        yield ContentSection(title="Introduction", body=pre_heading, source_file=source_file, section_index=index)
+        index += 1
+
+    while current is not None:
+        following = next(matches, None)
+        end = following.start() if following is not None else len(text)
+        yield ContentSection(
+            title=current.group(2).strip(),
+            body=text[current.end():end].strip(),
+            source_file=source_file,
+            section_index=index,
         )
+        index += 1
+        current = following
 
-    for i, match in enumerate(matches):
-        title = match.group(2).strip()
-        start = match.end()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-        body = text[start:end].strip()
 
-        sections.append(
-            ContentSection(
-                title=title,
-                body=body,
-                source_file=source_file,
-                section_index=len(sections),
-            )
-        )
-
-    return sections
+def _parse_markdown_sections(
+    text: str,
+    source_file: str = "",
+) -> list[ContentSection]:
+    """Split Markdown into sections based on headings (# / ## / ###)."""
+    return list(iter_markdown_sections(text, source_file))
@@ -0,0 +1,88 @@
+"""
+Request Deadlines
+
+A deadline is an absolute ``time.monotonic()`` instant held in a context
+variable, so it follows a request from the web API through the tools, asyncio
+tasks and threadpool workers (``run_in_threadpool`` copies the context) into
+:func:`agent.utils.llm_client.call_with_retry`. There it bounds rate-limit and
+concurrency queueing and each attempt's timeout, and stops retries whose
+backoff would outlive the request.
+
+The web API sets it per request from an ``X-Request-Deadline`` header (seconds
+from now, or an absolute Unix timestamp) or a per-endpoint default.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Header values above this are read as absolute Unix timestamps rather than a budget in seconds.
+_EPOCH_THRESHOLD = 1_000_000_000
+
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's deadline passes before its LLM work could finish."""
+
+
+@contextmanager
+def deadline_context(seconds: Optional[float]) -> Iterator[None]:
+    """Bound work inside this block to *seconds* from now (``None``: no new bound).
+
+    Nested deadlines never extend an outer one; the earlier instant wins.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + max(0.0, seconds)
+    outer = _DEADLINE.get()
+    token = _DEADLINE.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """The current deadline as a ``time.monotonic()`` instant, or ``None`` without one."""
+    return _DEADLINE.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (may be negative), or ``None`` without one."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(what: str = "LLM call") -> Optional[float]:
+    """Return the seconds left, raising :class:`DeadlineExceededError` if none are."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError(f"Request deadline exceeded before {what}")
+    return left
+
+
+def within_deadline(seconds: Optional[float]) -> Optional[float]:
+    """Clamp a wait or timeout of *seconds* to the time left (``None`` means unbounded)."""
+    left = remaining()
+    if left is None:
+        return seconds
+    left = max(0.0, left)
+    return left if seconds is None else min(seconds, left)
+
+
+def parse_deadline_header(value: Optional[str], max_seconds: Optional[float] = None) -> Optional[float]:
+    """Seconds from now named by an ``X-Request-Deadline`` value; ``None`` if absent or malformed."""
+    if not value:
+        return None
+    try:
+        number = float(value.strip())
+    except ValueError:
+        return None
+    seconds = number - time.time() if number > _EPOCH_THRESHOLD else number
+    if seconds != seconds:  # NaN
+        return None
+    seconds = max(0.0, seconds)
+    return min(seconds, max_seconds) if max_seconds is not None else seconds
@@ -0,0 +1,326 @@
+"""
+Fair Scheduling
+
+Ordering for LLM calls that queue behind a full concurrency window (see
+:mod:`agent.utils.adaptive_limiter`). While scheduling is on, every provider/model
+has such a window: the adaptive one when ``LLM_CONCURRENCY_ENABLED`` is set,
+otherwise a fixed one at the HTTP connection-pool size. Instead of first-come
+first-served, a freed slot goes to:
+
+1. the highest waiting priority class (``interactive`` > ``normal`` > ``background``),
+   where every ``LLM_SCHED_AGING_SECONDS`` a class's oldest call has waited lifts
+   it one rank, so a steady stream of lessons cannot starve background work;
+2. within it, the tenant with the least weighted service so far (start-time fair
+   queuing, weights from ``LLM_SCHED_TENANT_WEIGHTS``);
+3. within that tenant, the session with the least service so far.
+
+Service is charged in estimated tokens (prompt plus completion budget), so a
+session requesting 15-question quizzes pays for them and cannot crowd out
+everyone else's lessons. A flow's finish tag outlives its queue: a flow that
+drains and queues again starts at ``max(virtual time, last finish)``, so one
+with a single call waiting at a time is still charged for what it used, while a
+flow that was idle comes back level with the current leader rather than banking
+credit. Finish tags are forgotten ``LLM_SCHED_IDLE_SECONDS`` after a flow
+drains. The web API tags each request's calls with the session in its path
+through :func:`scheduling_context`, and the priority comes from the tool
+(``LLM_SCHED_PRIORITIES``). Clients can send any header, so ``X-Tenant-ID`` and
+``X-Priority`` are honoured only with ``LLM_SCHED_TRUST_HEADERS``, for
+deployments behind a gateway that authenticates callers and sets them.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Generic, Iterator, Mapping, Optional, TypeVar
+
+from agent.utils.llm_metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("interactive", "normal", "background")
+DEFAULT_TOOL_PRIORITIES = {
+    "teach_concept": "interactive",
+    "plan_learning_path": "normal",
+    "generate_quiz": "normal",
+}
+DEFAULT_TENANT = "default"
+DEFAULT_SESSION = "anonymous"
+
+_SCHED_LABELS = ("provider", "model", "priority", "tenant")
+_SCHED_DEPTH = get_metrics().gauge(
+    "llm_sched_queue_depth", "LLM calls waiting for a concurrency slot, by priority class and tenant.", _SCHED_LABELS
+)
+_SCHED_WAIT = get_metrics().histogram(
+    "llm_sched_wait_seconds", "Time LLM calls waited for a concurrency slot, by priority class and tenant.", _SCHED_LABELS
+)
+
+
+@dataclass(frozen=True)
+class Flow:
+    """Who an LLM call is scheduled for."""
+
+    tenant: str = DEFAULT_TENANT
+    session: str = DEFAULT_SESSION
+    priority: str = "normal"
+
+
+_SCHEDULING: ContextVar[Optional[dict[str, str]]] = ContextVar("llm_scheduling", default=None)
+
+
+@contextmanager
+def scheduling_context(
+    session: Optional[str] = None, tenant: Optional[str] = None, priority: Optional[str] = None
+) -> Iterator[None]:
+    """Attribute LLM calls in this block to *session* / *tenant*, optionally forcing a priority class.
+
+    Unset arguments inherit from an enclosing block; unknown priorities are ignored.
+    """
+    values = dict(_SCHEDULING.get() or {})
+    if session:
+        values["session"] = session
+    if tenant:
+        values["tenant"] = tenant
+    if priority in PRIORITIES:
+        values["priority"] = priority
+    token = _SCHEDULING.set(values)
+    try:
+        yield
+    finally:
+        _SCHEDULING.reset(token)
+
+
+def _json_map(name: str) -> dict[str, Any]:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        logger.warning("Ignoring %s: invalid JSON (%s)", name, exc)
+        return {}
+    if not isinstance(data, dict):
+        logger.warning("Ignoring %s: expected a JSON object", name)
+        return {}
+    return data
+
+
+@dataclass(frozen=True)
+class SchedulerSettings:
+    enabled: bool = True
+    tenant_weights: dict[str, float] = field(default_factory=dict)
+    tool_priorities: dict[str, str] = field(default_factory=lambda: dict(DEFAULT_TOOL_PRIORITIES))
+    idle_seconds: float = 300.0
+    aging_seconds: float = 5.0
+    trust_headers: bool = False
+
+    @classmethod
+    def from_env(cls) -> "SchedulerSettings":
+        """Read ``LLM_SCHED_*``; tenant weights and tool priorities are JSON objects."""
+        weights: dict[str, float] = {}
+        for tenant, weight in _json_map("LLM_SCHED_TENANT_WEIGHTS").items():
+            try:
+                weights[str(tenant)] = max(0.01, float(weight))
+            except (TypeError, ValueError):
+                logger.warning("Ignoring LLM_SCHED_TENANT_WEIGHTS[%r]: not a number", tenant)
+        priorities = dict(DEFAULT_TOOL_PRIORITIES)
+        for tool, priority in _json_map("LLM_SCHED_PRIORITIES").items():
+            if priority in PRIORITIES:
+                priorities[str(tool)] = priority
+            else:
+                logger.warning("Ignoring LLM_SCHED_PRIORITIES[%r]: expected one of %s", tool, PRIORITIES)
+        def seconds(name: str, default: float) -> float:
+            try:
+                return max(0.0, float(os.getenv(name, "").strip() or default))
+            except ValueError:
+                return default
+
+        return cls(
+            enabled=os.getenv("LLM_SCHED_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off"),
+            tenant_weights=weights,
+            tool_priorities=priorities,
+            idle_seconds=seconds("LLM_SCHED_IDLE_SECONDS", cls.idle_seconds),
+            aging_seconds=seconds("LLM_SCHED_AGING_SECONDS", cls.aging_seconds),
+            trust_headers=os.getenv("LLM_SCHED_TRUST_HEADERS", "").strip().lower() in ("1", "true", "yes", "on"),
+        )
+
+    def header_overrides(self, headers: Mapping[str, str]) -> dict[str, Optional[str]]:
+        """``tenant`` / ``priority`` for :func:`scheduling_context` from ``X-Tenant-ID`` / ``X-Priority``.
+
+        Empty unless ``trust_headers`` is set: an unauthenticated caller could
+        otherwise promote itself or rotate tenant IDs to escape its fair share.
+        """
+        if not self.trust_headers:
+            return {}
+        return {"tenant": headers.get("x-tenant-id"), "priority": headers.get("x-priority")}
+
+    def flow(self, tool: Optional[str] = None) -> Flow:
+        """The flow for a call made now by *tool*, from the active :func:`scheduling_context`."""
+        values = _SCHEDULING.get() or {}
+        priority = values.get("priority") or self.tool_priorities.get(tool or "", "normal")
+        return Flow(values.get("tenant", DEFAULT_TENANT), values.get("session", DEFAULT_SESSION), priority)
+
+
+T = TypeVar("T")
+
+
+class _Lane(Generic[T]):
+    """Queued items of one tenant or session, with the service charged to it so far."""
+
+    def __init__(self, vtime: float) -> None:
+        self.vtime = vtime
+        self.items: deque[tuple[T, float, float]] = deque()  # (item, cost, enqueued at)
+        self.sessions: dict[str, "_Lane[T]"] = {}
+        self.session_floor = 0.0
+
+
+class FairQueue(Generic[T]):
+    """Waiters ordered by priority class, then weighted fair share across tenants, then sessions.
+
+    Not thread-safe; the owning limiter holds its lock around every call. With
+    *fair* off every item goes into one lane, which is plain FIFO. *aging_seconds*
+    (0 disables aging) is how long a class's oldest item waits per rank it gains.
+    """
+
+    def __init__(
+        self,
+        tenant_weights: Optional[dict[str, float]] = None,
+        fair: bool = True,
+        idle_seconds: float = 300.0,
+        aging_seconds: float = 5.0,
+    ) -> None:
+        self.tenant_weights = tenant_weights or {}
+        self.fair = fair
+        self.idle_seconds = idle_seconds
+        self.aging_seconds = aging_seconds
+        self._classes: dict[str, dict[str, _Lane[T]]] = {p: {} for p in PRIORITIES}
+        self._floors: dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        # Finish tags of drained lanes: (priority, tenant[, session]) -> (vtime, session_floor, expires_at).
+        self._drained: OrderedDict[tuple[str, ...], tuple[float, float, float]] = OrderedDict()
+        self._where: dict[int, Flow] = {}
+        self._published: set[tuple[str, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __bool__(self) -> bool:
+        return bool(self._where)
+
+    def push(self, item: T, flow: Flow, cost: float = 1.0) -> None:
+        if not self.fair:
+            flow = Flow()
+        priority = flow.priority if flow.priority in PRIORITIES else "normal"
+        flow = Flow(flow.tenant, flow.session, priority)
+        tenants = self._classes[priority]
+        tenant = tenants.get(flow.tenant)
+        if tenant is None:
+            finish, session_floor = self._recall((priority, flow.tenant))
+            tenant = tenants[flow.tenant] = _Lane(max(self._floors[priority], finish))
+            tenant.session_floor = session_floor
+        session = tenant.sessions.get(flow.session)
+        if session is None:
+            finish, _ = self._recall((priority, flow.tenant, flow.session))
+            session = tenant.sessions[flow.session] = _Lane(max(tenant.session_floor, finish))
+        session.items.append((item, max(1.0, cost), time.monotonic()))
+        self._where[id(item)] = flow
+
+    def _next_class(self) -> Optional[str]:
+        """The class to serve: best rank after aging, the higher class on ties."""
+        now = time.monotonic()
+        best: Optional[tuple[int, str]] = None
+        for rank, priority in enumerate(PRIORITIES):
+            tenants = self._classes[priority]
+            if not tenants:
+                continue
+            if self.aging_seconds > 0:
+                oldest = min(lane.items[0][2] for tenant in tenants.values() for lane in tenant.sessions.values())
+                rank -= int((now - oldest) / self.aging_seconds)
+            if best is None or rank < best[0]:
+                best = (rank, priority)
+        return best[1] if best is not None else None
+
+    def pop(self) -> tuple[T, Flow]:
+        """Remove and return the next item to serve and its flow."""
+        priority = self._next_class()
+        if priority is not None:
+            tenants = self._classes[priority]
+            tenant_name = min(tenants, key=lambda name: tenants[name].vtime)
+            tenant = tenants[tenant_name]
+            session_name = min(tenant.sessions, key=lambda name: tenant.sessions[name].vtime)
+            session = tenant.sessions[session_name]
+            item, cost, _ = session.items.popleft()
+            self._floors[priority] = tenant.vtime
+            tenant.session_floor = session.vtime
+            tenant.vtime += cost / self.tenant_weights.get(tenant_name, 1.0)
+            session.vtime += cost
+            self._prune(priority, tenant_name, session_name)
+            return item, self._where.pop(id(item))
+        raise IndexError("pop from an empty FairQueue")
+
+    def remove(self, item: T) -> None:
+        """Drop a waiter that gave up (timeout or cancellation)."""
+        flow = self._where.pop(id(item))
+        tenant = self._classes[flow.priority][flow.tenant]
+        session = tenant.sessions[flow.session]
+        for i, (queued, _, _) in enumerate(session.items):
+            if queued is item:
+                del session.items[i]
+                break
+        self._prune(flow.priority, flow.tenant, flow.session)
+
+    def _prune(self, priority: str, tenant_name: str, session_name: str) -> None:
+        tenant = self._classes[priority][tenant_name]
+        session = tenant.sessions[session_name]
+        if not session.items:
+            del tenant.sessions[session_name]
+            self._remember((priority, tenant_name, session_name), session.vtime, 0.0)
+        if not tenant.sessions:
+            del self._classes[priority][tenant_name]
+            self._remember((priority, tenant_name), tenant.vtime, tenant.session_floor)
+
+    def _remember(self, key: tuple[str, ...], vtime: float, session_floor: float) -> None:
+        self._drained[key] = (vtime, session_floor, time.monotonic() + self.idle_seconds)
+        self._drained.move_to_end(key)
+
+    def _recall(self, key: tuple[str, ...]) -> tuple[float, float]:
+        """The last finish tag (and session floor) of a drained lane, or zeros once it has expired."""
+        now = time.monotonic()
+        while self._drained:
+            oldest = next(iter(self._drained))
+            if self._drained[oldest][2] > now:
+                break
+            del self._drained[oldest]
+        vtime, session_floor, _ = self._drained.pop(key, (0.0, 0.0, 0.0))
+        return vtime, session_floor
+
+    def depths(self) -> dict[str, dict[str, dict[str, int]]]:
+        """Waiting items as ``{priority: {tenant: {session: n}}}`` (empty levels omitted)."""
+        return {
+            priority: {
+                name: {session: len(lane.items) for session, lane in tenant.sessions.items()}
+                for name, tenant in tenants.items()
+            }
+            for priority, tenants in self._classes.items()
+            if tenants
+        }
+
+    def publish(self, provider: str, model: str) -> None:
+        """Export per-class, per-tenant queue depth; groups that drained are reset to 0."""
+        current = {
+            (priority, name): sum(len(lane.items) for lane in tenant.sessions.values())
+            for priority, tenants in self._classes.items()
+            for name, tenant in tenants.items()
+        }
+        for priority, tenant_name in self._published - set(current):
+            _SCHED_DEPTH.set(0, provider=provider, model=model, priority=priority, tenant=tenant_name)
+        for (priority, tenant_name), depth in current.items():
+            _SCHED_DEPTH.set(depth, provider=provider, model=model, priority=priority, tenant=tenant_name)
+        self._published = set(current)
+
+
+def observe_wait(provider: str, model: str, flow: Flow, seconds: float) -> None:
+    _SCHED_WAIT.observe(seconds, provider=provider, model=model, priority=flow.priority, tenant=flow.tenant)
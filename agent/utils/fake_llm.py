@@ -0,0 +1,346 @@
+"""
+Fake LLM Provider
+
+Deterministic, offline chat model selected with ``LLM_PROVIDER=fake``. It answers
+the planner, teacher and quizzer prompts with schema-valid output derived from
+the prompt itself, and can inject latency, 429/503 errors and malformed output
+at configurable rates so retries, repair paths and load tests run without a key
+or network.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Optional, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from pydantic import PrivateAttr
+
+
+class FakeLLMError(Exception):
+    """Injected provider error; mimics SDK errors by carrying ``status_code`` and ``response``."""
+
+    def __init__(self, message: str, status_code: int, headers: Optional[dict[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+_PLAN_MARKER = "numbered learning-path list"
+_QUIZ_RE = re.compile(r'quiz with (\d+) questions about "([^"]+)"(?: at (\w+) level)?')
+_TEACH_RE = re.compile(r'lesson for the concept "([^"]+)"(?: at (\w+) level)?')
+_TOPIC_RE = re.compile(r'Break down the topic "([^"]+)"')
+_MAX_CONCEPTS_RE = re.compile(r"up to (\d+)")
+_MATERIAL_RE = re.compile(r"--- BEGIN [A-Z -]*STUDY MATERIAL ---\n(.*?)\n--- END", re.DOTALL)
+_MATERIAL_PREFIX_RE = re.compile(r"--- BEGIN [A-Z -]*STUDY MATERIAL ---\n.*?\n--- END [A-Z -]*STUDY MATERIAL ---\n*", re.DOTALL)
+_HEADING_RE = re.compile(r"^#{1,6}\s+(.+)$", re.MULTILINE)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _material(prompt: str) -> str:
+    m = _MATERIAL_RE.search(prompt)
+    return m.group(1).strip() if m else ""
+
+
+def _split_prefix(prompt: str) -> tuple[str, str]:
+    """Split a prompt into its leading material block (the cacheable prefix) and the instructions."""
+    m = _MATERIAL_PREFIX_RE.match(prompt)
+    return (prompt[: m.end()], prompt[m.end():]) if m else ("", prompt)
+
+
+def _stable_index(text: str, modulo: int) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) % modulo
+
+
+def _material_phrases(material: str, limit: int) -> list[str]:
+    """Pick concept-like phrases from uploaded material: headings first, then leading words of lines."""
+    phrases: list[str] = []
+    for heading in _HEADING_RE.findall(material):
+        phrases.append(heading.strip()[:60])
+    for line in material.splitlines():
+        words = re.findall(r"[A-Za-z][A-Za-z0-9-]*", line)
+        if len(words) >= 2:
+            phrases.append(" ".join(words[:4]).title())
+    unique = list(dict.fromkeys(p for p in phrases if p))
+    return unique[:limit]
+
+
+def _plan_text(prompt: str) -> str:
+    instructions = _split_prefix(prompt)[1]
+    max_m = _MAX_CONCEPTS_RE.search(instructions)
+    limit = max(1, int(max_m.group(1))) if max_m else 5
+    concepts = _material_phrases(_material(prompt), limit)
+    if not concepts:
+        topic_m = _TOPIC_RE.search(instructions)
+        topic = topic_m.group(1) if topic_m else "The Topic"
+        stems = ("Introduction to", "Core Ideas of", "Working with", "Patterns in", "Advanced", "Applying")
+        concepts = [f"{stems[i % len(stems)]} {topic}" + (f" {i // len(stems) + 1}" if i >= len(stems) else "")
+                    for i in range(min(limit, 5))]
+    return "\n".join(f"{i}. {name}" for i, name in enumerate(concepts, start=1))
+
+
+def _teach_payload(prompt: str) -> dict[str, Any]:
+    m = _TEACH_RE.search(_split_prefix(prompt)[1])
+    concept = m.group(1) if m else "this concept"
+    level = (m.group(2) if m and m.group(2) else "beginner").lower()
+    material = _material(prompt)
+    grounding = material.splitlines()[0][:200] if material else f"{concept} is a building block worth learning well."
+    explanation = (
+        f"## Introduction\n\n{concept} explained at the {level} level.\n\n"
+        f"## Core Explanation\n\n{grounding}\n\n"
+        f"Think of {concept} as one idea you can name, recognise and apply.\n\n"
+        f"## Examples\n\n- A small, concrete use of {concept}.\n- A common mistake and how to avoid it."
+    )
+    return {
+        "explanation": explanation,
+        "takeaways": [f"{concept} has a clear purpose.", f"Practice {concept} with small examples."],
+    }
+
+
+def _quiz_payload(prompt: str) -> dict[str, Any]:
+    m = _QUIZ_RE.search(_split_prefix(prompt)[1])
+    count = int(m.group(1)) if m else 3
+    concept = m.group(2) if m else "the concept"
+    level = (m.group(3) if m and m.group(3) else "beginner").lower()
+    questions = []
+    for n in range(1, count + 1):
+        correct = f"The defining property of {concept} (#{n})"
+        options = [f"An unrelated detail (#{n}.{k})" for k in range(1, 4)]
+        options.insert(_stable_index(f"{concept}:{n}", 4), correct)
+        questions.append(
+            {
+                "question_number": n,
+                "question_type": "multiple_choice",
+                "question": f"Which statement best describes {concept}? ({n})",
+                "options": options,
+                "correct_answer": correct,
+                "explanation": f"{concept} is characterised by its defining property.",
+            }
+        )
+    return {"concept_name": concept, "difficulty_level": level, "questions": questions, "total_questions": count}
+
+
+def _malformed(kind: str, good: str, rng: random.Random) -> str:
+    if kind == "plan":
+        return "Here are a few things you could study: " + ", ".join(
+            line.split(". ", 1)[-1] for line in good.splitlines()
+        )
+    if kind == "teach":
+        data = json.loads(good)
+        if rng.random() < 0.5:
+            return '{"explanation": """' + data["explanation"] + '""", "takeaways": ' + json.dumps(data["takeaways"]) + "}"
+        return good[: max(1, len(good) // 2)]
+    if kind == "quiz":
+        data = json.loads(good)
+        for q in data["questions"]:
+            q["options"] = None
+        return "Sure! Here is your quiz:\n" + json.dumps(data)
+    return good[: max(1, len(good) // 2)]
+
+
+def _respond(prompt: str) -> tuple[str, str]:
+    """Return (kind, well-formed completion) for a prompt."""
+    instructions = _split_prefix(prompt)[1]
+    if _PLAN_MARKER in instructions:
+        return "plan", _plan_text(prompt)
+    if _QUIZ_RE.search(instructions):
+        return "quiz", json.dumps(_quiz_payload(prompt), indent=2)
+    if _TEACH_RE.search(instructions):
+        return "teach", json.dumps(_teach_payload(prompt))
+    return "other", f"Fake response to: {prompt[:200]}"
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline chat model with latency and fault injection.
+
+    Latency per call is ``latency_ms * exp(latency_sigma * N(0, 1))`` (log-normal around
+    the median) plus ``completion_tokens / tokens_per_second``. Fault rates are
+    probabilities per call; faults and latency draw from one RNG seeded with ``seed``.
+    ``max_tokens`` and ``stop`` (client-wide or per call) cut the completion the way
+    providers do, reporting ``finish_reason`` ``length`` or ``stop``. A leading
+    study-material block already seen by this model is reported as cached prompt
+    tokens (``input_token_details.cache_read``), like a provider prefix cache.
+    """
+
+    model_name: str = "fake-model"
+    temperature: float = 0.7
+    latency_ms: float = 0.0
+    latency_sigma: float = 0.0
+    tokens_per_second: float = 0.0
+    rate_limit_rate: float = 0.0
+    unavailable_rate: float = 0.0
+    malformed_rate: float = 0.0
+    retry_after: float = 1.0
+    max_tokens: Optional[int] = None
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _prefixes: set[str] = PrivateAttr(default_factory=set)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def from_env(
+        cls, model: str = "fake-model", temperature: float = 0.7, max_tokens: Optional[int] = None
+    ) -> "FakeChatModel":
+        return cls(
+            model_name=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            latency_ms=_env_float("FAKE_LLM_LATENCY_MS", 0.0),
+            latency_sigma=_env_float("FAKE_LLM_LATENCY_SIGMA", 0.0),
+            tokens_per_second=_env_float("FAKE_LLM_TOKENS_PER_SECOND", 0.0),
+            rate_limit_rate=_env_float("FAKE_LLM_RATE_LIMIT_RATE", 0.0),
+            unavailable_rate=_env_float("FAKE_LLM_UNAVAILABLE_RATE", 0.0),
+            malformed_rate=_env_float("FAKE_LLM_MALFORMED_RATE", 0.0),
+            retry_after=_env_float("FAKE_LLM_RETRY_AFTER", 1.0),
+            seed=int(_env_float("FAKE_LLM_SEED", 0)),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model_name": self.model_name, "temperature": self.temperature}
+
+    def bind_tools(
+        self,
+        tools: Sequence[dict[str, Any] | type | Callable | BaseTool],
+        *,
+        tool_choice: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        # The fake never emits tool calls; binding is accepted so agent wiring works offline.
+        return self
+
+    def _plan_call(
+        self, prompt: str, max_tokens: Optional[int] = None, stop: Optional[list[str]] = None
+    ) -> tuple[float, Optional[FakeLLMError], str, int, str]:
+        """Draw latency, fault and completion for one call.
+
+        Returns ``(delay_s, error, text, completion_tokens, finish_reason)``.
+        """
+        kind, text = _respond(prompt)
+        with self._lock:
+            noise = self._rng.gauss(0.0, 1.0)
+            fault_draw = self._rng.random()
+            malformed_draw = self._rng.random()
+            if malformed_draw < self.malformed_rate:
+                text = _malformed(kind, text, self._rng)
+
+        for marker in stop or ():
+            if marker and marker in text:
+                text = text[: text.index(marker)]
+        finish_reason = "stop"
+        max_tokens = max_tokens if max_tokens is not None else self.max_tokens
+        if max_tokens is not None and len(text) > max_tokens * 4:
+            text, finish_reason = text[: max_tokens * 4], "length"
+
+        completion_tokens = max(1, len(text) // 4)
+        delay = self.latency_ms / 1000.0 * math.exp(self.latency_sigma * noise)
+        if self.tokens_per_second > 0:
+            delay += completion_tokens / self.tokens_per_second
+
+        error: Optional[FakeLLMError] = None
+        if fault_draw < self.rate_limit_rate:
+            error = FakeLLMError(
+                "Error code: 429 - rate limit exceeded (fake provider)",
+                429,
+                {"retry-after": f"{self.retry_after:g}"},
+            )
+            delay = min(delay, 0.05)
+        elif fault_draw < self.rate_limit_rate + self.unavailable_rate:
+            error = FakeLLMError("Error code: 503 - service temporarily unavailable (fake provider)", 503)
+        return delay, error, text, completion_tokens, finish_reason
+
+    @staticmethod
+    def _within_timeout(
+        delay: float, error: Optional[FakeLLMError], timeout: Optional[float]
+    ) -> tuple[float, Optional[FakeLLMError]]:
+        """Honour a per-request ``timeout`` kwarg the way the provider SDKs do."""
+        if timeout is None or delay <= timeout:
+            return delay, error
+        return float(timeout), FakeLLMError("Request timed out (fake provider)", 408)
+
+    def _cached_tokens(self, prompt: str) -> int:
+        prefix = _split_prefix(prompt)[0]
+        if not prefix:
+            return 0
+        digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self._lock:
+            if digest in self._prefixes:
+                return len(prefix) // 4
+            self._prefixes.add(digest)
+        return 0
+
+    def _result(self, prompt: str, text: str, completion_tokens: int, finish_reason: str) -> ChatResult:
+        prompt_tokens = max(1, len(prompt) // 4)
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "input_token_details": {"cache_read": self._cached_tokens(prompt)},
+            },
+            response_metadata={"model_name": self.model_name, "finish_reason": finish_reason},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _prompt_text(messages: list[BaseMessage]) -> str:
+        return "\n".join(str(m.content) for m in messages)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        delay, error, text, completion_tokens, finish_reason = self._plan_call(prompt, kwargs.get("max_tokens"), stop)
+        delay, error = self._within_timeout(delay, error, kwargs.get("timeout"))
+        if delay > 0:
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        return self._result(prompt, text, completion_tokens, finish_reason)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        delay, error, text, completion_tokens, finish_reason = self._plan_call(prompt, kwargs.get("max_tokens"), stop)
+        delay, error = self._within_timeout(delay, error, kwargs.get("timeout"))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return self._result(prompt, text, completion_tokens, finish_reason)
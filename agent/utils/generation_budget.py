@@ -0,0 +1,122 @@
+"""
+Generation Budgets
+
+Per-tool output caps for LLM calls: ``max_tokens`` and stop sequences. Tools
+whose output grows with a count (concepts in a learning path, questions in a
+quiz) get ``base_tokens + tokens_per_item * items`` instead of a fixed cap, so
+a five-concept plan is not allowed the tokens of a twenty-concept one. Defaults
+below can be overridden per tool with ``LLM_GENERATION_BUDGETS`` (JSON object)
+and switched off with ``LLM_GENERATION_BUDGETS_ENABLED=false``.
+
+Example::
+
+    LLM_GENERATION_BUDGETS='{
+      "teach_concept": {"max_tokens": 1200},
+      "generate_quiz": {"base_tokens": 100, "tokens_per_item": 200, "max_tokens": 2000}
+    }'
+
+Calls that stop on ``finish_reason == "length"`` are counted in
+``llm_truncated_total``, and ``llm_completion_budget_ratio`` shows how much of
+each cap is used, so budgets can be tightened (or loosened) from ``/metrics``.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, fields, replace
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ToolBudget:
+    max_tokens: Optional[int] = None
+    base_tokens: int = 0
+    tokens_per_item: int = 0
+    stop: tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], base: Optional["ToolBudget"] = None) -> "ToolBudget":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"unknown budget keys: {', '.join(sorted(unknown))}")
+        values = dict(data)
+        if "stop" in values:
+            values["stop"] = tuple(str(s) for s in values["stop"] or ())
+        return replace(base or cls(), **values)
+
+    def limit(self, items: Optional[int] = None) -> Optional[int]:
+        """Token cap for a call producing *items* entries (the fixed cap when unknown)."""
+        if items is None or not self.tokens_per_item:
+            return self.max_tokens
+        scaled = self.base_tokens + self.tokens_per_item * max(1, items)
+        return min(scaled, self.max_tokens) if self.max_tokens is not None else scaled
+
+
+# Sized from observed completions: a concept line is ~10 tokens, a multiple-choice
+# question with options and explanation ~150, a lesson rarely needs more than ~1.5k.
+DEFAULT_BUDGETS: dict[str, ToolBudget] = {
+    "plan_learning_path": ToolBudget(max_tokens=512, base_tokens=32, tokens_per_item=24),
+    "teach_concept": ToolBudget(max_tokens=2048),
+    "generate_quiz": ToolBudget(max_tokens=4096, base_tokens=150, tokens_per_item=250),
+}
+# No default quiz stop: the only text that reliably ends the quiz is its closing brace,
+# and providers drop the stop string from the output, which would leave invalid JSON.
+# Rambling after the JSON is bounded by the per-question cap and ignored by the parser.
+
+
+def parse_budgets(spec: str, defaults: Optional[dict[str, ToolBudget]] = None) -> dict[str, ToolBudget]:
+    """Overlay a JSON object of per-tool budgets on *defaults*; malformed input is logged and ignored."""
+    budgets = dict(DEFAULT_BUDGETS if defaults is None else defaults)
+    if not spec.strip():
+        return budgets
+    try:
+        raw = json.loads(spec)
+        if not isinstance(raw, dict):
+            raise ValueError("expected a JSON object keyed by tool name")
+        overlay = {str(tool): ToolBudget.from_dict(entry, budgets.get(str(tool))) for tool, entry in raw.items()}
+    except (ValueError, TypeError) as exc:
+        logger.warning("Ignoring malformed LLM_GENERATION_BUDGETS: %s", exc)
+        return budgets
+    budgets.update(overlay)
+    return budgets
+
+
+class BudgetTable:
+    def __init__(self, budgets: Optional[dict[str, ToolBudget]] = None, enabled: bool = True) -> None:
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls) -> "BudgetTable":
+        enabled = os.getenv("LLM_GENERATION_BUDGETS_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        return cls(parse_budgets(os.getenv("LLM_GENERATION_BUDGETS", "")), enabled=enabled)
+
+    def kwargs(self, tool: Optional[str], items: Optional[int] = None) -> dict[str, Any]:
+        """Generation kwargs (``max_tokens``, ``stop``) for one call to *tool*."""
+        budget = self.budgets.get(tool or "") if self.enabled else None
+        if budget is None:
+            return {}
+        params: dict[str, Any] = {}
+        limit = budget.limit(items)
+        if limit is not None:
+            params["max_tokens"] = limit
+        if budget.stop:
+            params["stop"] = list(budget.stop)
+        return params
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "tools": {
+                tool: {
+                    "max_tokens": b.max_tokens,
+                    "base_tokens": b.base_tokens,
+                    "tokens_per_item": b.tokens_per_item,
+                    "stop": list(b.stop),
+                }
+                for tool, b in self.budgets.items()
+            },
+        }
@@ -0,0 +1,261 @@
+"""
+Request Hedging
+
+Tail-latency insurance for LLM calls. When a call has not returned after a
+rolling percentile of recent latency for its model (p90 by default), a
+duplicate request is sent — to another API key or a configured hedge model when
+available. The first valid response wins. Async calls cancel the other
+request; sync calls race both requests off the caller's thread (the primary on
+its own thread, the duplicate on a small pool) and drop the loser's result,
+since a blocking call cannot be interrupted. A retry-budget style token bucket
+caps the fraction of calls that may be hedged. When no response is usable, the primary's own outcome is returned or
+raised, exactly as without hedging.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from agent.utils.llm_metrics import get_metrics
+
+_HEDGES = get_metrics().counter(
+    "llm_hedges_total", "Hedged LLM requests by result (fired, won, lost, budget_denied).", ("result",)
+)
+
+
+@dataclass(frozen=True)
+class HedgeSettings:
+    enabled: bool = False
+    percentile: float = 0.9
+    min_delay: float = 0.05
+    min_samples: int = 20
+    window: int = 200
+    budget: float = 0.1
+    max_workers: int = 8
+
+    @classmethod
+    def from_env(cls) -> "HedgeSettings":
+        def number(name: str, default: float) -> float:
+            try:
+                return float(os.getenv(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        return cls(
+            enabled=os.getenv("LLM_HEDGE_ENABLED", "").strip().lower() in ("1", "true", "yes", "on"),
+            percentile=min(0.999, max(0.5, number("LLM_HEDGE_PERCENTILE", 0.9))),
+            min_delay=number("LLM_HEDGE_MIN_DELAY_MS", 50) / 1000.0,
+            min_samples=int(number("LLM_HEDGE_MIN_SAMPLES", 20)),
+            window=int(number("LLM_HEDGE_WINDOW", 200)),
+            budget=max(0.0, number("LLM_HEDGE_BUDGET", 0.1)),
+            max_workers=int(number("LLM_HEDGE_MAX_WORKERS", 8)),
+        )
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per key (e.g. provider/model)."""
+
+    def __init__(self, window: int = 200) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: dict[Hashable, deque[float]] = {}
+
+    def record(self, key: Hashable, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: Hashable, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        rank = max(0, math.ceil(q * len(samples)) - 1)
+        return samples[rank]
+
+
+class HedgeBudget:
+    """Each call earns ``fraction`` of a token (capped); each hedge spends one."""
+
+    def __init__(self, fraction: float, burst: float = 10.0) -> None:
+        self.fraction = fraction
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.fraction)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+def _start_thread(fn: Callable[[], Any]) -> "concurrent.futures.Future[Any]":
+    """Run *fn* on a new thread in a copy of the caller's context.
+
+    Not a pool: one thread per hedged call, so the number of concurrent sync
+    calls is not capped by ``LLM_HEDGE_MAX_WORKERS``.
+    """
+    future: concurrent.futures.Future[Any] = concurrent.futures.Future()
+    context = contextvars.copy_context()
+
+    def target() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(fn))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=target, name="llm-hedge-primary", daemon=True).start()
+    return future
+
+
+def _is_valid(result: Any) -> bool:
+    if result is None:
+        return False
+    content = getattr(result, "content", None)
+    return not (isinstance(content, str) and not content.strip() and not getattr(result, "tool_calls", None))
+
+
+class Hedger:
+    def __init__(self, settings: Optional[HedgeSettings] = None) -> None:
+        self.settings = settings or HedgeSettings.from_env()
+        self.latency = LatencyTracker(self.settings.window)
+        self.budget = HedgeBudget(self.settings.budget)
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "fired": 0, "won": 0, "lost": 0, "budget_denied": 0}
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+        if name != "calls":
+            _HEDGES.inc(result=name)
+
+    def hedge_delay(self, key: Hashable) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or there is too little history."""
+        if not self.settings.enabled:
+            return None
+        observed = self.latency.percentile(key, self.settings.percentile, self.settings.min_samples)
+        return None if observed is None else max(self.settings.min_delay, observed)
+
+    def _pool(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.settings.max_workers, thread_name_prefix="llm-hedge"
+                )
+            return self._executor
+
+    def run(self, key: Hashable, primary: Callable[[], Any], hedge: Optional[Callable[[], Any]] = None) -> Any:
+        """Sync :meth:`arun`: both requests run off the caller's thread, which takes the first valid one.
+
+        A sync call cannot be interrupted, so the losing request finishes in the
+        background and its result is dropped.
+        """
+        self._bump("calls")
+        self.budget.earn()
+        delay = self.hedge_delay(key) if hedge is not None else None
+        started = time.perf_counter()
+        if delay is None or hedge is None:
+            result = primary()
+            self.latency.record(key, time.perf_counter() - started)
+            return result
+
+        first = _start_thread(primary)
+        futures = [first]
+        done, _ = concurrent.futures.wait(futures, timeout=delay)
+        if not done and not self.budget.spend():
+            self._bump("budget_denied")
+        elif not done:
+            self._bump("fired")
+            futures.append(self._pool().submit(contextvars.copy_context().run, hedge))
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and _is_valid(future.result()):
+                    if len(futures) > 1:
+                        self._bump("lost" if future is first else "won")
+                    for other in pending:
+                        other.cancel()
+                    self.latency.record(key, time.perf_counter() - started)
+                    return future.result()
+        # Nothing usable: surface the primary's own result or error, as an unhedged call would.
+        return first.result()
+
+    async def arun(
+        self,
+        key: Hashable,
+        primary: Callable[[], Awaitable[Any]],
+        hedge: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        """Async :meth:`run`; the losing request's task is cancelled."""
+        self._bump("calls")
+        self.budget.earn()
+        delay = self.hedge_delay(key) if hedge is not None else None
+        started = time.perf_counter()
+        if delay is None or hedge is None:
+            result = await primary()
+            self.latency.record(key, time.perf_counter() - started)
+            return result
+
+        first: asyncio.Task[Any] = asyncio.ensure_future(primary())
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and not self.budget.spend():
+                self._bump("budget_denied")
+                await asyncio.wait(tasks)
+            elif not done:
+                self._bump("fired")
+                second: asyncio.Task[Any] = asyncio.ensure_future(hedge())
+                tasks.add(second)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and _is_valid(task.result()):
+                        if len(tasks) > 1:
+                            self._bump("lost" if task is first else "won")
+                        self.latency.record(key, time.perf_counter() - started)
+                        return task.result()
+            # Nothing usable: surface the primary's own result or error, as an unhedged call would.
+            return first.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        calls = counters["calls"]
+        return {
+            "enabled": self.settings.enabled,
+            "percentile": self.settings.percentile,
+            "budget": self.settings.budget,
+            **counters,
+            "hedged_fraction": round(counters["fired"] / calls, 4) if calls else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
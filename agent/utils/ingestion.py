@@ -0,0 +1,226 @@
+"""
+Ingestion Executor
+
+Runs content loaders off the event loop so a large upload does not stall every
+other request on the worker. Text, Markdown and JSON parsing is pure Python, so
+it runs in a process pool (``INGEST_EXECUTOR=process``, the default), falling
+back to threads when processes are unavailable or the pool breaks. PDFs are
+parsed on a thread because :func:`~agent.utils.content_loader.load_pdf_file`
+already spreads large documents over its own page-extraction process pool.
+
+Multi-file uploads are parsed concurrently, at most ``INGEST_FANOUT`` files per
+request. Queue depth, queue wait and parse time are exported as ``ingest_*``
+metrics.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Sequence, TypeVar, overload
+
+from agent.utils.content_loader import LoadedContent, load_content_bytes
+from agent.utils.llm_metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+_QUEUE_DEPTH = get_metrics().gauge(
+    "ingest_queue_depth", "Uploaded files submitted for parsing and not finished yet.", ("executor",)
+)
+_WAIT = get_metrics().histogram(
+    "ingest_wait_seconds", "Time an uploaded file waited for a parsing worker.", ("executor",)
+)
+_PARSE = get_metrics().histogram("ingest_parse_seconds", "Time spent parsing one uploaded file.", ("format",))
+_FILES = get_metrics().counter("ingest_files_total", "Uploaded files parsed, by format and outcome.", ("format", "outcome"))
+
+_U = TypeVar("_U")
+_T = TypeVar("_T")
+
+# Loaders that release the GIL or fan out to their own process pool run on threads.
+_THREAD_FORMATS = {".pdf"}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class IngestionSettings:
+    executor: str = "process"
+    workers: int = 4
+    fanout: int = 4
+
+    @classmethod
+    def from_env(cls) -> "IngestionSettings":
+        executor = os.getenv("INGEST_EXECUTOR", "process").strip().lower()
+        return cls(
+            executor=executor if executor in ("process", "thread") else "process",
+            workers=max(1, _env_int("INGEST_WORKERS", min(4, os.cpu_count() or 1))),
+            fanout=max(1, _env_int("INGEST_FANOUT", 4)),
+        )
+
+
+def _timed_load(data: bytes, filename: str) -> tuple[LoadedContent, float, float]:
+    """Worker side: parse and report ``(content, started_at, parse_seconds)``.
+
+    ``started_at`` is wall-clock time so the caller can measure queue wait
+    across processes.
+    """
+    started_at = time.time()
+    began = time.perf_counter()
+    content = load_content_bytes(data, filename)
+    return content, started_at, time.perf_counter() - began
+
+
+class IngestionExecutor:
+    def __init__(self, settings: Optional[IngestionSettings] = None) -> None:
+        self.settings = settings or IngestionSettings.from_env()
+        self._lock = threading.Lock()
+        self._processes: Optional[Executor] = None
+        self._threads: Optional[Executor] = None
+        self._process_failed = self.settings.executor != "process"
+        self._pending = {"process": 0, "thread": 0}
+        self._counters = {"parsed": 0, "failed": 0, "process_fallbacks": 0}
+
+    def _executor(self, kind: str) -> Executor:
+        with self._lock:
+            if kind == "process" and not self._process_failed:
+                if self._processes is None:
+                    try:
+                        self._processes = ProcessPoolExecutor(
+                            self.settings.workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                    except (OSError, NotImplementedError) as exc:
+                        logger.warning("Ingestion process pool unavailable (%s); parsing on threads", exc)
+                        self._process_failed = True
+                if self._processes is not None:
+                    return self._processes
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.settings.workers, thread_name_prefix="ingest")
+            return self._threads
+
+    def _kind_for(self, filename: str) -> str:
+        if self._process_failed or Path(filename).suffix.lower() in _THREAD_FORMATS:
+            return "thread"
+        return "process"
+
+    def _process_pool_broke(self, exc: BaseException) -> None:
+        with self._lock:
+            pool, self._processes = self._processes, None
+            self._process_failed = True
+            self._counters["process_fallbacks"] += 1
+        logger.warning("Ingestion process pool failed (%s); parsing on threads from now on", exc)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _track(self, kind: str, delta: int) -> None:
+        with self._lock:
+            self._pending[kind] += delta
+            _QUEUE_DEPTH.set(self._pending[kind], executor=kind)
+
+    async def aload(self, data: bytes, filename: str) -> LoadedContent:
+        """Parse one upload on the ingestion executor without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        fmt = Path(filename).suffix.lower().lstrip(".") or "unknown"
+        kind = self._kind_for(filename)
+        submitted = time.time()
+        self._track(kind, 1)
+        try:
+            try:
+                content, started_at, parse_seconds = await loop.run_in_executor(
+                    self._executor(kind), _timed_load, data, filename
+                )
+            except BrokenProcessPool as exc:
+                self._process_pool_broke(exc)
+                self._track(kind, -1)
+                kind = "thread"
+                self._track(kind, 1)
+                content, started_at, parse_seconds = await loop.run_in_executor(
+                    self._executor(kind), _timed_load, data, filename
+                )
+        except Exception:
+            with self._lock:
+                self._counters["failed"] += 1
+            _FILES.inc(format=fmt, outcome="error")
+            raise
+        finally:
+            self._track(kind, -1)
+        _WAIT.observe(max(0.0, started_at - submitted), executor=kind)
+        _PARSE.observe(parse_seconds, format=fmt)
+        _FILES.inc(format=fmt, outcome="ok")
+        with self._lock:
+            self._counters["parsed"] += 1
+        return content
+
+    @overload
+    async def aload_many(
+        self, uploads: Sequence[tuple[bytes, str]], fanout: Optional[int] = None
+    ) -> list[LoadedContent]: ...
+
+    @overload
+    async def aload_many(
+        self, uploads: Sequence[_U], fanout: Optional[int] = None, *, load: Callable[[_U], Awaitable[_T]]
+    ) -> list[_T]: ...
+
+    async def aload_many(
+        self, uploads: Sequence[Any], fanout: Optional[int] = None, *, load: Optional[Callable[[Any], Awaitable[Any]]] = None
+    ) -> list[Any]:
+        """Parse several uploads concurrently (at most *fanout* at once); results keep the input order.
+
+        Each ``(data, filename)`` pair goes to :meth:`aload`, or each upload to
+        *load* when given (the web API routes them through the parsed-content cache).
+        """
+        gate = asyncio.Semaphore(fanout or self.settings.fanout)
+
+        async def one(upload: Any) -> Any:
+            async with gate:
+                return await (load(upload) if load is not None else self.aload(*upload))
+
+        return list(await asyncio.gather(*(one(upload) for upload in uploads)))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pools = [self._processes, self._threads]
+            self._processes = self._threads = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "executor": "thread" if self._process_failed else self.settings.executor,
+                "workers": self.settings.workers,
+                "fanout": self.settings.fanout,
+                "queue_depth": dict(self._pending),
+                **self._counters,
+            }
+
+
+_EXECUTOR: Optional[IngestionExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_ingestion_executor() -> IngestionExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = IngestionExecutor()
+        return _EXECUTOR
+
+
+def shutdown_ingestion_executor() -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        executor.shutdown()
@@ -0,0 +1,212 @@
+"""
+API Key Pool
+
+Spreads LLM traffic across several API keys for one provider (``GROQ_API_KEYS=k1,k2``).
+Keys are picked least-loaded (fewest in-flight requests, then most remaining
+quota) or round-robin; each key's remaining quota is tracked from
+``x-ratelimit-*`` response headers, and a key that answers 401/429 or runs out of
+quota is ejected until its cool-down or reset time passes.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Any, Mapping, Optional, Sequence
+
+# Requests without a response after this long (e.g. transport errors, which never
+# reach the response hook) stop counting towards a key's load.
+_STALE_IN_FLIGHT_SECONDS = 120.0
+
+
+def key_id(api_key: str) -> str:
+    """Stable, non-secret identifier for a key (safe for logs, stats and cache keys)."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_reset_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse ``retry-after`` / ``x-ratelimit-reset-*`` values such as ``7.66s``, ``2m59.5s`` or ``12``."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(num) * scale[unit] for num, unit in parts)
+
+
+class _KeyState:
+    def __init__(self, api_key: str) -> None:
+        self.api_key = api_key
+        self.id = key_id(api_key)
+        self.in_flight: dict[int, float] = {}
+        self.selected = 0
+        self.responses = 0
+        self.remaining_requests: Optional[float] = None
+        self.remaining_tokens: Optional[float] = None
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.last_status: Optional[int] = None
+
+    def load(self, now: float) -> int:
+        for rid, started in list(self.in_flight.items()):
+            if now - started > _STALE_IN_FLIGHT_SECONDS:
+                del self.in_flight[rid]
+        return len(self.in_flight)
+
+
+class APIKeyPool:
+    """Thread-safe key selection and health tracking for one provider."""
+
+    def __init__(
+        self,
+        keys: Sequence[str],
+        strategy: str = "least_loaded",
+        eject_seconds: float = 30.0,
+        auth_eject_seconds: float = 300.0,
+    ) -> None:
+        unique = list(dict.fromkeys(k.strip() for k in keys if k and k.strip()))
+        if not unique:
+            raise ValueError("APIKeyPool needs at least one API key")
+        if strategy not in ("least_loaded", "round_robin"):
+            raise ValueError(f"Unknown key selection strategy: {strategy!r}")
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self.auth_eject_seconds = auth_eject_seconds
+        self._lock = threading.Lock()
+        self._keys = [_KeyState(k) for k in unique]
+        self._by_id = {state.id: state for state in self._keys}
+        self._cursor = 0
+
+    @classmethod
+    def from_env(cls, env_var: str) -> Optional["APIKeyPool"]:
+        """Build a pool from ``<ENV_VAR>S`` (comma-separated) or ``<ENV_VAR>``; None if neither is set."""
+        raw = os.getenv(f"{env_var}S", "") or os.getenv(env_var, "")
+        keys = [k for k in raw.split(",") if k.strip()]
+        if not keys:
+            return None
+        return cls(
+            keys,
+            strategy=os.getenv("LLM_KEY_STRATEGY", "least_loaded").strip().lower() or "least_loaded",
+            eject_seconds=float(os.getenv("LLM_KEY_EJECT_SECONDS", "") or 30),
+            auth_eject_seconds=float(os.getenv("LLM_KEY_AUTH_EJECT_SECONDS", "") or 300),
+        )
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def acquire(self, api_key: Optional[str] = None) -> str:
+        """Pick a key and count it as selected; with *api_key* (from :meth:`choose`), count that one."""
+        with self._lock:
+            chosen = self._by_id.get(key_id(api_key)) if api_key is not None else None
+            if chosen is None:
+                chosen = self._choose_locked()
+            chosen.selected += 1
+            return chosen.api_key
+
+    def choose(self) -> str:
+        """Pick a key like :meth:`acquire` without counting it (e.g. to look up a client built for it)."""
+        with self._lock:
+            return self._choose_locked().api_key
+
+    def _choose_locked(self) -> _KeyState:
+        """Ejected keys are skipped unless every key is ejected."""
+        now = time.monotonic()
+        healthy = [s for s in self._keys if s.ejected_until <= now]
+        if not healthy:
+            # Everything is cooling down: use the key that recovers first.
+            chosen = min(self._keys, key=lambda s: s.ejected_until)
+        elif self.strategy == "round_robin":
+            order = self._keys[self._cursor:] + self._keys[: self._cursor]
+            chosen = next(s for s in order if s.ejected_until <= now)
+            self._cursor = (self._keys.index(chosen) + 1) % len(self._keys)
+        else:
+            chosen = min(
+                healthy,
+                key=lambda s: (
+                    s.load(now),
+                    -(s.remaining_requests if s.remaining_requests is not None else float("inf")),
+                    s.selected,
+                ),
+            )
+        return chosen
+
+    def available(self) -> int:
+        """Number of keys not currently ejected."""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for s in self._keys if s.ejected_until <= now)
+
+    def owns(self, kid: str) -> bool:
+        return kid in self._by_id
+
+    def request_started(self, kid: str, request_id: int) -> None:
+        with self._lock:
+            state = self._by_id.get(kid)
+            if state is not None:
+                state.in_flight[request_id] = time.monotonic()
+
+    def observe(self, kid: str, request_id: int, status_code: int, headers: Mapping[str, str]) -> None:
+        """Record a response for a key: release its in-flight slot, update quota, eject if unhealthy."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._by_id.get(kid)
+            if state is None:
+                return
+            state.in_flight.pop(request_id, None)
+            state.responses += 1
+            state.last_status = status_code
+
+            eject_for = 0.0
+            for kind in ("requests", "tokens"):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                try:
+                    left = float(remaining)
+                except ValueError:
+                    continue
+                setattr(state, f"remaining_{kind}", left)
+                if left <= 0:
+                    eject_for = max(eject_for, parse_reset_seconds(headers.get(f"x-ratelimit-reset-{kind}")) or 0.0)
+
+            if status_code == 401:
+                eject_for = max(eject_for, self.auth_eject_seconds)
+            elif status_code == 429:
+                eject_for = max(eject_for, parse_reset_seconds(headers.get("retry-after")) or self.eject_seconds)
+
+            if eject_for > 0:
+                if state.ejected_until <= now:
+                    state.ejections += 1
+                state.ejected_until = max(state.ejected_until, now + eject_for)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "keys": len(self._keys),
+                "available": sum(1 for s in self._keys if s.ejected_until <= now),
+                "per_key": {
+                    s.id: {
+                        "in_flight": s.load(now),
+                        "selected": s.selected,
+                        "responses": s.responses,
+                        "remaining_requests": s.remaining_requests,
+                        "remaining_tokens": s.remaining_tokens,
+                        "ejected_for": round(max(0.0, s.ejected_until - now), 3),
+                        "ejections": s.ejections,
+                        "last_status": s.last_status,
+                    }
+                    for s in self._keys
+                },
+            }
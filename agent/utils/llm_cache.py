@@ -0,0 +1,191 @@
+"""
+LLM Response Cache
+
+Content-addressed, disk-backed cache for LLM completions. Entries are keyed by a
+SHA-256 of (provider, model, temperature, prompt) and stored in a local SQLite
+file with a TTL, an entry/byte size cap and least-recently-used eviction.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = ".cache/llm_responses.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    temperature: Optional[float],
+    prompt: str,
+    params: Optional[dict[str, Any]] = None,
+) -> str:
+    """Return the content address for a completion request.
+
+    *params* are generation settings that change the output (``max_tokens``,
+    ``stop``); keys without them are unchanged, so existing entries stay valid.
+    """
+    fields: list[Any] = [provider, model, temperature, prompt]
+    if params:
+        fields.append(params)
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed response cache with TTL expiry and LRU eviction.
+
+    A single connection is shared across threads behind a lock; WAL mode keeps
+    concurrent readers in other processes from blocking writers.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = 86_400.0,
+        max_entries: int = 5_000,
+        max_bytes: int = 100 * 1024 * 1024,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "expirations": 0}
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "LLMResponseCache":
+        return cls(
+            path=os.getenv("LLM_CACHE_PATH", "").strip() or DEFAULT_CACHE_PATH,
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "") or 86_400),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "") or 5_000),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", "") or 100 * 1024 * 1024),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion for *key*, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            value, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._counters["hits"] += 1
+            return str(value)
+
+    def put(self, key: str, value: str) -> None:
+        """Store a completion and evict least-recently-used entries over the caps."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._counters["writes"] += 1
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        excess_entries = max(0, count - self.max_entries)
+        excess_bytes = max(0, total - self.max_bytes)
+        if not excess_entries and not excess_bytes:
+            return
+
+        victims: list[str] = []
+        freed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+            if len(victims) >= excess_entries and freed >= excess_bytes:
+                break
+            victims.append(key)
+            freed += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in victims])
+        self._counters["evictions"] += len(victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "entries": count,
+            "bytes": total,
+            "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "path": self.path,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[LLMResponseCache] = None
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Return the process-wide cache, or None when ``LLM_CACHE_ENABLED`` is off."""
+    global _cache
+    if os.getenv("LLM_CACHE_ENABLED", "").strip().lower() not in ("1", "true", "yes", "on"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache.from_env()
+            logger.info("LLM response cache enabled at %s", _cache.path)
+        return _cache
+
+
+def close_response_cache() -> None:
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
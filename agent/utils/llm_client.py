@@ -1,15 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+import json
 import logging
 import os
+import random
+import threading
 import time
-from typing import Any, Callable, Optional, TypeVar, Union
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional, TypeVar, Union
 
 import httpx
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+
+from agent.utils.adaptive_limiter import AdaptiveLimiter, ConcurrencyLimitError, LimiterBoard
+from agent.utils.circuit_breaker import BreakerBoard, CircuitBreaker, CircuitOpenError
+from agent.utils.deadline import (
+    DeadlineExceededError,
+    check_deadline,
+    current_deadline,
+    remaining,
+    within_deadline,
+)
+from agent.utils.generation_budget import BudgetTable
+from agent.utils.hedging import Hedger
+from agent.utils.key_pool import APIKeyPool, key_id
+from agent.utils.key_pool import parse_reset_seconds as _parse_reset_seconds
+from agent.utils.llm_cache import get_response_cache, make_cache_key
+from agent.utils.llm_metrics import LLMCallRecord, record_cache_hit, usage_tokens
+from agent.utils.micro_batcher import MicroBatcher
+from agent.utils.model_router import ModelRouter, Route
+from agent.utils.single_flight import SingleFlight
 
 load_dotenv()
 
+if TYPE_CHECKING:
+    # Provider SDKs are imported inside initialize_llm, on first use of a provider.
+    from langchain_core.messages import AIMessage
+    from langchain_groq import ChatGroq
+    from langchain_openai import ChatOpenAI
+
+    from agent.utils.fake_llm import FakeChatModel
+    from agent.utils.openai_compatible import ChatOpenAICompatible
+
+    ChatClient = Union[ChatGroq, ChatOpenAI, ChatOpenAICompatible, FakeChatModel, "DirectChatClient"]
+
 logger = logging.getLogger(__name__)
 
 F = TypeVar("F", bound=Callable[..., Any])
@@ -32,45 +67,1197 @@ _RETRYABLE_SUBSTRINGS = (
 )
 
 
+_RATE_LIMIT_SUBSTRINGS = ("rate limit", "ratelimit", "429")
+
+# Upper bound for a single backoff sleep, and for how long a server-supplied
+# Retry-After may make us wait before we give up instead of sleeping.
+_MAX_BACKOFF_DELAY = 8.0
+_MAX_RETRY_AFTER = 10.0
+
+
 def _is_retryable(exc: Exception) -> bool:
     msg = str(exc).lower()
     return any(s in msg for s in _RETRYABLE_SUBSTRINGS)
 
 
+def _is_rate_limited(exc: Exception) -> bool:
+    msg = str(exc).lower()
+    return any(s in msg for s in _RATE_LIMIT_SUBSTRINGS)
+
+
+def _retry_after_hint(exc: Exception) -> Optional[float]:
+    """Return the server's Retry-After (seconds) from a provider SDK error, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is None:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
+    return _parse_reset_seconds(headers.get("retry-after"))
+
+
+def _retry_delay(exc: Exception, base_delay: float, attempt: int) -> Optional[float]:
+    """Full-jitter exponential backoff, or the server hint when one is supplied.
+
+    Returns None when the server asks us to wait longer than ``_MAX_RETRY_AFTER``:
+    sleeping that long would only inflate tail latency, so the caller gives up.
+    """
+    hint = _retry_after_hint(exc)
+    if hint is not None:
+        if hint > _env_float("LLM_RETRY_AFTER_MAX", _MAX_RETRY_AFTER):
+            return None
+        return hint + random.uniform(0, min(1.0, base_delay / 4))
+    ceiling = min(_MAX_BACKOFF_DELAY, base_delay * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+@dataclass(frozen=True)
+class LLMTarget:
+    """Identity of the chat model behind a bound ``llm.invoke`` / ``llm.ainvoke``."""
+
+    provider: str
+    model: str
+    temperature: Optional[float]
+
+
+def _llm_target(fn: Callable[..., Any]) -> Optional[LLMTarget]:
+    llm = getattr(fn, "__self__", None)
+    if llm is None:
+        return None
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    if not isinstance(model, str):
+        return None
+    llm_type = str(getattr(llm, "_llm_type", "") or type(llm).__name__).lower()
+    provider = llm_type.split("-", 1)[0]
+    temperature = getattr(llm, "temperature", None)
+    return LLMTarget(provider, model, float(temperature) if temperature is not None else None)
+
+
+_GENERATION_KWARGS = ("max_tokens", "stop")
+
+
+def _prompt_fingerprint(fn: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]) -> Optional[str]:
+    """Content address of a call: a single string prompt sent to a known model.
+
+    Used both as the response-cache key and as the single-flight coalescing key.
+    Generation budgets (``max_tokens``, ``stop``) are part of the address; any
+    other kwarg makes the call unaddressable.
+    """
+    if set(kwargs) - set(_GENERATION_KWARGS) or len(args) != 1 or not isinstance(args[0], str):
+        return None
+    target = _llm_target(fn)
+    if target is None:
+        return None
+    return make_cache_key(target.provider, target.model, target.temperature, args[0], kwargs)
+
+
+_IN_FLIGHT = SingleFlight()
+
+
+def _coalescing_enabled() -> bool:
+    return _env_flag("LLM_COALESCE_ENABLED", default=True)
+
+
+def _coalescing_key(key: Optional[str], cache: bool) -> Optional[str]:
+    """Single-flight key for a call, or ``None`` when it must run on its own.
+
+    ``cache=False`` callers want a fresh completion, so they never share one. The
+    shared call runs under its leader's deadline, so only callers with the same
+    deadline share it; a follower with more time left never inherits the
+    leader's :class:`DeadlineExceededError`.
+    """
+    if key is None or not cache or not _coalescing_enabled():
+        return None
+    deadline = current_deadline()
+    return key if deadline is None else f"{key}@{deadline!r}"
+
+
+def coalescing_stats() -> dict[str, Any]:
+    return _IN_FLIGHT.stats()
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaking and provider failover
+# ---------------------------------------------------------------------------
+
+_BREAKERS = BreakerBoard()
+_DEFAULT_MODELS = {"groq": "llama-3.1-8b-instant", "openai": "gpt-4", "fake": "fake-model"}
+
+
+def circuit_breaker_stats() -> dict[str, Any]:
+    return _BREAKERS.stats()
+
+
+def _registry_client(provider: str, model: str, temperature: Optional[float]) -> ChatClient:
+    """Pooled client for *provider*/*model*; an unknown temperature uses the registry default."""
+    return _REGISTRY.get(provider=provider, model=model, temperature=temperature if temperature is not None else 0.7)
+
+
+@dataclass(frozen=True)
+class _Attempt:
+    fn: Callable[..., Any]
+    target: Optional[LLMTarget]
+    breaker: Optional[CircuitBreaker]
+    fallback: bool = False
+
+
+def _fallback_for(fn: Callable[..., Any], target: LLMTarget) -> Optional[_Attempt]:
+    """Resolve the configured fallback (``LLM_FALLBACK_PROVIDER`` / ``LLM_FALLBACK_MODEL``)."""
+    provider = os.getenv("LLM_FALLBACK_PROVIDER", "").strip().lower()
+    model = os.getenv("LLM_FALLBACK_MODEL", "").strip()
+    if not provider and not model:
+        return None
+    provider = provider or target.provider
+    model = model or _DEFAULT_MODELS.get(provider, target.model)
+    if (provider, model) == (target.provider, target.model):
+        return None
+    try:
+        llm = _registry_client(provider, model, target.temperature)
+    except LLMConfigError as exc:
+        logger.warning("LLM fallback %s/%s unavailable: %s", provider, model, exc)
+        return None
+    method = getattr(llm, getattr(fn, "__name__", "invoke"), None)
+    if method is None:
+        return None
+    return _Attempt(method, LLMTarget(provider, model, target.temperature), _BREAKERS.get(provider), True)
+
+
+def _route_attempt(fn: Callable[..., Any], target: Optional[LLMTarget]) -> _Attempt:
+    """Pick the primary provider, or fail over while its breaker is open."""
+    if target is None:
+        return _Attempt(fn, None, None)
+    breaker = _BREAKERS.get(target.provider)
+    if breaker.allow():
+        return _Attempt(fn, target, breaker)
+    fallback = _fallback_for(fn, target)
+    if fallback is not None and fallback.breaker is not None and fallback.breaker.allow():
+        logger.warning(
+            "Circuit open for %s — failing over to %s/%s",
+            target.provider,
+            fallback.target.provider if fallback.target else "?",
+            fallback.target.model if fallback.target else "?",
+        )
+        return fallback
+    raise CircuitOpenError(
+        f"LLM provider '{target.provider}' is failing; circuit breaker is open and no fallback is available."
+    )
+
+
+def _record_outcome(attempt: _Attempt, exc: Optional[BaseException]) -> None:
+    if attempt.breaker is None:
+        return
+    if exc is None:
+        attempt.breaker.record_success()
+    elif isinstance(exc, Exception) and _is_retryable(exc) and not _is_rate_limited(exc):
+        # Outages (5xx, timeouts, connection errors) trip the breaker; rate limits
+        # are the pacer's job and permanent errors say nothing about availability.
+        attempt.breaker.record_failure()
+    else:
+        attempt.breaker.record_neutral()
+
+
+def _is_key_rejected(exc: Exception) -> bool:
+    """True for errors tied to the API key in use (401 unauthorized, 429 rate limited)."""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status in (401, 429):
+        return True
+    return _is_rate_limited(exc) or "error code: 401" in str(exc).lower()
+
+
+def _rotate_key(attempt: _Attempt) -> Optional[Callable[..., Any]]:
+    """Rebind a rejected call to a client on another healthy key from the provider's pool."""
+    if attempt.target is None or attempt.fallback:
+        return None
+    keys = _REGISTRY.key_pool(attempt.target.provider)
+    if keys is None or len(keys) < 2 or keys.available() == 0:
+        return None
+    try:
+        llm = _registry_client(attempt.target.provider, attempt.target.model, attempt.target.temperature)
+    except LLMConfigError:
+        return None
+    if llm is getattr(attempt.fn, "__self__", None):
+        return None
+    return getattr(llm, getattr(attempt.fn, "__name__", "invoke"), None)
+
+
+# ---------------------------------------------------------------------------
+# Request hedging
+# ---------------------------------------------------------------------------
+
+_HEDGER: Optional[Hedger] = None
+_HEDGER_LOCK = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    global _HEDGER
+    with _HEDGER_LOCK:
+        if _HEDGER is None:
+            _HEDGER = Hedger()
+        return _HEDGER
+
+
+def hedging_stats() -> dict[str, Any]:
+    return get_hedger().stats()
+
+
+def _hedge_target(attempt: _Attempt) -> tuple[Callable[..., Any], LLMTarget]:
+    """Where a hedged duplicate goes: ``LLM_HEDGE_MODEL`` if set, else another key's client.
+
+    Falls back to re-sending on the primary client when neither is available.
+    """
+    assert attempt.target is not None
+    target = attempt.target
+    model = os.getenv("LLM_HEDGE_MODEL", "").strip() or target.model
+    keys = _REGISTRY.key_pool(target.provider)
+    if attempt.fallback or (model == target.model and (keys is None or len(keys) < 2)):
+        return attempt.fn, target
+    try:
+        llm = _registry_client(target.provider, model, target.temperature)
+    except LLMConfigError as exc:
+        logger.warning("LLM hedge target %s/%s unavailable: %s", target.provider, model, exc)
+        return attempt.fn, target
+    method = getattr(llm, getattr(attempt.fn, "__name__", "invoke"), None)
+    if method is None:
+        return attempt.fn, target
+    return method, LLMTarget(target.provider, model, target.temperature)
+
+
+def _hedged(
+    attempt: _Attempt, args: tuple[Any, ...], kwargs: dict[str, Any], tokens: int, tool: Optional[str]
+) -> tuple[Any, Optional[str]]:
+    """Run *attempt* (hedged if enabled); return ``(result, model that served it)``."""
+    if attempt.target is None:
+        return attempt.fn(*args, **kwargs), None
+    hedged: list[tuple[Any, str]] = []
+
+    def hedge() -> Any:
+        fn, target = _hedge_target(attempt)
+        get_rate_limiter().acquire(target.provider, target.model, tokens)
+        result = fn(*args, **kwargs)
+        hedged.append((result, target.model))
+        return result
+
+    key = (attempt.target.provider, attempt.target.model, tool or "")
+    result = get_hedger().run(key, lambda: attempt.fn(*args, **kwargs), hedge)
+    return result, _served_model(attempt, result, hedged)
+
+
+async def _ahedged(
+    attempt: _Attempt, args: tuple[Any, ...], kwargs: dict[str, Any], tokens: int, tool: Optional[str]
+) -> tuple[Any, Optional[str]]:
+    if attempt.target is None:
+        return await attempt.fn(*args, **kwargs), None
+    hedged: list[tuple[Any, str]] = []
+
+    async def hedge() -> Any:
+        fn, target = _hedge_target(attempt)
+        await get_rate_limiter().aacquire(target.provider, target.model, tokens)
+        result = await fn(*args, **kwargs)
+        hedged.append((result, target.model))
+        return result
+
+    key = (attempt.target.provider, attempt.target.model, tool or "")
+    result = await get_hedger().arun(key, lambda: _abatched(attempt, args, kwargs), hedge)
+    return result, _served_model(attempt, result, hedged)
+
+
+def _served_model(attempt: _Attempt, result: Any, hedged: list[tuple[Any, str]]) -> Optional[str]:
+    """The hedge's model if the hedge's response won, else the attempt's own."""
+    assert attempt.target is not None
+    return next((model for response, model in hedged if response is result), attempt.target.model)
+
+
+# ---------------------------------------------------------------------------
+# Per-client concurrency cap (LLM_BATCH_*)
+# ---------------------------------------------------------------------------
+
+_BATCHER: Optional[MicroBatcher] = None
+_BATCHER_LOCK = threading.Lock()
+
+
+def get_micro_batcher() -> MicroBatcher:
+    global _BATCHER
+    with _BATCHER_LOCK:
+        if _BATCHER is None:
+            _BATCHER = MicroBatcher()
+        return _BATCHER
+
+
+def batching_stats() -> dict[str, Any]:
+    return get_micro_batcher().stats()
+
+
+async def _abatched(attempt: _Attempt, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+    """Send a primary async attempt through the per-client concurrency cap when it is on.
+
+    Only single-prompt ``ainvoke`` calls on a known client are capped; anything
+    else (and hedged duplicates) goes straight to the provider.
+    """
+    batcher = get_micro_batcher()
+    llm = getattr(attempt.fn, "__self__", None)
+    if (
+        not batcher.settings.enabled
+        or attempt.target is None
+        or llm is None
+        or getattr(attempt.fn, "__name__", "") != "ainvoke"
+        or len(args) != 1
+    ):
+        return await attempt.fn(*args, **kwargs)
+    return await batcher.submit(llm, args[0], kwargs, attempt.target.provider, attempt.target.model)
+
+
+# ---------------------------------------------------------------------------
+# Task-aware model routing
+# ---------------------------------------------------------------------------
+
+_ROUTER: Optional[ModelRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    global _ROUTER
+    with _ROUTER_LOCK:
+        if _ROUTER is None:
+            _ROUTER = ModelRouter.from_env()
+        return _ROUTER
+
+
+def routing_stats() -> dict[str, Any]:
+    return get_model_router().stats()
+
+
+def _rebind(
+    fn: Callable[..., Any], target: LLMTarget, provider: Optional[str], model: Optional[str], temperature: Optional[float]
+) -> Optional[Callable[..., Any]]:
+    """The same bound method (``invoke`` / ``ainvoke``) on the registry client for another provider/model."""
+    provider = (provider or target.provider).lower()
+    if not model:
+        model = target.model if provider == target.provider else _DEFAULT_MODELS.get(provider, target.model)
+    if temperature is None:
+        temperature = target.temperature
+    if (provider, model, temperature) == (target.provider, target.model, target.temperature):
+        return fn
+    try:
+        llm = _registry_client(provider, model, temperature)
+    except LLMConfigError as exc:
+        logger.warning("LLM route target %s/%s unavailable: %s", provider, model, exc)
+        return None
+    return getattr(llm, getattr(fn, "__name__", "invoke"), None)
+
+
+def _select_route(
+    fn: Callable[..., Any],
+    args: tuple[Any, ...],
+    tool: Optional[str],
+    difficulty: Optional[str],
+    retry_attempt: int,
+) -> tuple[Callable[..., Any], Optional[Route]]:
+    """Apply the routing table: return the (possibly rebound) callable and the matched route."""
+    router = get_model_router()
+    target = _llm_target(fn)
+    if not router.routes or target is None:
+        return fn, None
+    route = router.select(tool, difficulty, _prompt_tokens(args), retry_attempt)
+    if route is None:
+        return fn, None
+    routed = _rebind(fn, target, route.provider, route.model, route.temperature)
+    if routed is None:
+        return fn, None
+    return routed, route
+
+
+def _route_fallback(fn: Callable[..., Any], route: Route) -> Optional[Callable[..., Any]]:
+    target = _llm_target(fn)
+    if target is None or not route.has_fallback:
+        return None
+    alternate = _rebind(fn, target, route.fallback_provider, route.fallback_model, route.temperature)
+    return None if alternate is fn else alternate
+
+
+def _record_route(route: Route, started: float, outcome: str, response: Any = None) -> None:
+    prompt_tokens, completion_tokens = usage_tokens(response) if response is not None else (None, None)
+    get_model_router().record(route, time.perf_counter() - started, outcome, prompt_tokens, completion_tokens)
+
+
+def _call_routed(
+    fn: Callable[..., Any],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    max_attempts: int,
+    base_delay: float,
+    tool: Optional[str],
+    route: Optional[Route],
+) -> tuple[Any, bool]:
+    """Run the retry policy under *route*'s timeout, then its fallback if the route's model fails."""
+    if route is None:
+        return _call_with_backoff(fn, args, kwargs, max_attempts, base_delay, tool)
+    started = time.perf_counter()
+    try:
+        try:
+            result, fallback = _call_with_backoff(fn, args, kwargs, max_attempts, base_delay, tool, route.timeout)
+        except Exception as exc:
+            alternate = _route_fallback(fn, route)
+            if alternate is None or isinstance(exc, DeadlineExceededError):
+                raise
+            logger.warning("LLM route %s failed: %s — using its fallback", route.name, exc)
+            result, _ = _call_with_backoff(alternate, args, kwargs, max_attempts, base_delay, tool, route.timeout)
+            fallback = True
+    except BaseException as exc:
+        _record_route(route, started, _call_outcome(exc))
+        raise
+    _record_route(route, started, "fallback" if fallback else "success", result)
+    return result, fallback
+
+
+async def _acall_routed(
+    fn: Callable[..., Any],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    max_attempts: int,
+    base_delay: float,
+    tool: Optional[str],
+    route: Optional[Route],
+) -> tuple[Any, bool]:
+    if route is None:
+        return await _acall_with_backoff(fn, args, kwargs, max_attempts, base_delay, tool)
+    started = time.perf_counter()
+    try:
+        try:
+            result, fallback = await _acall_with_backoff(
+                fn, args, kwargs, max_attempts, base_delay, tool, route.timeout
+            )
+        except Exception as exc:
+            alternate = _route_fallback(fn, route)
+            if alternate is None or isinstance(exc, DeadlineExceededError):
+                raise
+            logger.warning("LLM route %s failed: %s — using its fallback", route.name, exc)
+            result, _ = await _acall_with_backoff(
+                alternate, args, kwargs, max_attempts, base_delay, tool, route.timeout
+            )
+            fallback = True
+    except BaseException as exc:
+        _record_route(route, started, _call_outcome(exc))
+        raise
+    _record_route(route, started, "fallback" if fallback else "success", result)
+    return result, fallback
+
+
+# ---------------------------------------------------------------------------
+# Per-tool generation budgets
+# ---------------------------------------------------------------------------
+
+_BUDGETS: Optional[BudgetTable] = None
+_BUDGETS_LOCK = threading.Lock()
+
+
+def get_generation_budgets() -> BudgetTable:
+    global _BUDGETS
+    with _BUDGETS_LOCK:
+        if _BUDGETS is None:
+            _BUDGETS = BudgetTable.from_env()
+        return _BUDGETS
+
+
+def generation_budget_stats() -> dict[str, Any]:
+    return get_generation_budgets().stats()
+
+
+def generation_budget(tool: Optional[str], items: Optional[int] = None) -> dict[str, Any]:
+    """``max_tokens`` / ``stop`` kwargs for a call to *tool* producing *items* entries."""
+    return get_generation_budgets().kwargs(tool, items)
+
+
+def _with_budget(fn: Callable[..., Any], tool: Optional[str], kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Fill in the tool's budget under per-call overrides; an explicit ``None`` removes a cap.
+
+    Tool defaults only apply to chat-model methods, which accept generation kwargs.
+    """
+    defaults = generation_budget(tool) if _llm_target(fn) is not None else {}
+    merged = {**defaults, **kwargs}
+    return {k: v for k, v in merged.items() if not (k in _GENERATION_KWARGS and v is None)}
+
+
+def _cacheable_text(response: Any) -> Optional[str]:
+    content = getattr(response, "content", None)
+    return content if isinstance(content, str) and content.strip() else None
+
+
+def _cached_message(text: str) -> AIMessage:
+    from langchain_core.messages import AIMessage
+
+    return AIMessage(content=text, response_metadata={"cache": "hit"})
+
+
+# ---------------------------------------------------------------------------
+# Proactive rate limiting
+# ---------------------------------------------------------------------------
+
+
+class LLMRateLimitError(Exception):
+    """Raised when a caller would have to queue longer than the limiter allows."""
+
+
+class LLMTimeoutError(Exception):
+    """Raised when an attempt outlives its route's timeout (retryable)."""
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+def _parse_rate_limits(spec: str) -> dict[tuple[str, str], RateLimits]:
+    """Parse ``provider[:model]=RPM/TPM`` entries (comma-separated; either side may be empty).
+
+    Example: ``groq=30/6000,groq:llama-3.3-70b-versatile=30/12000,openai=500/``
+    """
+    out: dict[tuple[str, str], RateLimits] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry or "=" not in entry:
+            continue
+        target, limits = entry.split("=", 1)
+        provider, _, model = target.strip().partition(":")
+        rpm, _, tpm = limits.partition("/")
+        try:
+            out[(provider.lower(), model.strip())] = RateLimits(
+                requests_per_minute=float(rpm) if rpm.strip() else None,
+                tokens_per_minute=float(tpm) if tpm.strip() else None,
+            )
+        except ValueError:
+            logger.warning("Ignoring malformed LLM_RATE_LIMITS entry: %r", entry)
+    return out
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for pacing, not billing."""
+    return max(1, len(text) // 4)
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.refill_per_second = float(per_minute) / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.tokens
+        if needed <= 0:
+            return 0.0
+        return needed / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+    def observe_remaining(self, remaining: float, now: float) -> None:
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+
+    def resize(self, per_minute: float) -> None:
+        if per_minute > 0 and per_minute != self.capacity:
+            self.capacity = float(per_minute)
+            self.refill_per_second = float(per_minute) / 60.0
+            self.tokens = min(self.tokens, self.capacity)
+
+
+class _LimitState:
+    def __init__(self, limits: RateLimits) -> None:
+        self.requests = _TokenBucket(limits.requests_per_minute) if limits.requests_per_minute else None
+        self.tokens = _TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+        self.tokens_configured = limits.tokens_per_minute is not None
+        self.paused_until = 0.0
+        self.acquired = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self.rejected = 0
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        wait = max(0.0, self.paused_until - now)
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def consume(self, tokens: int) -> None:
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(tokens)
+        self.acquired += 1
+
+
+class RateLimiter:
+    """Process-wide requests-per-minute / tokens-per-minute pacing per (provider, model).
+
+    Buckets come from ``LLM_RATE_LIMITS`` and are corrected from provider response
+    headers (``x-ratelimit-remaining-*``, ``x-ratelimit-reset-*``, ``retry-after``),
+    which the pooled httpx clients feed in via :meth:`update_from_headers`. Callers
+    queue for up to ``max_wait`` seconds instead of failing with a 429; a 429 seen
+    by one caller pauses every caller for that model until the reset time.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[dict[tuple[str, str], RateLimits]] = None,
+        max_wait: float = 10.0,
+    ) -> None:
+        self._configured = dict(limits or {})
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._states: dict[tuple[str, str], _LimitState] = {}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(
+            limits=_parse_rate_limits(os.getenv("LLM_RATE_LIMITS", "")),
+            max_wait=_env_float("LLM_RATE_LIMIT_MAX_WAIT", 10.0),
+        )
+
+    def _state(self, provider: str, model: str) -> _LimitState:
+        key = (provider, model)
+        state = self._states.get(key)
+        if state is None:
+            limits = self._configured.get(key) or self._configured.get((provider, "")) or RateLimits()
+            state = _LimitState(limits)
+            self._states[key] = state
+        return state
+
+    def _reserve(
+        self, provider: str, model: str, tokens: int, waited: float, max_wait: Optional[float] = None
+    ) -> float:
+        """Consume capacity and return 0, or return how long the caller should sleep."""
+        max_wait = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        with self._lock:
+            state = self._state(provider, model)
+            wait = state.wait_time(tokens, time.monotonic())
+            if wait <= 0:
+                state.consume(tokens)
+                if waited > 0:
+                    state.queued += 1
+                    state.wait_seconds += waited
+                return 0.0
+            if waited + wait > max_wait:
+                state.rejected += 1
+                raise LLMRateLimitError(
+                    f"Local rate limit for {provider}/{model}: would queue {waited + wait:.1f}s "
+                    f"(max {max_wait:.1f}s)"
+                )
+            return wait
+
+    def acquire(self, provider: str, model: str, tokens: int = 1, max_wait: Optional[float] = None) -> float:
+        """Block until capacity is available; return the seconds spent queueing.
+
+        *max_wait* tightens the configured queueing limit for this call (e.g. to a request deadline).
+        """
+        waited = 0.0
+        while True:
+            wait = self._reserve(provider, model, tokens, waited, max_wait)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, provider: str, model: str, tokens: int = 1, max_wait: Optional[float] = None) -> float:
+        """Async :meth:`acquire`; queues with ``asyncio.sleep``."""
+        waited = 0.0
+        while True:
+            wait = self._reserve(provider, model, tokens, waited, max_wait)
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def update_from_headers(
+        self,
+        provider: str,
+        model: str,
+        headers: Mapping[str, str],
+        status_code: int = 200,
+    ) -> None:
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(provider, model)
+
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            if limit_tokens and not state.tokens_configured:
+                try:
+                    if state.tokens is None:
+                        state.tokens = _TokenBucket(float(limit_tokens))
+                    else:
+                        state.tokens.resize(float(limit_tokens))
+                except ValueError:
+                    pass
+
+            for kind, bucket in (("requests", state.requests), ("tokens", state.tokens)):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                try:
+                    left = float(remaining)
+                except ValueError:
+                    continue
+                if bucket is not None:
+                    bucket.observe_remaining(left, now)
+                if left <= 0:
+                    reset = _parse_reset_seconds(headers.get(f"x-ratelimit-reset-{kind}"))
+                    if reset:
+                        state.paused_until = max(state.paused_until, now + reset)
+
+            if status_code == 429:
+                retry_after = _parse_reset_seconds(headers.get("retry-after")) or 1.0
+                state.paused_until = max(state.paused_until, now + retry_after)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            out: dict[str, Any] = {}
+            for (provider, model), state in self._states.items():
+                out[f"{provider}/{model}"] = {
+                    "requests_available": round(state.requests.tokens, 2) if state.requests else None,
+                    "requests_per_minute": state.requests.capacity if state.requests else None,
+                    "tokens_available": round(state.tokens.tokens, 2) if state.tokens else None,
+                    "tokens_per_minute": state.tokens.capacity if state.tokens else None,
+                    "paused_for": round(max(0.0, state.paused_until - now), 3),
+                    "acquired": state.acquired,
+                    "queued": state.queued,
+                    "queue_seconds": round(state.wait_seconds, 3),
+                    "rejected": state.rejected,
+                }
+            return out
+
+
+_RATE_LIMITER: Optional[RateLimiter] = None
+_RATE_LIMITER_LOCK = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _RATE_LIMITER
+    with _RATE_LIMITER_LOCK:
+        if _RATE_LIMITER is None:
+            _RATE_LIMITER = RateLimiter.from_env()
+        return _RATE_LIMITER
+
+
+# ---------------------------------------------------------------------------
+# Adaptive concurrency
+# ---------------------------------------------------------------------------
+
+_LIMITERS: Optional[LimiterBoard] = None
+_LIMITERS_LOCK = threading.Lock()
+_OVERLOAD_SUBSTRINGS = ("503", "service unavailable", "over capacity", "overloaded")
+
+
+def get_concurrency_limiters() -> LimiterBoard:
+    global _LIMITERS
+    with _LIMITERS_LOCK:
+        if _LIMITERS is None:
+            _LIMITERS = LimiterBoard()
+        return _LIMITERS
+
+
+def concurrency_stats() -> dict[str, Any]:
+    return get_concurrency_limiters().stats()
+
+
+def _scheduling_cost(prompt_tokens: int, kwargs: dict[str, Any]) -> float:
+    """What an attempt is charged in the fair queue: prompt tokens plus its completion budget."""
+    return float(prompt_tokens + (kwargs.get("max_tokens") or 0))
+
+
+def _is_overloaded(exc: BaseException) -> bool:
+    """True for 429/503-style answers that mean the provider wants less concurrency."""
+    if not isinstance(exc, Exception):
+        return False
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status in (429, 503):
+        return True
+    msg = str(exc).lower()
+    return _is_rate_limited(exc) or any(s in msg for s in _OVERLOAD_SUBSTRINGS)
+
+
+def _release_slot(limiter: Optional[AdaptiveLimiter], started: float, exc: Optional[BaseException]) -> None:
+    if limiter is None:
+        return
+    if exc is None:
+        limiter.release(latency=time.perf_counter() - started)
+    else:
+        limiter.release(overloaded=_is_overloaded(exc))
+
+
+def _prompt_text(args: tuple[Any, ...]) -> str:
+    prompt = args[0] if args else ""
+    return prompt if isinstance(prompt, str) else str(prompt)
+
+
+def _prompt_tokens(args: tuple[Any, ...]) -> int:
+    return estimate_tokens(_prompt_text(args))
+
+
+def _call_outcome(exc: BaseException) -> str:
+    """Metrics label for a call that ended with *exc*."""
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(exc, LLMRateLimitError):
+        return "local_rate_limit"
+    if isinstance(exc, ConcurrencyLimitError):
+        return "concurrency_limit"
+    if isinstance(exc, DeadlineExceededError):
+        return "deadline_exceeded"
+    if isinstance(exc, asyncio.CancelledError):
+        return "cancelled"
+    if isinstance(exc, Exception) and _is_retryable(exc):
+        return "transient_error"
+    return "error"
+
+
+def _attempt_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Per-attempt timeout: the route's *timeout* clamped to the request deadline."""
+    check_deadline()
+    return within_deadline(timeout)
+
+
+def _past_deadline(exc: Exception) -> Exception:
+    """*exc*, or a :class:`DeadlineExceededError` if the request deadline has passed meanwhile.
+
+    An attempt cut short by the deadline says nothing about provider health, so it
+    must not count as a breaker failure or be retried.
+    """
+    left = remaining()
+    if left is None or left > 0 or isinstance(exc, DeadlineExceededError):
+        return exc
+    return DeadlineExceededError("Request deadline exceeded during LLM call")
+
+
+def _outlives_deadline(delay: float) -> bool:
+    left = remaining()
+    return left is not None and delay >= left
+
+
 def call_with_retry(
     fn: Callable[..., Any],
     *args: Any,
     max_attempts: int = 3,
     base_delay: float = 2.0,
+    cache: bool = True,
+    tool: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    retry_attempt: int = 0,
     **kwargs: Any,
 ) -> Any:
-    """Call *fn* with exponential-backoff retry on transient LLM errors.
+    """Call *fn* with full-jitter exponential-backoff retry on transient LLM errors.
+
+    Server ``Retry-After`` hints replace the computed delay; when a provider has
+    several API keys, a 401/429 instead retries at once on another healthy key.
+    Each provider has a circuit breaker: while it is open, calls fail over to
+    ``LLM_FALLBACK_PROVIDER`` / ``LLM_FALLBACK_MODEL`` or fail fast with
+    :class:`CircuitOpenError`.
+
+    When the response cache is enabled (``LLM_CACHE_ENABLED``), identical prompts to
+    the same provider/model/temperature are served from disk; pass ``cache=False``
+    for calls that must produce a fresh completion. Concurrent identical calls under
+    the same deadline (or none) are coalesced into one upstream request
+    (``LLM_COALESCE_ENABLED``, on by default); ``cache=False`` calls are never coalesced.
+
+    Each call is accounted in :mod:`agent.utils.llm_metrics` under the *tool* label
+    (prompt size, tokens, queue time, upstream latency, retries, outcome). With
+    ``LLM_HEDGE_ENABLED``, an attempt slower than the rolling latency percentile for
+    its model and tool is raced against a duplicate (see :mod:`agent.utils.hedging`).
+    In-flight calls per provider/model are capped by an AIMD window that callers
+    queue for (:mod:`agent.utils.adaptive_limiter`, ``LLM_CONCURRENCY_*``).
+
+    *tool*, *difficulty*, the prompt's token estimate and *retry_attempt* select a
+    route from the ``LLM_ROUTES`` table (:mod:`agent.utils.model_router`), which may
+    swap in another model with its own per-attempt timeout and fallback.
+
+    The *tool*'s generation budget (``max_tokens``, ``stop``; see
+    :mod:`agent.utils.generation_budget`) is applied unless overridden by the same
+    kwargs; truncated completions are counted in ``llm_truncated_total``.
+
+    Inside :func:`agent.utils.deadline.deadline_context`, queueing and each attempt
+    are bounded by the time left, and a retry whose backoff would outlive the
+    deadline is not attempted; :class:`DeadlineExceededError` is raised once it passes.
 
     Raises the last exception if all attempts fail.
     """
+    kwargs = _with_budget(fn, tool, kwargs)
+    fn, route = _select_route(fn, args, tool, difficulty, retry_attempt)
+    key = _prompt_fingerprint(fn, args, kwargs)
+    response_cache = get_response_cache() if cache and key is not None else None
+    if response_cache is not None and key is not None:
+        hit = response_cache.get(key)
+        if hit is not None:
+            target = _llm_target(fn)
+            record_cache_hit(tool, target.model if target else None)
+            return _cached_message(hit)
+
+    def upstream() -> Any:
+        result, fallback = _call_routed(fn, args, kwargs, max_attempts, base_delay, tool, route)
+        if response_cache is not None and key is not None and not fallback and (text := _cacheable_text(result)):
+            response_cache.put(key, text)
+        return result
+
+    if (flight_key := _coalescing_key(key, cache)) is not None:
+        return _IN_FLIGHT.do(flight_key, upstream)
+    return upstream()
+
+
+def _call_with_backoff(
+    fn: Callable[..., Any],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    max_attempts: int,
+    base_delay: float,
+    tool: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> tuple[Any, bool]:
+    """Run the retry policy; return ``(result, served_by_fallback)``.
+
+    *timeout* bounds each attempt; it is passed to the provider SDK as a request
+    timeout, which aborts the HTTP call.
+    """
+    target = _llm_target(fn)
+    tokens = _prompt_tokens(args)
+    flow = get_concurrency_limiters().scheduler.flow(tool)
+    record = LLMCallRecord(
+        tool, target.model if target else None, _prompt_text(args) if args else None, kwargs.get("max_tokens")
+    )
     last_exc: Exception = RuntimeError("No attempts made")
-    for attempt in range(1, max_attempts + 1):
-        try:
-            return fn(*args, **kwargs)
-        except Exception as exc:
-            last_exc = exc
-            if not _is_retryable(exc) or attempt == max_attempts:
+    try:
+        for attempt in range(1, max_attempts + 1):
+            check_deadline()
+            route = _route_attempt(fn, target)
+            limiter: Optional[AdaptiveLimiter] = None
+            try:
+                if route.target is not None:
+                    record.queue_seconds += get_rate_limiter().acquire(
+                        route.target.provider, route.target.model, tokens, max_wait=within_deadline(None)
+                    )
+                    limiter = get_concurrency_limiters().get(route.target.provider, route.target.model)
+                    if limiter is not None:
+                        record.queue_seconds += limiter.acquire(
+                            within_deadline(limiter.settings.queue_timeout), flow, _scheduling_cost(tokens, kwargs)
+                        )
+                started = time.perf_counter()
+                try:
+                    attempt_timeout = _attempt_timeout(timeout)
+                    call_kwargs = (
+                        {**kwargs, "timeout": attempt_timeout}
+                        if attempt_timeout and route.target is not None
+                        else kwargs
+                    )
+                    result, served_model = _hedged(route, args, call_kwargs, tokens, tool)
+                except BaseException as exc:
+                    _release_slot(limiter, started, exc)
+                    raise
+                finally:
+                    record.upstream_seconds += time.perf_counter() - started
+                _release_slot(limiter, started, None)
+            except Exception as exc:
+                expired = _past_deadline(exc)
+                if expired is not exc:
+                    _record_outcome(route, expired)
+                    raise expired from exc
+                last_exc = exc
+                _record_outcome(route, exc)
+                rotated = _rotate_key(route) if attempt < max_attempts and _is_key_rejected(exc) else None
+                if rotated is not None:
+                    logger.warning(
+                        "LLM key rejected (attempt %d/%d): %s — retrying on another key", attempt, max_attempts, exc
+                    )
+                    fn = rotated
+                    record.retries += 1
+                    continue
+                if not _is_retryable(exc) or attempt == max_attempts:
+                    raise
+                delay = _retry_delay(exc, base_delay, attempt)
+                if delay is None:
+                    raise
+                if _outlives_deadline(delay):
+                    logger.warning(
+                        "LLM call failed (attempt %d/%d): %s — not retrying, the request deadline is too close",
+                        attempt,
+                        max_attempts,
+                        exc,
+                    )
+                    raise
+                logger.warning(
+                    "LLM call failed (attempt %d/%d): %s — retrying in %.1fs",
+                    attempt,
+                    max_attempts,
+                    exc,
+                    delay,
+                )
+                time.sleep(delay)
+                record.retries += 1
+                continue
+            except BaseException as exc:
+                # Cancellation (e.g. a client disconnect) must still free a half-open probe slot.
+                _record_outcome(route, exc)
                 raise
-            delay = base_delay * (2 ** (attempt - 1))
-            logger.warning(
-                "LLM call failed (attempt %d/%d): %s — retrying in %.1fs",
-                attempt,
-                max_attempts,
-                exc,
-                delay,
-            )
-            time.sleep(delay)
-    raise last_exc
+            _record_outcome(route, None)
+            record.finish("fallback" if route.fallback else "success", result, served_model)
+            return result, route.fallback
+        raise last_exc
+    except BaseException as exc:
+        record.finish(_call_outcome(exc))
+        raise
+
+
+async def async_call_with_retry(
+    fn: Callable[..., Any],
+    *args: Any,
+    max_attempts: int = 3,
+    base_delay: float = 2.0,
+    cache: bool = True,
+    tool: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    retry_attempt: int = 0,
+    **kwargs: Any,
+) -> Any:
+    """Async twin of :func:`call_with_retry` for coroutine functions such as ``llm.ainvoke``.
+
+    Backoff uses ``asyncio.sleep`` so waiting never blocks the event loop.
+    """
+    kwargs = _with_budget(fn, tool, kwargs)
+    fn, route = _select_route(fn, args, tool, difficulty, retry_attempt)
+    key = _prompt_fingerprint(fn, args, kwargs)
+    response_cache = get_response_cache() if cache and key is not None else None
+    if response_cache is not None and key is not None:
+        hit = response_cache.get(key)
+        if hit is not None:
+            target = _llm_target(fn)
+            record_cache_hit(tool, target.model if target else None)
+            return _cached_message(hit)
+
+    async def upstream() -> Any:
+        result, fallback = await _acall_routed(fn, args, kwargs, max_attempts, base_delay, tool, route)
+        if response_cache is not None and key is not None and not fallback and (text := _cacheable_text(result)):
+            response_cache.put(key, text)
+        return result
+
+    if (flight_key := _coalescing_key(key, cache)) is not None:
+        return await _IN_FLIGHT.ado(flight_key, upstream)
+    return await upstream()
+
+
+async def _acall_with_backoff(
+    fn: Callable[..., Any],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    max_attempts: int,
+    base_delay: float,
+    tool: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> tuple[Any, bool]:
+    target = _llm_target(fn)
+    tokens = _prompt_tokens(args)
+    flow = get_concurrency_limiters().scheduler.flow(tool)
+    record = LLMCallRecord(
+        tool, target.model if target else None, _prompt_text(args) if args else None, kwargs.get("max_tokens")
+    )
+    last_exc: Exception = RuntimeError("No attempts made")
+    try:
+        for attempt in range(1, max_attempts + 1):
+            check_deadline()
+            route = _route_attempt(fn, target)
+            limiter: Optional[AdaptiveLimiter] = None
+            try:
+                if route.target is not None:
+                    record.queue_seconds += await get_rate_limiter().aacquire(
+                        route.target.provider, route.target.model, tokens, max_wait=within_deadline(None)
+                    )
+                    limiter = get_concurrency_limiters().get(route.target.provider, route.target.model)
+                    if limiter is not None:
+                        record.queue_seconds += await limiter.aacquire(
+                            within_deadline(limiter.settings.queue_timeout), flow, _scheduling_cost(tokens, kwargs)
+                        )
+                started = time.perf_counter()
+                attempt_timeout: Optional[float] = None
+                try:
+                    attempt_timeout = _attempt_timeout(timeout)
+                    if attempt_timeout:
+                        result, served_model = await asyncio.wait_for(
+                            _ahedged(route, args, kwargs, tokens, tool), attempt_timeout
+                        )
+                    else:
+                        result, served_model = await _ahedged(route, args, kwargs, tokens, tool)
+                except asyncio.TimeoutError:
+                    timed_out = LLMTimeoutError(f"LLM call timed out after {attempt_timeout or 0:.1f}s")
+                    _release_slot(limiter, started, timed_out)
+                    raise timed_out from None
+                except BaseException as exc:
+                    _release_slot(limiter, started, exc)
+                    raise
+                finally:
+                    record.upstream_seconds += time.perf_counter() - started
+                _release_slot(limiter, started, None)
+            except Exception as exc:
+                expired = _past_deadline(exc)
+                if expired is not exc:
+                    _record_outcome(route, expired)
+                    raise expired from exc
+                last_exc = exc
+                _record_outcome(route, exc)
+                rotated = _rotate_key(route) if attempt < max_attempts and _is_key_rejected(exc) else None
+                if rotated is not None:
+                    logger.warning(
+                        "LLM key rejected (attempt %d/%d): %s — retrying on another key", attempt, max_attempts, exc
+                    )
+                    fn = rotated
+                    record.retries += 1
+                    continue
+                if not _is_retryable(exc) or attempt == max_attempts:
+                    raise
+                delay = _retry_delay(exc, base_delay, attempt)
+                if delay is None:
+                    raise
+                if _outlives_deadline(delay):
+                    logger.warning(
+                        "LLM call failed (attempt %d/%d): %s — not retrying, the request deadline is too close",
+                        attempt,
+                        max_attempts,
+                        exc,
+                    )
+                    raise
+                logger.warning(
+                    "LLM call failed (attempt %d/%d): %s — retrying in %.1fs",
+                    attempt,
+                    max_attempts,
+                    exc,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                record.retries += 1
+                continue
+            except BaseException as exc:
+                # Cancellation (e.g. a client disconnect) must still free a half-open probe slot.
+                _record_outcome(route, exc)
+                raise
+            _record_outcome(route, None)
+            record.finish("fallback" if route.fallback else "success", result, served_model)
+            return result, route.fallback
+        raise last_exc
+    except BaseException as exc:
+        record.finish(_call_outcome(exc))
+        raise
 
 
 def _get_http_client() -> httpx.Client:
     """Return an httpx.Client configured with the corporate proxy and SSL verification disabled.
-    
+
     Corporate proxies that do SSL inspection replace server certs with their own CA.
     verify=False bypasses the SSL check so the Groq API call succeeds through the proxy.
     """
@@ -81,12 +1268,522 @@ def _get_http_client() -> httpx.Client:
     return httpx.Client(verify=False)
 
 
+# ---------------------------------------------------------------------------
+# Direct HTTP chat-completions client
+# ---------------------------------------------------------------------------
+
+_DIRECT_BASE_URLS = {"groq": "https://api.groq.com/openai/v1", "openai": "https://api.openai.com/v1"}
+_MESSAGE_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+
+@dataclass
+class ChatCompletion:
+    """The slice of a chat response the tools read: text, usage and finish metadata."""
+
+    content: str
+    usage_metadata: dict[str, Any]
+    response_metadata: dict[str, Any]
+    tool_calls: tuple[Any, ...] = ()
+
+
+class DirectHTTPError(Exception):
+    """Non-2xx answer from a chat-completions endpoint; shaped like the provider SDK errors."""
+
+    def __init__(self, response: httpx.Response) -> None:
+        super().__init__(f"Error code: {response.status_code} - {response.text[:500]}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+def _direct_messages(prompt: Any) -> list[dict[str, Any]]:
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    messages = []
+    for message in prompt:
+        if isinstance(message, dict):
+            messages.append(message)
+        else:
+            role = _MESSAGE_ROLES.get(getattr(message, "type", "human"), "user")
+            messages.append({"role": role, "content": message.content})
+    return messages
+
+
+class DirectChatClient:
+    """Minimal chat-completions client over the pooled httpx clients (``LLM_DIRECT_HTTP``).
+
+    Exposes the ``invoke`` / ``ainvoke`` surface :func:`call_with_retry` uses, posts
+    one JSON request per call and returns a :class:`ChatCompletion` — no LangChain
+    message objects, callbacks or pydantic models on the hot path. Errors carry
+    ``status_code`` / ``response`` like the SDK errors, so retry, key rotation and
+    ``Retry-After`` handling behave the same. ``bind_tools`` hands off to the
+    LangChain client for the tool-calling agent loop.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        temperature: float,
+        api_key: str,
+        base_url: str,
+        http_client: httpx.Client,
+        http_async_client: httpx.AsyncClient,
+        timeout: float = 60.0,
+        max_tokens: Optional[int] = None,
+    ) -> None:
+        self.provider = provider
+        self.model_name = model
+        self.temperature = temperature
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self._url = base_url.rstrip("/") + "/chat/completions"
+        self._headers = {"Authorization": f"Bearer {api_key}"}
+        self._client = http_client
+        self._async_client = http_async_client
+
+    @property
+    def _llm_type(self) -> str:
+        return f"{self.provider}-direct"
+
+    def _payload(self, prompt: Any, params: dict[str, Any]) -> dict[str, Any]:
+        payload = {"model": self.model_name, "messages": _direct_messages(prompt), "temperature": self.temperature}
+        if self.max_tokens is not None:
+            payload["max_tokens"] = self.max_tokens
+        return {**payload, **params}
+
+    def _parse(self, response: httpx.Response) -> ChatCompletion:
+        if response.status_code >= 400:
+            raise DirectHTTPError(response)
+        data = response.json()
+        choice = data["choices"][0]
+        usage = data.get("usage") or {}
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        usage_metadata: dict[str, Any] = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        if cached is not None:
+            usage_metadata["input_token_details"] = {"cache_read": int(cached)}
+        return ChatCompletion(
+            content=choice["message"].get("content") or "",
+            usage_metadata=usage_metadata,
+            response_metadata={
+                "model_name": data.get("model", self.model_name),
+                "finish_reason": choice.get("finish_reason"),
+                "token_usage": usage,
+            },
+        )
+
+    def invoke(self, prompt: Any, timeout: Optional[float] = None, **params: Any) -> ChatCompletion:
+        try:
+            response = self._client.post(
+                self._url, json=self._payload(prompt, params), headers=self._headers, timeout=timeout or self.timeout
+            )
+        except httpx.TimeoutException as exc:
+            raise LLMTimeoutError(f"Request timed out: {exc}") from exc
+        except httpx.TransportError as exc:
+            raise ConnectionError(f"Connection error: {exc}") from exc
+        return self._parse(response)
+
+    async def ainvoke(self, prompt: Any, timeout: Optional[float] = None, **params: Any) -> ChatCompletion:
+        try:
+            response = await self._async_client.post(
+                self._url, json=self._payload(prompt, params), headers=self._headers, timeout=timeout or self.timeout
+            )
+        except httpx.TimeoutException as exc:
+            raise LLMTimeoutError(f"Request timed out: {exc}") from exc
+        except httpx.TransportError as exc:
+            raise ConnectionError(f"Connection error: {exc}") from exc
+        return self._parse(response)
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Any:
+        llm = _REGISTRY.get(provider=self.provider, model=self.model_name, temperature=self.temperature, direct=False)
+        return llm.bind_tools(tools, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Pooled client registry
+# ---------------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on")
+
+
+def _provider_env(provider: str, name: str) -> str:
+    """``LLM_<PROVIDER>_<NAME>`` when it is set, else the shared ``LLM_<NAME>``."""
+    if provider:
+        scoped = f"LLM_{provider.upper()}_{name}"
+        if os.getenv(scoped, "").strip():
+            return scoped
+    return f"LLM_{name}"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # type: ignore[import-not-found]  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection-pool limits shared by every pooled httpx client."""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls, provider: str = "") -> "PoolSettings":
+        """Read ``LLM_HTTP_*``; ``LLM_<PROVIDER>_HTTP_*`` overrides them for one provider."""
+        http2 = _env_flag(_provider_env(provider, "HTTP2"))
+        if http2 and not _http2_available():
+            logger.warning("LLM_HTTP2 is set but the 'h2' package is not installed — using HTTP/1.1")
+            http2 = False
+        return cls(
+            max_connections=_env_int(_provider_env(provider, "HTTP_MAX_CONNECTIONS"), cls.max_connections),
+            max_keepalive_connections=_env_int(
+                _provider_env(provider, "HTTP_MAX_KEEPALIVE"), cls.max_keepalive_connections
+            ),
+            keepalive_expiry=_env_float(_provider_env(provider, "HTTP_KEEPALIVE_EXPIRY"), cls.keepalive_expiry),
+            http2=http2,
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+def _request_model(request: httpx.Request) -> str:
+    """Read the ``model`` field from a chat-completions request body."""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return ""
+    model = body.get("model") if isinstance(body, dict) else None
+    return model if isinstance(model, str) else ""
+
+
+def _request_key_id(request: httpx.Request) -> str:
+    """Key id of the bearer token a request was sent with ("" if none)."""
+    auth = request.headers.get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+    return key_id(token.strip()) if scheme.lower() == "bearer" and token.strip() else ""
+
+
+class _PooledHTTP:
+    """A sync + async httpx client pair with keep-alive pooling and usage counters.
+
+    Connection reuse is measured with httpcore's ``trace`` extension: every request
+    is counted, and only requests that had to open a TCP connection (or run a TLS
+    handshake) bump the corresponding counters.
+    """
+
+    def __init__(
+        self,
+        proxy: str,
+        settings: PoolSettings,
+        provider: str = "",
+        key_pool: Optional[APIKeyPool] = None,
+    ) -> None:
+        self.proxy = proxy
+        self.settings = settings
+        self.provider = provider
+        self.key_pool = key_pool
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "responses": 0,
+            "connections_opened": 0,
+            "tls_handshakes": 0,
+            "connections_closed": 0,
+        }
+        common: dict[str, Any] = {
+            "proxy": proxy or None,
+            "verify": False,
+            "limits": settings.limits(),
+            "http2": settings.http2,
+        }
+        self.sync_client = httpx.Client(
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+            **common,
+        )
+        self.async_client = httpx.AsyncClient(
+            event_hooks={"request": [self._aon_request], "response": [self._aon_response]},
+            **common,
+        )
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _record_trace(self, event: str) -> None:
+        if event == "connection.connect_tcp.complete":
+            self._bump("connections_opened")
+        elif event == "connection.start_tls.complete":
+            self._bump("tls_handshakes")
+        elif event == "connection.close.complete":
+            self._bump("connections_closed")
+
+    def _trace(self, event: str, info: dict[str, Any]) -> None:
+        self._record_trace(event)
+
+    async def _atrace(self, event: str, info: dict[str, Any]) -> None:
+        self._record_trace(event)
+
+    def _observe_request(self, request: httpx.Request) -> None:
+        self._bump("requests")
+        kid = _request_key_id(request)
+        if self.key_pool is not None and kid:
+            self.key_pool.request_started(kid, id(request))
+
+    def _on_request(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = self._trace
+        self._observe_request(request)
+
+    def _observe_response(self, response: httpx.Response) -> None:
+        self._bump("responses")
+        kid = _request_key_id(response.request)
+        if self.key_pool is not None and kid:
+            self.key_pool.observe(kid, id(response.request), response.status_code, response.headers)
+        # With several keys, quota headers describe one key, not the deployment:
+        # the key pool tracks them per key instead of pausing every caller.
+        if self.provider and (self.key_pool is None or len(self.key_pool) <= 1):
+            get_rate_limiter().update_from_headers(
+                self.provider, _request_model(response.request), response.headers, response.status_code
+            )
+
+    def _on_response(self, response: httpx.Response) -> None:
+        self._observe_response(response)
+
+    async def _aon_request(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = self._atrace
+        self._observe_request(request)
+
+    async def _aon_response(self, response: httpx.Response) -> None:
+        self._observe_response(response)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        opened = counters["connections_opened"]
+        requests = counters["requests"]
+        return {
+            **counters,
+            "reused_requests": max(0, requests - opened),
+            "reuse_ratio": round(1 - opened / requests, 4) if requests else 0.0,
+            "http2": self.settings.http2,
+            "max_connections": self.settings.max_connections,
+            "max_keepalive_connections": self.settings.max_keepalive_connections,
+        }
+
+    def close(self) -> None:
+        """Close both clients; the async one on a private loop, or as a task if a loop is running here."""
+        self.sync_client.close()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                asyncio.run(self.async_client.aclose())
+            except RuntimeError as exc:  # connections bound to an event loop that has since closed
+                logger.debug("Async HTTP pool for %s closed with: %s", self.provider or "llm", exc)
+        else:
+            asyncio.ensure_future(self.async_client.aclose())
+
+    async def aclose(self) -> None:
+        self.sync_client.close()
+        await self.async_client.aclose()
+
+
+@dataclass(frozen=True)
+class ClientKey:
+    provider: str
+    model: str
+    temperature: float
+    proxy: str
+    api_key_id: str = ""
+    direct: bool = False
+
+
+class LLMClientRegistry:
+    """Process-wide, thread-safe cache of chat-model clients.
+
+    Clients are keyed by (provider, model, temperature, proxy) and built once;
+    all clients for the same provider and proxy share one pooled httpx client pair,
+    so repeated tool calls reuse warm keep-alive connections instead of paying for
+    a fresh TLS handshake and a leaked connection pool per call.
+    """
+
+    def __init__(self, settings: Optional[PoolSettings] = None) -> None:
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._clients: dict[ClientKey, ChatClient] = {}
+        self._pools: dict[tuple[str, str], _PooledHTTP] = {}
+        self._key_pools: dict[str, Optional[APIKeyPool]] = {}
+        self._created = 0
+        self._hits = 0
+
+    def _key_pool_locked(self, provider: str) -> Optional[APIKeyPool]:
+        if provider not in self._key_pools:
+            env_var = _API_KEY_ENV.get(provider)
+            self._key_pools[provider] = APIKeyPool.from_env(env_var) if env_var else None
+        return self._key_pools[provider]
+
+    def key_pool(self, provider: str) -> Optional[APIKeyPool]:
+        """The API-key pool for *provider* (from ``<PROVIDER>_API_KEYS`` / ``<PROVIDER>_API_KEY``)."""
+        with self._lock:
+            return self._key_pool_locked(provider.lower())
+
+    def _pool_for(self, provider: str, proxy: str) -> _PooledHTTP:
+        pool = self._pools.get((provider, proxy))
+        if pool is None:
+            settings = self._settings or PoolSettings.from_env(provider)
+            pool = _PooledHTTP(proxy, settings, provider, self._key_pool_locked(provider))
+            self._pools[(provider, proxy)] = pool
+        return pool
+
+    def get(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        direct: Optional[bool] = None,
+    ) -> ChatClient:
+        provider_name = (provider or os.getenv("LLM_PROVIDER") or "groq").lower()
+        model_name = _resolve_model(provider_name, model)
+        use_direct = _direct_enabled(provider_name, direct)
+        # Self-hosted servers sit on the local network; only the public APIs go through the proxy.
+        proxy = "" if provider_name == "openai_compatible" else os.getenv("PROXY_URL", "").strip()
+
+        with self._lock:
+            keys = self._key_pool_locked(provider_name)
+            # Counted as selected only when a client is built for it, not on every reuse.
+            api_key = keys.choose() if keys is not None else None
+            key = ClientKey(
+                provider_name, model_name, float(temperature), proxy, key_id(api_key) if api_key else "", use_direct
+            )
+            client = self._clients.get(key)
+            if client is not None:
+                self._hits += 1
+                return client
+            if keys is not None and api_key is not None:
+                keys.acquire(api_key)
+            if provider_name == "fake":
+                client = initialize_llm(provider=provider_name, model=model_name, temperature=temperature)
+            else:
+                pool = self._pool_for(provider_name, proxy)
+                client = initialize_llm(
+                    provider=provider_name,
+                    model=model_name,
+                    temperature=temperature,
+                    api_key=api_key,
+                    http_client=pool.sync_client,
+                    http_async_client=pool.async_client,
+                    direct=use_direct,
+                )
+            self._clients[key] = client
+            self._created += 1
+            return client
+
+    def stats(self) -> dict[str, Any]:
+        """Return client counts and per-pool connection statistics."""
+        with self._lock:
+            pools = dict(self._pools)
+            clients = list(self._clients)
+            key_pools = dict(self._key_pools)
+            created, hits = self._created, self._hits
+        return {
+            "clients": len(clients),
+            "clients_created": created,
+            "client_reuses": hits,
+            "api_keys": {provider: kp.stats() for provider, kp in key_pools.items() if kp is not None},
+            "pools": {
+                f"{provider}{'@' + proxy if proxy else ''}": pool.stats()
+                for (provider, proxy), pool in pools.items()
+            },
+        }
+
+    def _drain(self) -> list[_PooledHTTP]:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+            self._clients.clear()
+            self._key_pools.clear()
+        return pools
+
+    def close(self) -> None:
+        """Close every pooled sync and async client and forget cached clients (see :meth:`aclose`)."""
+        for pool in self._drain():
+            pool.close()
+
+    async def aclose(self) -> None:
+        """Close every pooled sync and async client (use from an event loop)."""
+        for pool in self._drain():
+            await pool.aclose()
+
+
+_REGISTRY = LLMClientRegistry()
+
+
+def get_client_registry() -> LLMClientRegistry:
+    return _REGISTRY
+
+
+def llm_pool_stats() -> dict[str, Any]:
+    return _REGISTRY.stats()
+
+
+def shutdown_llm_clients() -> None:
+    _REGISTRY.close()
+    if _HEDGER is not None:
+        _HEDGER.close()
+
+
+async def ashutdown_llm_clients() -> None:
+    await _REGISTRY.aclose()
+    if _HEDGER is not None:
+        _HEDGER.close()
+
+
 class LLMConfigError(Exception):
     pass
 
 
+_API_KEY_ENV = {
+    "groq": "GROQ_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "openai_compatible": "OPENAI_COMPATIBLE_API_KEY",
+}
+
+
 def get_api_key(env_var: str, provider_name: str) -> str:
-    api_key = os.getenv(env_var)
+    api_key = os.getenv(env_var) or os.getenv(f"{env_var}S", "").split(",")[0].strip()
     if not api_key:
         raise LLMConfigError(
             f"{env_var} not found in environment variables. "
@@ -99,46 +1796,166 @@ def initialize_llm(
     provider: Optional[str] = None,
     model: Optional[str] = None,
     temperature: float = 0.7,
-    api_key: Optional[str] = None,
-) -> Union[ChatGroq, ChatOpenAI]:
+    api_key: Optional[Union[str, APIKeyPool]] = None,
+    http_client: Optional[httpx.Client] = None,
+    http_async_client: Optional[httpx.AsyncClient] = None,
+    direct: Optional[bool] = None,
+    max_tokens: Optional[int] = None,
+) -> ChatClient:
+    """Build a new chat-model client.
+
+    Pass pooled ``http_client`` / ``http_async_client`` instances to share
+    connections; prefer :func:`get_llm_client`, which does this via the registry.
+    ``api_key`` may be an :class:`APIKeyPool`, in which case one key is drawn from it.
+    With ``direct=True`` (default: ``LLM_DIRECT_HTTP``) the HTTP providers return a
+    :class:`DirectChatClient` instead of the LangChain chat model.
+    ``max_tokens`` (default: ``LLM_MAX_TOKENS``) is the client-wide completion cap;
+    per-tool budgets passed by :func:`call_with_retry` take precedence per call.
+    """
     if provider is None:
         provider = os.getenv("LLM_PROVIDER", "groq")
-    
+    if isinstance(api_key, APIKeyPool):
+        api_key = api_key.acquire()
+    if max_tokens is None:
+        max_tokens = _env_int("LLM_MAX_TOKENS", 0) or None
+    if _direct_enabled(provider.lower(), direct):
+        return _initialize_direct(
+            provider.lower(), model, temperature, api_key, http_client, http_async_client, max_tokens
+        )
+
     if provider.lower() == "groq":
-        if model is None:
-            model = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+        model = _resolve_model("groq", model)
         if api_key is None:
             api_key = get_api_key("GROQ_API_KEY", "Groq")
+        from langchain_groq import ChatGroq
+
         return ChatGroq(
             model=model,
             temperature=temperature,
             api_key=api_key,  # type: ignore[arg-type]
-            http_client=_get_http_client(),
+            max_tokens=max_tokens,
+            http_client=http_client or _get_http_client(),
+            http_async_client=http_async_client,
         )
-    
+
     elif provider.lower() == "openai":
-        if model is None:
-            model = os.getenv("LLM_MODEL", "gpt-4")
+        model = _resolve_model("openai", model)
         if api_key is None:
             api_key = get_api_key("OPENAI_API_KEY", "OpenAI")
         proxy_url = os.getenv("PROXY_URL", "").strip()
+        from langchain_openai import ChatOpenAI
+
         return ChatOpenAI(
             model=model,
             temperature=temperature,
             api_key=api_key,  # type: ignore[arg-type]
-            http_async_client=httpx.AsyncClient(
+            max_tokens=max_tokens,  # type: ignore[call-arg]
+            http_client=http_client,
+            http_async_client=http_async_client or httpx.AsyncClient(
                 proxy=proxy_url if proxy_url else None,
                 verify=False,
             ),
         )
-    
+
+    elif provider.lower() == "openai_compatible":
+        # Self-hosted OpenAI-compatible server (vLLM, llama.cpp server, ...) at LLM_BASE_URL.
+        base_url = _compatible_base_url()
+        model = _resolve_model("openai_compatible", model)
+        if api_key is None:
+            api_key = _compatible_api_key()
+        from agent.utils.openai_compatible import ChatOpenAICompatible
+
+        return ChatOpenAICompatible(
+            model=model,
+            temperature=temperature,
+            api_key=api_key,  # type: ignore[arg-type]
+            base_url=base_url,
+            max_tokens=max_tokens,  # type: ignore[call-arg]
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+
+    elif provider.lower() == "fake":
+        # Offline stand-in for tests and load runs; tuned via FAKE_LLM_* env vars.
+        from agent.utils.fake_llm import FakeChatModel
+
+        return FakeChatModel.from_env(
+            model=_resolve_model("fake", model), temperature=temperature, max_tokens=max_tokens
+        )
+
     else:
         raise LLMConfigError(
             f"Unsupported LLM provider: {provider}. "
-            "Supported providers: 'groq', 'openai'"
+            "Supported providers: 'groq', 'openai', 'openai_compatible', 'fake'"
         )
 
 
-def get_llm_client() -> Union[ChatGroq, ChatOpenAI]:
-    return initialize_llm()
+def _compatible_base_url() -> str:
+    base_url = os.getenv("LLM_BASE_URL", "").strip()
+    if not base_url:
+        raise LLMConfigError(
+            "LLM_BASE_URL not found in environment variables. "
+            "Set it to the server's OpenAI-compatible endpoint, e.g. http://localhost:8000/v1."
+        )
+    return base_url
+
+
+def _compatible_api_key() -> str:
+    # Most local servers ignore the key, but the OpenAI wire format expects one.
+    return os.getenv("OPENAI_COMPATIBLE_API_KEY", "").strip() or "EMPTY"
+
+
+def _direct_enabled(provider: str, direct: Optional[bool]) -> bool:
+    if provider not in _DIRECT_BASE_URLS and provider != "openai_compatible":
+        return False
+    return _env_flag("LLM_DIRECT_HTTP") if direct is None else direct
+
+
+def _initialize_direct(
+    provider: str,
+    model: Optional[str],
+    temperature: float,
+    api_key: Optional[str],
+    http_client: Optional[httpx.Client],
+    http_async_client: Optional[httpx.AsyncClient],
+    max_tokens: Optional[int] = None,
+) -> DirectChatClient:
+    model = _resolve_model(provider, model)
+    if provider == "openai_compatible":
+        base_url = _compatible_base_url()
+        api_key = api_key or _compatible_api_key()
+        proxy_url = ""
+    else:
+        base_url = os.getenv(f"{provider.upper()}_BASE_URL", "").strip() or _DIRECT_BASE_URLS[provider]
+        api_key = api_key or get_api_key(_API_KEY_ENV[provider], provider.title())
+        proxy_url = os.getenv("PROXY_URL", "").strip()
+    return DirectChatClient(
+        provider=provider,
+        model=model,
+        temperature=temperature,
+        api_key=api_key,
+        base_url=base_url,
+        http_client=http_client or httpx.Client(proxy=proxy_url or None, verify=False),
+        http_async_client=http_async_client or httpx.AsyncClient(proxy=proxy_url or None, verify=False),
+        timeout=_env_float("LLM_DIRECT_TIMEOUT", 60.0),
+        max_tokens=max_tokens,
+    )
+
+
+def _resolve_model(provider: str, model: Optional[str]) -> str:
+    if model:
+        return model
+    if provider.lower() == "fake":
+        return os.getenv("LLM_MODEL", "fake-model")
+    if provider.lower() == "openai_compatible":
+        served = os.getenv("LLM_MODEL", "").strip()
+        if not served:
+            raise LLMConfigError("LLM_MODEL must name the model served at LLM_BASE_URL.")
+        return served
+    default = "gpt-4" if provider.lower() == "openai" else "llama-3.1-8b-instant"
+    return os.getenv("LLM_MODEL", default)
+
 
+def get_llm_client() -> ChatClient:
+    """Return the shared, pooled client for the configured provider and model."""
+    return _REGISTRY.get()
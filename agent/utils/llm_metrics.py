@@ -0,0 +1,339 @@
+"""
+LLM Metrics
+
+Per-call accounting for outbound LLM requests and a small, dependency-free
+Prometheus text exporter. ``call_with_retry`` / ``async_call_with_retry`` record
+one :class:`LLMCallRecord` per logical call (tool, model and endpoint labels;
+prompt size, completion tokens, queue time, upstream latency, retries, outcome),
+and the web API serves :func:`render_metrics` at ``GET /metrics``.
+"""
+
+import abc
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional, Sequence
+
+_LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> _LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    @abc.abstractmethod
+    def _samples(self) -> list[str]: ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[_LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, /, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, /, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, /, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: dict[_LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, /, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            totals[0] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[0][-1] if series else 0
+
+    def sum(self, **labels: str) -> float:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[1][0] if series else 0.0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._series.items())
+        lines: list[str] = []
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in Prometheus text format (version 0.0.4)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name!r} already registered with a different shape")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        if buckets is None:
+            return self._register(Histogram(name, help_text, labelnames))
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_METRICS = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def get_metrics() -> MetricsRegistry:
+    return _METRICS
+
+
+def render_metrics() -> str:
+    return _METRICS.render()
+
+
+# ---------------------------------------------------------------------------
+# Per-call LLM accounting
+# ---------------------------------------------------------------------------
+
+_CALL_LABELS = ("tool", "model", "endpoint")
+_TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+LLM_CALLS = _METRICS.counter(
+    "llm_calls_total", "Logical LLM calls by final outcome.", _CALL_LABELS + ("outcome",)
+)
+LLM_RETRIES = _METRICS.counter("llm_retries_total", "Retried LLM attempts.", _CALL_LABELS)
+LLM_PROMPT_CHARS = _METRICS.counter("llm_prompt_chars_total", "Prompt characters sent.", _CALL_LABELS)
+LLM_PROMPT_TOKENS = _METRICS.histogram(
+    "llm_prompt_tokens", "Prompt tokens per call (reported, else estimated).", _CALL_LABELS, _TOKEN_BUCKETS
+)
+LLM_COMPLETION_TOKENS = _METRICS.histogram(
+    "llm_completion_tokens", "Completion tokens per call from response metadata.", _CALL_LABELS, _TOKEN_BUCKETS
+)
+LLM_CACHED_PROMPT_TOKENS = _METRICS.histogram(
+    "llm_cached_prompt_tokens",
+    "Prompt tokens served from the provider's prefix cache per call.",
+    _CALL_LABELS,
+    (0,) + _TOKEN_BUCKETS,
+)
+LLM_TRUNCATED = _METRICS.counter(
+    "llm_truncated_total", "Completions cut off by the max_tokens budget (finish_reason=length).", _CALL_LABELS
+)
+LLM_BUDGET_RATIO = _METRICS.histogram(
+    "llm_completion_budget_ratio",
+    "Completion tokens as a fraction of the call's max_tokens budget.",
+    _CALL_LABELS,
+    (0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+LLM_QUEUE_SECONDS = _METRICS.histogram(
+    "llm_queue_seconds",
+    "Time spent waiting for local rate-limit capacity per call.",
+    _CALL_LABELS,
+    (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LLM_UPSTREAM_SECONDS = _METRICS.histogram(
+    "llm_upstream_latency_seconds", "Time spent inside provider calls per call, summed over attempts.", _CALL_LABELS
+)
+LLM_CALL_SECONDS = _METRICS.histogram(
+    "llm_call_duration_seconds", "Wall time per logical call including queueing and backoff.", _CALL_LABELS
+)
+
+_ENDPOINT: ContextVar[str] = ContextVar("llm_endpoint", default="none")
+
+
+@contextmanager
+def endpoint_context(endpoint: str) -> Iterator[None]:
+    """Label LLM calls made inside this block (and tasks/threads it spawns) with *endpoint*."""
+    token = _ENDPOINT.set(endpoint)
+    try:
+        yield
+    finally:
+        _ENDPOINT.reset(token)
+
+
+def current_endpoint() -> str:
+    return _ENDPOINT.get()
+
+
+def usage_tokens(response: Any) -> tuple[Optional[int], Optional[int]]:
+    """Return ``(prompt_tokens, completion_tokens)`` reported on a chat response, if any."""
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict) and ("input_tokens" in usage or "output_tokens" in usage):
+        return usage.get("input_tokens"), usage.get("output_tokens")
+    metadata = getattr(response, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") if isinstance(metadata, dict) else None
+    if isinstance(token_usage, dict):
+        return token_usage.get("prompt_tokens"), token_usage.get("completion_tokens")
+    return None, None
+
+
+def cached_prompt_tokens(response: Any) -> Optional[int]:
+    """Return prompt tokens the provider served from its prefix cache, if reported."""
+    usage = getattr(response, "usage_metadata", None)
+    details = usage.get("input_token_details") if isinstance(usage, dict) else None
+    if isinstance(details, dict) and details.get("cache_read") is not None:
+        return int(details["cache_read"])
+    metadata = getattr(response, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") if isinstance(metadata, dict) else None
+    prompt_details = token_usage.get("prompt_tokens_details") if isinstance(token_usage, dict) else None
+    if isinstance(prompt_details, dict) and prompt_details.get("cached_tokens") is not None:
+        return int(prompt_details["cached_tokens"])
+    return None
+
+
+def finish_reason(response: Any) -> Optional[str]:
+    """Return the provider's finish reason (``stop``, ``length``, ...) reported on a chat response."""
+    metadata = getattr(response, "response_metadata", None) or {}
+    if not isinstance(metadata, dict):
+        return None
+    reason = metadata.get("finish_reason") or metadata.get("stop_reason")
+    return str(reason) if reason else None
+
+
+def record_cache_hit(tool: Optional[str], model: Optional[str]) -> None:
+    LLM_CALLS.inc(tool=tool or "unknown", model=model or "unknown", endpoint=current_endpoint(), outcome="cache_hit")
+
+
+class LLMCallRecord:
+    """Accumulates one logical LLM call's accounting and publishes it on :meth:`finish`."""
+
+    def __init__(
+        self, tool: Optional[str], model: Optional[str], prompt: Optional[str], max_tokens: Optional[int] = None
+    ) -> None:
+        self.labels = {"tool": tool or "unknown", "model": model or "unknown", "endpoint": current_endpoint()}
+        self.prompt_chars = len(prompt) if prompt is not None else 0
+        self.max_tokens = max_tokens
+        self.started = time.perf_counter()
+        self.queue_seconds = 0.0
+        self.upstream_seconds = 0.0
+        self.retries = 0
+        self.finished = False
+
+    def finish(self, outcome: str, response: Any = None, model: Optional[str] = None) -> None:
+        """Publish the call, labelled with *model* (the one that served it) when given."""
+        if self.finished:
+            return
+        self.finished = True
+        if model:
+            self.labels["model"] = model
+        labels = self.labels
+        prompt_tokens, completion_tokens = usage_tokens(response) if response is not None else (None, None)
+        if prompt_tokens is None and self.prompt_chars:
+            prompt_tokens = max(1, self.prompt_chars // 4)
+        LLM_CALLS.inc(outcome=outcome, **labels)
+        if self.retries:
+            LLM_RETRIES.inc(self.retries, **labels)
+        if self.prompt_chars:
+            LLM_PROMPT_CHARS.inc(self.prompt_chars, **labels)
+        if prompt_tokens is not None:
+            LLM_PROMPT_TOKENS.observe(prompt_tokens, **labels)
+        cached_tokens = cached_prompt_tokens(response) if response is not None else None
+        if cached_tokens is not None:
+            LLM_CACHED_PROMPT_TOKENS.observe(cached_tokens, **labels)
+        if completion_tokens is not None:
+            LLM_COMPLETION_TOKENS.observe(completion_tokens, **labels)
+            if self.max_tokens:
+                LLM_BUDGET_RATIO.observe(completion_tokens / self.max_tokens, **labels)
+        if response is not None and finish_reason(response) in ("length", "max_tokens"):
+            LLM_TRUNCATED.inc(**labels)
+        LLM_QUEUE_SECONDS.observe(self.queue_seconds, **labels)
+        LLM_UPSTREAM_SECONDS.observe(self.upstream_seconds, **labels)
+        LLM_CALL_SECONDS.observe(time.perf_counter() - self.started, **labels)
@@ -0,0 +1,106 @@
+"""
+Per-client concurrency cap
+
+Optional admission stage for async LLM calls (``LLM_BATCH_ENABLED``). At most
+``LLM_BATCH_MAX_CONCURRENCY`` ``ainvoke`` calls run at once on the same client;
+the rest wait in arrival order for a slot. Each call runs in its caller's task,
+so results, errors and cancellation (a client disconnect, a ``wait_for``
+timeout) stay with that caller.
+
+This is not request batching: chat-completions APIs have no synchronous
+multi-prompt endpoint, so every call is still its own HTTP request, and no
+collection window is held open. The module and ``LLM_BATCH_*`` names are kept
+so existing configuration still applies.
+
+Time spent waiting for a slot is exported as ``llm_batch_wait_seconds``.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+from agent.utils.llm_metrics import get_metrics
+
+_BATCH_LABELS = ("provider", "model")
+_BATCHED = get_metrics().counter(
+    "llm_batched_requests_total", "Requests admitted through the per-client concurrency cap.", _BATCH_LABELS
+)
+_BATCH_WAIT = get_metrics().histogram(
+    "llm_batch_wait_seconds",
+    "Time a request waited for a slot under the per-client concurrency cap.",
+    _BATCH_LABELS,
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class BatchSettings:
+    enabled: bool = False
+    max_concurrency: int = 8
+
+    @classmethod
+    def from_env(cls) -> "BatchSettings":
+        return cls(
+            enabled=os.getenv("LLM_BATCH_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on"),
+            max_concurrency=max(1, _env_int("LLM_BATCH_MAX_CONCURRENCY", 8)),
+        )
+
+
+class _Gate:
+    def __init__(self, limit: int) -> None:
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class MicroBatcher:
+    def __init__(self, settings: Optional[BatchSettings] = None) -> None:
+        self.settings = settings or BatchSettings.from_env()
+        self._lock = threading.Lock()
+        self._gates: dict[Hashable, _Gate] = {}
+        self._counters = {"requests": 0, "waited": 0}
+
+    async def submit(self, llm: Any, prompt: Any, kwargs: dict[str, Any], provider: str, model: str) -> Any:
+        """Run ``llm.ainvoke(prompt, **kwargs)`` once its client has a free slot."""
+        key = (id(asyncio.get_running_loop()), id(llm))
+        with self._lock:
+            gate = self._gates.get(key)
+            if gate is None:
+                gate = self._gates[key] = _Gate(self.settings.max_concurrency)
+            gate.users += 1
+        labels = {"provider": provider, "model": model}
+        enqueued = time.perf_counter()
+        try:
+            waited = gate.semaphore.locked()
+            async with gate.semaphore:
+                _BATCH_WAIT.observe(time.perf_counter() - enqueued, **labels)
+                _BATCHED.inc(**labels)
+                with self._lock:
+                    self._counters["requests"] += 1
+                    self._counters["waited"] += int(waited)
+                return await llm.ainvoke(prompt, **kwargs)
+        finally:
+            with self._lock:
+                gate.users -= 1
+                if not gate.users:
+                    del self._gates[key]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            pending = sum(gate.users for gate in self._gates.values())
+        return {
+            "enabled": self.settings.enabled,
+            "max_concurrency": self.settings.max_concurrency,
+            "pending": pending,  # running or waiting for a slot
+            **counters,
+        }
@@ -0,0 +1,198 @@
+"""
+Model Routing
+
+Task-aware model selection for LLM calls. A routing table (``LLM_ROUTES`` JSON,
+or a JSON file named by ``LLM_ROUTES_FILE``) maps a call's tool name, difficulty,
+estimated prompt tokens and retry attempt to a provider/model, with a per-route
+timeout and fallback. The first matching route wins; calls that match no route
+use the default client. Per-route latency, token and cost figures are logged and
+kept for ``GET /llm/stats`` and ``GET /metrics`` so the table can be tuned.
+
+Example::
+
+    LLM_ROUTES='[
+      {"name": "plan-fast", "tools": ["plan_learning_path"], "model": "llama-3.1-8b-instant", "timeout": 20},
+      {"name": "advanced-teach", "tools": ["teach_concept"], "difficulties": ["advanced"],
+       "model": "llama-3.3-70b-versatile", "timeout": 60, "fallback_model": "llama-3.1-8b-instant"}
+    ]'
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Optional
+
+from agent.utils.llm_metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+_ROUTE_CALLS = get_metrics().counter("llm_route_calls_total", "Routed LLM calls by route and outcome.", ("route", "outcome"))
+_ROUTE_SECONDS = get_metrics().histogram("llm_route_latency_seconds", "Wall time of routed LLM calls.", ("route",))
+_ROUTE_COST = get_metrics().counter(
+    "llm_route_cost_usd_total", "Estimated spend of routed LLM calls from per-route token prices.", ("route",)
+)
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    temperature: Optional[float] = None
+    timeout: Optional[float] = None
+    fallback_provider: Optional[str] = None
+    fallback_model: Optional[str] = None
+    tools: tuple[str, ...] = ()
+    difficulties: tuple[str, ...] = ()
+    min_prompt_tokens: int = 0
+    max_prompt_tokens: Optional[int] = None
+    min_retry_attempt: int = 0
+    max_retry_attempt: Optional[int] = None
+    input_cost_per_1k: float = 0.0
+    output_cost_per_1k: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Route":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"unknown route keys: {', '.join(sorted(unknown))}")
+        values = dict(data)
+        for key in ("tools", "difficulties"):
+            if key in values:
+                values[key] = tuple(str(v).lower() for v in values[key])
+        if not values.get("name"):
+            raise ValueError("route needs a name")
+        return cls(**values)
+
+    @property
+    def has_fallback(self) -> bool:
+        return bool(self.fallback_provider or self.fallback_model)
+
+    def matches(self, tool: Optional[str], difficulty: Optional[str], prompt_tokens: int, retry_attempt: int) -> bool:
+        if self.tools and (tool or "").lower() not in self.tools:
+            return False
+        if self.difficulties and (difficulty or "").lower() not in self.difficulties:
+            return False
+        if prompt_tokens < self.min_prompt_tokens:
+            return False
+        if self.max_prompt_tokens is not None and prompt_tokens > self.max_prompt_tokens:
+            return False
+        if retry_attempt < self.min_retry_attempt:
+            return False
+        return self.max_retry_attempt is None or retry_attempt <= self.max_retry_attempt
+
+    def cost(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> float:
+        return ((prompt_tokens or 0) * self.input_cost_per_1k + (completion_tokens or 0) * self.output_cost_per_1k) / 1000
+
+
+def parse_routes(spec: str) -> list[Route]:
+    """Parse a JSON list of route objects; malformed input is logged and ignored."""
+    if not spec.strip():
+        return []
+    try:
+        raw = json.loads(spec)
+        if not isinstance(raw, list):
+            raise ValueError("expected a JSON list of routes")
+        return [Route.from_dict(entry) for entry in raw]
+    except (ValueError, TypeError) as exc:
+        logger.warning("Ignoring malformed LLM_ROUTES: %s", exc)
+        return []
+
+
+class _RouteStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+
+class ModelRouter:
+    def __init__(self, routes: Optional[list[Route]] = None) -> None:
+        self.routes = list(routes or [])
+        self._lock = threading.Lock()
+        self._stats: dict[str, _RouteStats] = {}
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        path = os.getenv("LLM_ROUTES_FILE", "").strip()
+        if path:
+            try:
+                return cls(parse_routes(Path(path).read_text(encoding="utf-8")))
+            except OSError as exc:
+                logger.warning("Could not read LLM_ROUTES_FILE %s: %s", path, exc)
+        return cls(parse_routes(os.getenv("LLM_ROUTES", "")))
+
+    def select(
+        self,
+        tool: Optional[str],
+        difficulty: Optional[str] = None,
+        prompt_tokens: int = 0,
+        retry_attempt: int = 0,
+    ) -> Optional[Route]:
+        for route in self.routes:
+            if route.matches(tool, difficulty, prompt_tokens, retry_attempt):
+                return route
+        return None
+
+    def record(
+        self,
+        route: Route,
+        seconds: float,
+        outcome: str,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+    ) -> None:
+        """Account one routed call (*outcome*: success, fallback or an error label) and log it."""
+        cost = route.cost(prompt_tokens, completion_tokens)
+        with self._lock:
+            stats = self._stats.setdefault(route.name, _RouteStats())
+            stats.calls += 1
+            stats.errors += outcome not in ("success", "fallback")
+            stats.fallbacks += outcome == "fallback"
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.prompt_tokens += prompt_tokens or 0
+            stats.completion_tokens += completion_tokens or 0
+            stats.cost += cost
+        _ROUTE_CALLS.inc(route=route.name, outcome=outcome)
+        _ROUTE_SECONDS.observe(seconds, route=route.name)
+        if cost:
+            _ROUTE_COST.inc(cost, route=route.name)
+        logger.info(
+            "LLM route %s: %s in %.2fs, tokens %s/%s, cost $%.5f",
+            route.name,
+            outcome,
+            seconds,
+            prompt_tokens if prompt_tokens is not None else "?",
+            completion_tokens if completion_tokens is not None else "?",
+            cost,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            snapshot = {name: vars(s).copy() for name, s in self._stats.items()}
+        out: dict[str, Any] = {}
+        for route in self.routes:
+            s = snapshot.get(route.name, vars(_RouteStats()))
+            out[route.name] = {
+                "model": route.model,
+                "provider": route.provider,
+                "calls": s["calls"],
+                "errors": s["errors"],
+                "fallbacks": s["fallbacks"],
+                "mean_seconds": round(s["seconds"] / s["calls"], 3) if s["calls"] else None,
+                "max_seconds": round(s["max_seconds"], 3),
+                "prompt_tokens": s["prompt_tokens"],
+                "completion_tokens": s["completion_tokens"],
+                "cost_usd": round(s["cost"], 6),
+            }
+        return out
@@ -0,0 +1,20 @@
+"""
+OpenAI-Compatible Provider
+
+Chat model for self-hosted inference servers that speak the OpenAI
+chat-completions API (vLLM, llama.cpp server, TGI, Ollama, ...), selected with
+``LLM_PROVIDER=openai_compatible`` and ``LLM_BASE_URL``. It is ``ChatOpenAI``
+with its own ``_llm_type``, so circuit breakers, rate limits, concurrency
+windows, connection pools and metrics treat the local server as a separate
+provider from api.openai.com.
+"""
+
+from langchain_openai import ChatOpenAI
+
+PROVIDER = "openai_compatible"
+
+
+class ChatOpenAICompatible(ChatOpenAI):
+    @property
+    def _llm_type(self) -> str:
+        return f"{PROVIDER}-chat"
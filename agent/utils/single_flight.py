@@ -0,0 +1,116 @@
+"""
+Single-flight Request Coalescing
+
+Concurrent callers that ask for the same key share one in-flight execution and
+its result (or exception) instead of each issuing an identical upstream call.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]") -> None:
+        self.task = task
+        self.waiters = 1
+
+
+class SingleFlight:
+    """Deduplicate concurrent executions per key, for threads and for asyncio tasks.
+
+    Threads use :meth:`do`; coroutines use :meth:`ado`. The async variant runs the
+    work in its own task so a follower's cancellation never cancels the shared call;
+    the task is cancelled only when every waiter has gone away.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self._acalls: dict[str, _AsyncCall] = {}
+        self._counters = {"leaders": 0, "collapsed": 0, "abandoned": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._counters["leaders"] += 1
+            else:
+                call.waiters += 1
+                self._counters["collapsed"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._acalls.get(key)
+            if call is not None and call.task.get_loop() is loop and not call.task.done():
+                call.waiters += 1
+                self._counters["collapsed"] += 1
+            else:
+                call = _AsyncCall(loop.create_task(self._arun(key, fn)))
+                self._acalls[key] = call
+                self._counters["leaders"] += 1
+
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                call.waiters -= 1
+                orphaned = call.waiters <= 0 and not call.task.done()
+                if orphaned:
+                    self._counters["abandoned"] += 1
+            if orphaned:
+                call.task.cancel()
+            raise
+
+    async def _arun(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await fn()
+        finally:
+            with self._lock:
+                current = self._acalls.get(key)
+                if current is not None and current.task is asyncio.current_task():
+                    del self._acalls[key]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = len(self._calls) + len(self._acalls)
+        calls = counters["leaders"] + counters["collapsed"]
+        return {
+            **counters,
+            "in_flight": in_flight,
+            "collapse_ratio": round(counters["collapsed"] / calls, 4) if calls else 0.0,
+        }
@@ -0,0 +1,118 @@
+"""Benchmark per-call client overhead: LangChain ``ChatGroq`` vs ``DirectChatClient``.
+
+The upstream is stubbed with ``httpx.MockTransport`` (a canned chat-completions
+response, no sockets), so the numbers are pure client-side cost: message
+building, callbacks, request serialisation, response parsing and allocation.
+
+Usage (from the repo root):
+
+    python scripts/bench_llm_client.py
+    python scripts/bench_llm_client.py --calls 5000 --concurrency 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.utils.llm_client import DirectChatClient  # noqa: E402
+
+PROMPT = 'Create a clear lesson for the concept "Recursion" at beginner level. ' * 20
+BODY = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench-model",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "x" * 2000}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 300, "completion_tokens": 500, "total_tokens": 800},
+}).encode()
+
+
+def _stub(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, content=BODY, headers={"content-type": "application/json"})
+
+
+def _clients() -> dict[str, Any]:
+    from langchain_groq import ChatGroq
+
+    transport = httpx.MockTransport(_stub)
+    sync_client, async_client = httpx.Client(transport=transport), httpx.AsyncClient(transport=transport)
+    return {
+        "langchain": ChatGroq(
+            model="bench-model",
+            api_key="gsk_bench",  # type: ignore[arg-type]
+            http_client=sync_client,
+            http_async_client=async_client,
+            max_retries=0,
+        ),
+        "direct": DirectChatClient(
+            "groq", "bench-model", 0.7, "gsk_bench", "https://api.groq.com/openai/v1", sync_client, async_client
+        ),
+    }
+
+
+def _sync_us_per_call(invoke: Callable[[str], Any], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        invoke(PROMPT)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def _async_calls_per_second(ainvoke: Callable[[str], Any], calls: int, concurrency: int) -> float:
+    async def run() -> float:
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one() -> None:
+            async with gate:
+                await ainvoke(PROMPT)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(calls)))
+        return calls / (time.perf_counter() - start)
+
+    return asyncio.run(run())
+
+
+def _memory_per_call(invoke: Callable[[str], Any], calls: int) -> tuple[float, float]:
+    """Return (retained KiB per call, peak KiB above baseline) over *calls* sequential calls."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(calls):
+        invoke(PROMPT)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (current - before) / 1024 / calls, (peak - before) / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000, help="calls per measurement")
+    parser.add_argument("--concurrency", type=int, default=32, help="in-flight async calls")
+    args = parser.parse_args()
+
+    clients = _clients()
+    for client in clients.values():  # warm imports, pydantic validators and the transport
+        client.invoke(PROMPT)
+
+    print(f"{'client':<10} {'sync µs/call':>14} {'async calls/s':>14} {'retained KiB/call':>18} {'peak KiB':>10}")
+    for name, client in clients.items():
+        sync_us = _sync_us_per_call(client.invoke, args.calls)
+        qps = _async_calls_per_second(client.ainvoke, args.calls, args.concurrency)
+        retained, peak = _memory_per_call(client.invoke, min(args.calls, 500))
+        print(f"{name:<10} {sync_us:14.1f} {qps:14.0f} {retained:18.2f} {peak:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark PDF page extraction: serial ``load_pdf_file`` vs the process-pool path.
+
+A synthetic text-heavy PDF is generated once, then each mode is loaded in a fresh
+interpreter so that peak RSS is not shared between runs. ``parent peak`` is the
+loading process; ``worker peak`` is the largest single worker process (0 for serial).
+Parallel wall time includes spawning the pool, which a long-running server pays once.
+
+Usage (from the repo root):
+
+    python scripts/bench_pdf_loader.py
+    python scripts/bench_pdf_loader.py --pages 600 --workers 4 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+LINE = "Recursion solves a problem by reducing it to smaller instances of the same problem. "
+
+
+def _make_pdf(path: str, pages: int) -> None:
+    import fitz  # type: ignore[import-untyped]
+
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        text = f"Chapter {n // 20 + 1}, page {n + 1}\n" + "\n".join(LINE for _ in range(45))
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def _run(pdf: str, mode: str, repeat: int) -> None:
+    """Child-process entry point: load *pdf* and print timings and peak RSS as JSON."""
+    from agent.utils import content_loader
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        loaded = content_loader.load_pdf_file(pdf, parallel=mode == "parallel")
+        timings.append(time.perf_counter() - started)
+    content_loader.shutdown_pdf_pool()
+    print(json.dumps({
+        "first_s": timings[0],
+        "best_s": min(timings),
+        "pages": loaded.metadata["page_count"],
+        "chars": len(loaded.raw_text),
+        "parent_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "worker_kib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=600)
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--repeat", type=int, default=3, help="loads per mode; 'best' excludes pool start-up")
+    parser.add_argument("--run", choices=("serial", "parallel"), help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        _run(args.pdf, args.run, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "bench.pdf")
+        _make_pdf(pdf, args.pages)
+        print(f"{args.pages} pages, {os.path.getsize(pdf) / 1e6:.1f} MB, {args.workers} workers")
+        print(f"{'mode':<10} {'first s':>9} {'best s':>9} {'parent peak MiB':>16} {'worker peak MiB':>16}")
+        results = {}
+        for mode in ("serial", "parallel"):
+            env = {**os.environ, "PDF_PARALLEL_WORKERS": str(args.workers)}
+            out = subprocess.run(
+                [sys.executable, __file__, "--run", mode, "--pdf", pdf, "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True, env=env,
+            ).stdout
+            results[mode] = r = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{mode:<10} {r['first_s']:9.2f} {r['best_s']:9.2f} "
+                f"{r['parent_kib'] / 1024:16.1f} {r['worker_kib'] / 1024:16.1f}"
+            )
+        assert results["serial"]["chars"] == results["parallel"]["chars"], "parallel output differs"
+
+
+if __name__ == "__main__":
+    main()
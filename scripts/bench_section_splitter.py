@@ -0,0 +1,99 @@
+"""Benchmark the plain-text and Markdown section splitters on large synthetic inputs.
+
+Three inputs: a transcript (short merged replies between real paragraphs), a
+log (one opening paragraph, then nothing but tiny blank-line-separated entries,
+which all merge into one section) and heading-dense Markdown. Throughput that
+stays flat as the size grows means linear scaling. The previous splitter, which
+re-copied the growing section body on every merge, is run on the log at the
+small ``--legacy-mb`` sizes for comparison; its throughput collapses as the
+input grows.
+
+Usage (from the repo root):
+
+    python scripts/bench_section_splitter.py
+    python scripts/bench_section_splitter.py --sizes 1 5 10 25 50 --legacy-mb 0.05 0.1 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.utils.content_loader import ContentSection, _parse_markdown_sections, _split_into_sections  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def _transcript(size: int) -> str:
+    block = (
+        "Session log 12:00\nThe lecturer opens with a recap of last week's material on graph search.\n\n"
+        "ok\n\nyes\n\nnext slide\n\n"
+    )
+    return block * (size // len(block) + 1)
+
+
+def _log(size: int) -> str:
+    head = "Build log\nThe nightly build started; each step below is reported on its own line.\n\n"
+    return head + "\n\n".join(["step ok"] * (size // 9 + 1))
+
+
+def _markdown(size: int) -> str:
+    block = "## Step\nVisit the node, mark it, push its neighbours.\n\n### Note\nshort\n\n"
+    return block * (size // len(block) + 1)
+
+
+def _legacy_split(text: str, source_file: str = "", min_section_length: int = 50) -> list[ContentSection]:
+    """The pre-streaming splitter, kept here as a baseline."""
+    paragraphs = re.split(r"\n\s*\n", text.strip())
+    sections: list[ContentSection] = []
+    for idx, para in enumerate(paragraphs):
+        para = para.strip()
+        if not para:
+            continue
+        lines = para.split("\n", 1)
+        if len(lines) == 2 and len(lines[0]) < 80:
+            title, body = lines[0].strip(), lines[1].strip()
+        else:
+            title, body = "", para
+        if len(body) < min_section_length and idx > 0 and sections:
+            sections[-1].body += "\n\n" + body
+            continue
+        sections.append(ContentSection(title=title, body=body, source_file=source_file, section_index=len(sections)))
+    return sections
+
+
+def _time(fn: Callable[[str], list[ContentSection]], text: str) -> tuple[float, int]:
+    started = time.perf_counter()
+    sections = fn(text)
+    return time.perf_counter() - started, len(sections)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 10, 25, 50], help="input sizes in MB")
+    parser.add_argument("--legacy-mb", type=float, nargs="*", default=[0.05, 0.1, 0.2], help="log sizes for the old splitter")
+    args = parser.parse_args()
+
+    print(f"{'input':<12} {'splitter':<10} {'MB':>6} {'seconds':>9} {'MB/s':>8} {'sections':>9}")
+    runs = [
+        ("transcript", "text", _transcript, _split_into_sections, args.sizes),
+        ("log", "text", _log, _split_into_sections, args.sizes),
+        ("markdown", "markdown", _markdown, _parse_markdown_sections, args.sizes),
+        ("log", "text", _log, _split_into_sections, args.legacy_mb),
+        ("log", "legacy", _log, _legacy_split, args.legacy_mb),
+    ]
+    for label, name, make, fn, sizes in runs:
+        for mb in sizes:
+            text = make(int(mb * MB))
+            seconds, count = _time(fn, text)
+            print(f"{label:<12} {name:<10} {mb:6.2f} {seconds:9.3f} {len(text) / MB / seconds:8.1f} {count:9d}")
+
+
+if __name__ == "__main__":
+    main()
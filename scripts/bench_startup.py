@@ -0,0 +1,109 @@
+"""Benchmark cold import time and uvicorn time-to-first-request.
+
+Usage (from the repo root):
+
+    python scripts/bench_startup.py                # imports + /ping
+    python scripts/bench_startup.py --llm          # also first plan call (LLM_PROVIDER=fake)
+    python scripts/bench_startup.py --runs 10 --modules agent.utils webapi.main
+
+Every measurement runs in a fresh interpreter so nothing is already imported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = [
+    "agent.utils",
+    "agent.utils.content_loader",
+    "agent.core.state",
+    "agent.tools.evaluator_tool",
+    "agent.utils.llm_client",
+    "agent.tools.teacher_tool",
+    "webapi.main",
+]
+SAMPLE_MATERIAL = b"# Recursion\nA function that calls itself.\n# Base case\nStops the recursion.\n"
+
+
+def _import_seconds(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _first_request_seconds(with_llm: bool) -> dict[str, float]:
+    port = _free_port()
+    env = {**os.environ, "LLM_PROVIDER": "fake"} if with_llm else dict(os.environ)
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "webapi.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    timings: dict[str, float] = {}
+    try:
+        with httpx.Client(base_url=base, timeout=5.0) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before serving a request")
+                try:
+                    if client.get("/ping").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            timings["ping"] = time.perf_counter() - start
+            if with_llm:
+                files = {"files": ("notes.md", SAMPLE_MATERIAL, "text/markdown")}
+                session_id = client.post("/session/from-upload", files=files).json()["session_id"]
+                client.post(f"/session/{session_id}/plan", json={"topic": "Recursion"}).raise_for_status()
+                timings["first_plan"] = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement (median reported)")
+    parser.add_argument("--modules", nargs="*", default=DEFAULT_MODULES, help="modules to time on cold import")
+    parser.add_argument("--llm", action="store_true", help="also time the first /plan call with LLM_PROVIDER=fake")
+    parser.add_argument("--skip-server", action="store_true", help="only measure imports")
+    args = parser.parse_args()
+
+    print(f"Cold import time (median of {args.runs} fresh interpreters)")
+    for module in args.modules:
+        samples = [_import_seconds(module) for _ in range(args.runs)]
+        print(f"  {module:<32} {statistics.median(samples) * 1000:8.1f} ms")
+
+    if args.skip_server:
+        return
+    print(f"\nuvicorn time-to-first-request (median of {args.runs} cold starts)")
+    runs = [_first_request_seconds(args.llm) for _ in range(args.runs)]
+    for name in runs[0]:
+        print(f"  {name:<32} {statistics.median(r[name] for r in runs) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
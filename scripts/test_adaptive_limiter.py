@@ -0,0 +1,117 @@
+"""Unit tests for the AIMD adaptive concurrency limiter (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent.utils import llm_client
+from agent.utils.adaptive_limiter import AdaptiveLimiter, ConcurrencyLimitError, LimiterBoard, LimiterSettings
+from agent.utils.fake_llm import FakeChatModel, FakeLLMError
+from agent.utils.llm_client import async_call_with_retry, call_with_retry
+from agent.utils.llm_metrics import render_metrics
+
+
+def _limiter(**overrides) -> AdaptiveLimiter:
+    settings = {"initial": 2, "max_limit": 8, "queue_timeout": 1.0, **overrides}
+    return AdaptiveLimiter(LimiterSettings(**settings), "test", "aimd")
+
+
+def test_window_grows_additively_and_halves_on_overload() -> None:
+    limiter = _limiter()
+    for _ in range(11):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 5
+
+    limiter.acquire()
+    limiter.release(overloaded=True)
+    assert limiter.limit == 2
+    assert limiter.stats()["decreases"] == 1
+
+
+def test_latency_spike_shrinks_window() -> None:
+    limiter = _limiter(initial=8)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    limiter.acquire()
+    limiter.release(latency=1.0)
+    assert limiter.limit == 4
+
+
+def test_queued_caller_gets_released_slot_and_times_out_when_full() -> None:
+    limiter = _limiter(initial=1)
+    limiter.acquire()
+    waited: list[float] = []
+    worker = threading.Thread(target=lambda: waited.append(limiter.acquire()))
+    worker.start()
+    time.sleep(0.05)
+    assert limiter.stats()["queue_depth"] == 1
+    limiter.release()
+    worker.join(timeout=1)
+    assert waited and waited[0] > 0
+
+    with pytest.raises(ConcurrencyLimitError):
+        limiter.acquire(timeout=0.05)
+    assert limiter.stats()["rejected"] == 1
+    assert 'llm_concurrency_rejected_total{provider="test",model="aimd"} 1' in render_metrics()
+
+
+def test_async_waiters_queue_without_blocking_the_loop() -> None:
+    limiter = _limiter(initial=1, max_limit=1)
+
+    async def hold(seconds: float) -> None:
+        await limiter.aacquire()
+        await asyncio.sleep(seconds)
+        limiter.release(latency=seconds)
+
+    async def run() -> float:
+        started = time.perf_counter()
+        await asyncio.gather(hold(0.05), hold(0.05), hold(0.05))
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) >= 0.15
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_call_with_retry_shrinks_window_on_503(monkeypatch) -> None:
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    board = LimiterBoard(LimiterSettings(enabled=True, initial=8))
+    monkeypatch.setattr(llm_client, "_LIMITERS", board)
+
+    broken = FakeChatModel(model_name="aimd-broken", unavailable_rate=1.0)
+    with pytest.raises(FakeLLMError):
+        call_with_retry(broken.invoke, "x", max_attempts=1, base_delay=0, cache=False)
+    assert board.stats()["fake/aimd-broken"]["limit"] == 4
+
+    healthy = FakeChatModel(model_name="aimd-ok")
+    asyncio.run(async_call_with_retry(healthy.ainvoke, "x", cache=False))
+    stats = board.stats()["fake/aimd-ok"]
+    assert stats["in_flight"] == 0 and stats["acquired"] == 1
+
+
+def test_limiter_is_opt_in_and_starts_at_the_pool_size(monkeypatch) -> None:
+    for name in ("LLM_CONCURRENCY_ENABLED", "LLM_CONCURRENCY_INITIAL", "LLM_HTTP_MAX_CONNECTIONS", "LLM_SCHED_ENABLED"):
+        monkeypatch.delenv(name, raising=False)
+    # Scheduling alone gets a fixed window at the pool size; it never adapts.
+    fixed = LimiterBoard().get("groq", "m")
+    assert fixed is not None and fixed.limit == 20 and not fixed.settings.adaptive
+    fixed.acquire()
+    fixed.release(overloaded=True)
+    assert fixed.limit == 20
+    monkeypatch.setenv("LLM_SCHED_ENABLED", "false")
+    assert LimiterBoard().get("groq", "m") is None
+    monkeypatch.delenv("LLM_SCHED_ENABLED")
+
+    monkeypatch.setenv("LLM_CONCURRENCY_ENABLED", "true")
+    monkeypatch.setenv("LLM_HTTP_MAX_CONNECTIONS", "40")
+    monkeypatch.setenv("LLM_GROQ_HTTP_MAX_CONNECTIONS", "100")
+    board = LimiterBoard()
+    assert board.get("openai", "m").limit == 40  # type: ignore[union-attr]
+    assert board.get("groq", "m").limit == 100  # type: ignore[union-attr]
+    monkeypatch.setenv("LLM_CONCURRENCY_INITIAL", "4")
+    assert LimiterSettings.from_env("groq").initial == 4
@@ -32,15 +32,14 @@ def test_teach_returns_next_action_generate_quiz(monkeypatch) -> None:
     webmain.SESSIONS.clear()
     sid = _seed_session("teach-next-action")
 
-    monkeypatch.setattr(
-        webmain,
-        "teach_concept_payload",
-        lambda **kwargs: {
+    async def fake_teach(**kwargs):
+        return {
             "explanation": "Teaching content",
             "takeaways": ["Takeaway one", "Takeaway two"],
             "estimated_read_minutes": 2,
-        },
-    )
+        }
+
+    monkeypatch.setattr(webmain, "ateach_concept_payload", fake_teach)
 
     client = _client()
     resp = client.post(
@@ -124,14 +123,13 @@ def test_quiz_invalid_format_surfaces_error_code(monkeypatch) -> None:
     webmain.SESSIONS.clear()
     sid = _seed_session("quiz-invalid-format")
 
-    monkeypatch.setattr(
-        webmain,
-        "generate_quiz",
-        SimpleNamespace(invoke=lambda payload: {
+    async def fake_quiz(**kwargs):
+        return {
             "error": "Failed to generate valid multiple-choice questions with options.",
             "error_code": "invalid_quiz_format",
-        }),
-    )
+        }
+
+    monkeypatch.setattr(webmain, "agenerate_quiz", fake_quiz)
 
     client = _client()
     resp = client.post(
@@ -0,0 +1,94 @@
+"""Unit tests for the async LLM path (no network, no API key)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agent.tools import planner_tool, quizzer_tool, teacher_tool
+from agent.utils.llm_client import async_call_with_retry
+
+
+class _AsyncFakeLLM:
+    def __init__(self, responses: list[str]):
+        self._responses = responses
+        self.calls = 0
+
+    async def ainvoke(self, prompt: str, **kwargs):
+        payload = self._responses[min(self.calls, len(self._responses) - 1)]
+        self.calls += 1
+        await asyncio.sleep(0)
+        return SimpleNamespace(content=payload)
+
+
+def test_async_call_with_retry_retries_transient_errors() -> None:
+    attempts = {"n": 0}
+
+    async def flaky() -> str:
+        attempts["n"] += 1
+        if attempts["n"] < 3:
+            raise RuntimeError("Error code: 503 - service temporarily unavailable")
+        return "ok"
+
+    assert asyncio.run(async_call_with_retry(flaky, base_delay=0)) == "ok"
+    assert attempts["n"] == 3
+
+
+def test_async_call_with_retry_does_not_retry_permanent_errors() -> None:
+    attempts = {"n": 0}
+
+    async def broken() -> str:
+        attempts["n"] += 1
+        raise ValueError("invalid prompt")
+
+    with pytest.raises(ValueError):
+        asyncio.run(async_call_with_retry(broken, base_delay=0))
+    assert attempts["n"] == 1
+
+
+def test_aplan_learning_path_parses_numbered_list(monkeypatch) -> None:
+    fake = _AsyncFakeLLM(["1. Variables\n2. Loops\n3. Functions"])
+    monkeypatch.setattr(planner_tool, "get_llm_client", lambda: fake)
+
+    concepts = asyncio.run(planner_tool.aplan_learning_path("Python", "intermediate", 2))
+
+    assert [c["concept_name"] for c in concepts] == ["Variables", "Loops"]
+    assert all(c["difficulty"] == "intermediate" for c in concepts)
+
+
+def test_ateach_concept_payload_returns_parsed_json(monkeypatch) -> None:
+    fake = _AsyncFakeLLM([json.dumps({"explanation": "## Intro\n\nBody.", "takeaways": ["One"]})])
+    monkeypatch.setattr(teacher_tool, "get_llm_client", lambda: fake)
+
+    out = asyncio.run(teacher_tool.ateach_concept_payload("Loops"))
+
+    assert out["explanation"].startswith("## Intro")
+    assert out["takeaways"] == ["One"]
+
+
+def test_agenerate_quiz_regenerates_invalid_first_response(monkeypatch) -> None:
+    invalid = json.dumps({"questions": [{"question_type": "short_answer", "question": "Explain."}]})
+    valid = json.dumps(
+        {
+            "questions": [
+                {
+                    "question_type": "multiple_choice",
+                    "question": "What is a loop?",
+                    "options": ["A repetition", "A file", "A type", "A module"],
+                    "correct_answer": "A repetition",
+                    "explanation": "",
+                }
+            ]
+        }
+    )
+    fake = _AsyncFakeLLM([invalid, valid])
+    monkeypatch.setattr(quizzer_tool, "get_llm_client", lambda: fake)
+
+    result = asyncio.run(quizzer_tool.agenerate_quiz("Loops", num_questions=1))
+
+    assert "error" not in result
+    assert result["total_questions"] == 1
+    assert fake.calls == 2
@@ -0,0 +1,152 @@
+"""Unit tests for the LLM resilience policy: jittered backoff, breakers, failover."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agent.utils import llm_client
+from agent.utils.circuit_breaker import BreakerState, CircuitBreaker, CircuitOpenError
+from agent.utils.llm_client import _retry_delay, async_call_with_retry, call_with_retry
+from agent.utils.llm_metrics import LLM_CALLS
+
+
+class _HTTPError(Exception):
+    def __init__(self, message: str, headers: dict[str, str] | None = None):
+        super().__init__(message)
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class _FakeLLM:
+    temperature = 0.7
+
+    def __init__(self, provider: str, model: str, fail_with: Exception | None = None):
+        self._llm_type = f"{provider}-chat"
+        self.model_name = model
+        self.fail_with = fail_with
+        self.calls = 0
+
+    def invoke(self, prompt: str):
+        self.calls += 1
+        if self.fail_with is not None:
+            raise self.fail_with
+        return SimpleNamespace(content=f"{self.model_name}: {prompt}")
+
+
+@pytest.fixture(autouse=True)
+def _isolated_policy(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.delenv("LLM_FALLBACK_PROVIDER", raising=False)
+    monkeypatch.delenv("LLM_FALLBACK_MODEL", raising=False)
+    monkeypatch.setenv("LLM_BREAKER_FAILURE_THRESHOLD", "2")
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+
+
+def test_breaker_opens_then_half_open_probe_closes_it() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state is BreakerState.CLOSED
+    breaker.record_failure()
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.allow() is False
+
+    time.sleep(0.06)
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state is BreakerState.CLOSED
+
+
+def test_failed_probe_reopens_breaker() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+def test_full_jitter_stays_within_exponential_ceiling() -> None:
+    exc = RuntimeError("503 service unavailable")
+    delays = [_retry_delay(exc, base_delay=2.0, attempt=2) for _ in range(200)]
+    assert all(d is not None and 0 <= d <= 4.0 for d in delays)
+    assert len({round(d, 3) for d in delays if d is not None}) > 50
+
+
+def test_retry_after_hint_overrides_backoff_and_is_bounded() -> None:
+    hinted = _retry_delay(_HTTPError("429 rate limit", {"retry-after": "3"}), base_delay=2.0, attempt=1)
+    assert hinted is not None and 3.0 <= hinted <= 3.5
+    assert _retry_delay(_HTTPError("429", {"retry-after": "120"}), base_delay=2.0, attempt=1) is None
+
+
+def test_open_breaker_fails_fast_without_fallback() -> None:
+    llm = _FakeLLM("flaky", "m1", fail_with=RuntimeError("503 service unavailable"))
+    with pytest.raises(RuntimeError):
+        call_with_retry(llm.invoke, "hi", max_attempts=2, base_delay=0)
+    assert llm_client.circuit_breaker_stats()["flaky"]["state"] == "open"
+
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(llm.invoke, "hi again", base_delay=0)
+    assert llm.calls == 2
+
+
+def test_open_breaker_fails_over_to_configured_model(monkeypatch) -> None:
+    primary = _FakeLLM("flaky", "m1", fail_with=RuntimeError("connection reset"))
+    backup = _FakeLLM("backup", "b1")
+    monkeypatch.setenv("LLM_FALLBACK_PROVIDER", "backup")
+    monkeypatch.setenv("LLM_FALLBACK_MODEL", "b1")
+    monkeypatch.setattr(llm_client._REGISTRY, "get", lambda **kwargs: backup)
+
+    labels = {"tool": "unknown", "endpoint": "none", "outcome": "fallback"}
+    before = LLM_CALLS.value(model="b1", **labels)
+    result = call_with_retry(primary.invoke, "teach loops", max_attempts=3, base_delay=0)
+
+    assert primary.calls == 2  # two failures open the breaker; attempt 3 fails over
+    assert backup.calls == 1
+    assert result.content == "b1: teach loops"
+    # Labelled with the model that answered, not the requested one.
+    assert LLM_CALLS.value(model="b1", **labels) == before + 1
+    assert LLM_CALLS.value(model="m1", **labels) == 0
+
+
+def test_rate_limits_and_permanent_errors_do_not_trip_breaker() -> None:
+    limited = _FakeLLM("quota", "m", fail_with=RuntimeError("429 rate limit exceeded"))
+    with pytest.raises(RuntimeError):
+        call_with_retry(limited.invoke, "x", max_attempts=3, base_delay=0)
+    broken = _FakeLLM("quota", "m", fail_with=ValueError("bad request"))
+    with pytest.raises(ValueError):
+        call_with_retry(broken.invoke, "x", base_delay=0)
+    assert llm_client.circuit_breaker_stats()["quota"]["state"] == "closed"
+
+
+def test_cancelled_half_open_probe_releases_its_slot(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_BREAKER_RECOVERY_SECONDS", "0.01")
+    breaker = llm_client._BREAKERS.get("flaky")
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    class _HangingLLM(_FakeLLM):
+        async def ainvoke(self, prompt: str):
+            self.calls += 1
+            await asyncio.sleep(10)
+
+    llm = _HangingLLM("flaky", "m1")
+
+    async def cancel_probe() -> None:
+        probe = asyncio.ensure_future(async_call_with_retry(llm.ainvoke, "probe", cache=False))
+        await asyncio.sleep(0.05)
+        assert breaker.state is BreakerState.HALF_OPEN and breaker.allow() is False
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(cancel_probe())
+    assert llm.calls == 1
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert breaker.allow() is True
@@ -0,0 +1,135 @@
+"""Tests for the content-addressed cache of parsed uploads."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from agent.utils import content_cache
+from agent.utils.content_cache import ContentCache, content_key
+from agent.utils.content_loader import LoadedContent, load_content_bytes
+
+DATA = b"# Graphs\nA graph is a set of nodes joined by edges.\n\n## Search\nBreadth-first search visits by level.\n"
+SHA = hashlib.sha256(DATA).hexdigest()
+
+
+def _loader(calls: list[str]):
+    async def load() -> LoadedContent:
+        calls.append("parse")
+        await asyncio.sleep(0.01)
+        return load_content_bytes(DATA, "graphs.md")
+
+    return load
+
+
+def test_repeat_uploads_share_one_parse_and_one_dict() -> None:
+    cache = ContentCache()
+    calls: list[str] = []
+
+    async def scenario():
+        return await asyncio.gather(*(cache.aget_or_load(SHA, "graphs.md", _loader(calls)) for _ in range(5)))
+
+    entries = asyncio.run(scenario())
+    again = asyncio.run(cache.aget_or_load(SHA, "graphs.md", _loader(calls)))
+    assert calls == ["parse"]
+    assert all(entry is again for entry in entries)
+    assert again.shared == again.content.model_dump()
+    assert again.shared["raw_text"] is again.content.raw_text
+
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["memory_hits"] == 1 and stats["coalesced"] == 4
+    assert stats["entries"] == 1 and stats["text_bytes"] == again.size
+
+
+def test_key_covers_name_and_loader_version(monkeypatch) -> None:
+    assert content_key(SHA, "a/graphs.md") == content_key(SHA, "graphs.md")
+    assert content_key(SHA, "notes.md") != content_key(SHA, "graphs.md")
+    before = content_key(SHA, "graphs.md")
+    monkeypatch.setattr(content_cache, "LOADER_VERSION", "next")
+    assert content_key(SHA, "graphs.md") != before
+
+
+def test_memory_lru_evicts_by_count_and_size() -> None:
+    cache = ContentCache(max_entries=2)
+    for name in ("a.md", "b.md", "c.md"):
+        cache.put(SHA, name, load_content_bytes(DATA, name))
+    assert cache.get(SHA, "a.md") is None and cache.get(SHA, "c.md") is not None
+
+    size = cache.get(SHA, "c.md").size  # type: ignore[union-attr]
+    small = ContentCache(max_bytes=size + 1)
+    small.put(SHA, "a.md", load_content_bytes(DATA, "a.md"))
+    small.put(SHA, "b.md", load_content_bytes(DATA, "b.md"))
+    assert small.stats()["entries"] == 1 and small.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_restart_and_is_bounded(tmp_path: Path) -> None:
+    cache = ContentCache(disk_dir=str(tmp_path))
+    parsed = load_content_bytes(DATA, "graphs.md")
+    cache.put(SHA, "graphs.md", parsed)
+
+    restarted = ContentCache(disk_dir=str(tmp_path))
+    calls: list[str] = []
+    entry = asyncio.run(restarted.aget_or_load(SHA, "graphs.md", _loader(calls)))
+    assert calls == [] and entry.content == parsed
+    assert restarted.stats()["disk_hits"] == 1
+
+    (tmp_path / f"{content_key(SHA, 'graphs.md')}.json").write_text("{not json")
+    assert ContentCache(disk_dir=str(tmp_path)).get(SHA, "graphs.md") is None
+
+    one_file = len(parsed.model_dump_json()) + 10
+    bounded = ContentCache(disk_dir=str(tmp_path / "small"), disk_max_bytes=one_file)
+    bounded.put(SHA, "a.md", load_content_bytes(DATA, "a.md"))
+    bounded.put(SHA, "b.md", load_content_bytes(DATA, "b.md"))
+    assert len(list((tmp_path / "small").glob("*.json"))) == 1
+    assert bounded.stats()["disk_evictions"] == 1
+
+
+def test_disabled_cache_always_parses(monkeypatch) -> None:
+    monkeypatch.setenv("CONTENT_CACHE_ENABLED", "false")
+    cache = ContentCache.from_env()
+    calls: list[str] = []
+    asyncio.run(cache.aget_or_load(SHA, "graphs.md", _loader(calls)))
+    asyncio.run(cache.aget_or_load(SHA, "graphs.md", _loader(calls)))
+    assert calls == ["parse", "parse"] and cache.stats()["entries"] == 0
+
+
+def test_sessions_from_the_same_pdf_share_content_and_bytes(monkeypatch) -> None:
+    pytest.importorskip("fastapi", reason="fastapi not installed (web extras required)")
+    fitz = pytest.importorskip("fitz", reason="pymupdf not installed")
+    from fastapi.testclient import TestClient
+
+    from webapi import main as webmain
+
+    def pdf(text: str) -> bytes:
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), text)
+        data = doc.tobytes()
+        doc.close()
+        return data
+
+    dp, graphs = pdf("Dynamic programming stores overlapping subproblems."), pdf("Graphs join nodes by edges.")
+    monkeypatch.setattr(content_cache, "_CACHE", ContentCache(max_entries=1))
+    monkeypatch.setattr(webmain, "_PDF_BYTES_BY_SHA256", type(webmain._PDF_BYTES_BY_SHA256)())
+    client = TestClient(webmain.app)
+
+    def from_upload(data: bytes) -> str:
+        return client.post("/session/from-upload", files={"files": ("dp.pdf", data, "application/pdf")}).json()["session_id"]
+
+    ids = [from_upload(dp), from_upload(dp)]
+    ids.append(client.post("/session", json={"topic": "DP"}).json()["session_id"])
+    assert client.post(f"/session/{ids[2]}/upload", files={"file": ("dp.pdf", dp, "application/pdf")}).status_code == 200
+
+    first, second, third = (webmain.SESSIONS[i].loaded_content for i in ids)
+    assert first is not None and second is not None and third is not None
+    assert first["metadata"]["sources"][0]["filename"] == "dp.pdf" and first["sections"] == []
+    assert first["raw_text"] is second["raw_text"] is third["raw_text"]
+    blobs = [webmain.SESSION_ORIGINAL_BLOBS[i][0] for i in ids]
+    assert blobs[0] == dp and all(blob is blobs[0] for blob in blobs)
+
+    # The shared-bytes index is bounded like the content cache: one entry here.
+    from_upload(graphs)
+    assert webmain.SESSION_ORIGINAL_BLOBS[from_upload(dp)][0] is not blobs[0]
+    assert len(webmain._PDF_BYTES_BY_SHA256) == 1
@@ -0,0 +1,113 @@
+"""Tests for request deadlines and disconnect cancellation (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from agent.tools import teacher_tool
+from agent.utils import llm_client
+from agent.utils.deadline import DeadlineExceededError, deadline_context, parse_deadline_header, remaining
+from agent.utils.fake_llm import FakeChatModel
+from agent.utils.llm_client import LLMClientRegistry, async_call_with_retry, call_with_retry
+from agent.utils.llm_metrics import LLM_CALLS
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    monkeypatch.setattr(llm_client, "_LIMITERS", None)
+    monkeypatch.setattr(llm_client, "_REGISTRY", LLMClientRegistry())
+
+
+def test_deadlines_nest_and_parse_from_header() -> None:
+    assert remaining() is None
+    with deadline_context(10):
+        with deadline_context(60):
+            left = remaining()
+            assert left is not None and 9 < left <= 10
+        with deadline_context(None):
+            assert remaining() is not None
+    assert remaining() is None
+
+    assert parse_deadline_header("2.5") == 2.5
+    absolute = parse_deadline_header(str(time.time() + 30))
+    assert absolute is not None and 29 < absolute <= 30
+    assert parse_deadline_header("600", max_seconds=300) == 300
+    assert parse_deadline_header("-1") == 0.0
+    assert parse_deadline_header("soon") is None
+    assert parse_deadline_header(None) is None
+
+
+def test_retry_that_would_outlive_the_deadline_is_not_attempted(monkeypatch) -> None:
+    # Pin the backoff: full jitter would sometimes draw a delay shorter than the deadline.
+    monkeypatch.setattr(llm_client, "_retry_delay", lambda exc, base_delay, attempt: 30.0)
+    llm = FakeChatModel(model_name="deadline-503", unavailable_rate=1.0)
+    started = time.perf_counter()
+    with deadline_context(1.0), pytest.raises(Exception, match="503"):
+        call_with_retry(llm.invoke, "x", max_attempts=3, base_delay=30, cache=False)
+    assert time.perf_counter() - started < 0.5
+
+    with deadline_context(0), pytest.raises(DeadlineExceededError):
+        call_with_retry(llm.invoke, "x", cache=False, tool="teach_concept")
+    assert LLM_CALLS.value(
+        tool="teach_concept", model="deadline-503", endpoint="none", outcome="deadline_exceeded"
+    ) == 1
+
+
+def test_slow_attempt_is_cut_at_the_deadline_and_tools_report_it(monkeypatch) -> None:
+    slow = FakeChatModel(model_name="deadline-slow", latency_ms=2000)
+
+    async def run() -> None:
+        with deadline_context(0.1):
+            await async_call_with_retry(slow.ainvoke, "x", cache=False)
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(run())
+    with deadline_context(0.1), pytest.raises(DeadlineExceededError):
+        call_with_retry(slow.invoke, "x", cache=False)
+    assert time.perf_counter() - started < 1.0
+    assert llm_client.circuit_breaker_stats()["fake"]["failures"] == 0
+
+    monkeypatch.setattr(teacher_tool, "get_llm_client", lambda: slow)
+    with deadline_context(0.05):
+        lesson = teacher_tool.teach_concept_payload("Closures")
+    assert lesson["error"].startswith("[error:deadline_exceeded]")
+
+
+def test_client_disconnect_cancels_the_handler(monkeypatch) -> None:
+    pytest.importorskip("fastapi", reason="fastapi not installed (web extras required)")
+    from webapi import main as webmain
+
+    monkeypatch.setattr(webmain, "_DISCONNECT_POLL_SECONDS", 0.01)
+    cancelled = asyncio.Event()
+
+    class _Request:
+        polls = 0
+
+        async def body(self) -> bytes:
+            return b"{}"
+
+        async def is_disconnected(self) -> bool:
+            self.polls += 1
+            return self.polls >= 3
+
+    async def handler(request):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        response = await webmain._run_until_disconnect(_Request(), handler, "POST /test")  # type: ignore[arg-type]
+        return response, cancelled.is_set()
+
+    response, was_cancelled = asyncio.run(run())
+    assert response.status_code == 499 and was_cancelled
+    assert webmain._CANCELLED_REQUESTS.value(endpoint="POST /test") == 1
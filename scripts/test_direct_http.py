@@ -0,0 +1,108 @@
+"""Tests for the direct-HTTP chat-completions client (httpx MockTransport, no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from agent.utils import llm_client
+from agent.utils.llm_client import (
+    DirectChatClient,
+    DirectHTTPError,
+    LLMClientRegistry,
+    async_call_with_retry,
+    call_with_retry,
+)
+
+
+def _completion(request: httpx.Request, status: int = 200, headers: dict[str, str] | None = None) -> httpx.Response:
+    if status != 200:
+        return httpx.Response(status, json={"error": {"message": "slow down"}}, headers=headers)
+    body = json.loads(request.content)
+    return httpx.Response(200, json={
+        "model": body["model"],
+        "choices": [{"message": {"role": "assistant", "content": "hi " + body["messages"][-1]["content"]},
+                     "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 7, "completion_tokens": 2, "total_tokens": 9},
+    })
+
+
+def _client(handler) -> DirectChatClient:
+    transport = httpx.MockTransport(handler)
+    return DirectChatClient(
+        provider="groq",
+        model="llama-direct",
+        temperature=0.2,
+        api_key="gsk_test",
+        base_url="https://api.groq.com/openai/v1",
+        http_client=httpx.Client(transport=transport),
+        http_async_client=httpx.AsyncClient(transport=transport),
+    )
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    monkeypatch.setattr(llm_client, "_LIMITERS", None)
+
+
+def test_invoke_posts_chat_completions_and_returns_text_and_usage() -> None:
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return _completion(request)
+
+    llm = _client(handler)
+    response = call_with_retry(llm.invoke, "there", cache=False, tool="teach_concept", max_tokens=50)
+    assert response.content == "hi there"
+    assert response.usage_metadata == {"input_tokens": 7, "output_tokens": 2, "total_tokens": 9}
+    assert response.response_metadata["finish_reason"] == "stop"
+
+    request = seen[0]
+    assert str(request.url) == "https://api.groq.com/openai/v1/chat/completions"
+    assert request.headers["authorization"] == "Bearer gsk_test"
+    assert json.loads(request.content) == {
+        "model": "llama-direct",
+        "messages": [{"role": "user", "content": "there"}],
+        "temperature": 0.2,
+        "max_tokens": 50,
+    }
+    assert asyncio.run(async_call_with_retry(llm.ainvoke, "async", cache=False)).content == "hi async"
+
+
+def test_errors_look_like_sdk_errors_so_retry_after_is_honoured() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        if len(calls) == 1:
+            return _completion(request, 429, {"retry-after": "0"})
+        return _completion(request)
+
+    llm = _client(handler)
+    assert call_with_retry(llm.invoke, "again", cache=False, base_delay=0).content == "hi again"
+    assert len(calls) == 2
+
+    with pytest.raises(DirectHTTPError) as excinfo:
+        _client(lambda request: _completion(request, 401)).invoke("x")
+    assert excinfo.value.status_code == 401 and "Error code: 401" in str(excinfo.value)
+
+
+def test_registry_builds_direct_clients_when_enabled(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_DIRECT_HTTP", "true")
+    monkeypatch.setenv("LLM_PROVIDER", "groq")
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_direct")
+    monkeypatch.delenv("GROQ_API_KEYS", raising=False)
+    registry = LLMClientRegistry()
+
+    llm = registry.get()
+    assert isinstance(llm, DirectChatClient)
+    assert llm._llm_type == "groq-direct"
+    assert llm_client._llm_target(llm.invoke) == llm_client.LLMTarget("groq", llm.model_name, 0.7)
+    assert not isinstance(registry.get(direct=False), DirectChatClient)
+    registry.close()
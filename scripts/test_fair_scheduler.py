@@ -0,0 +1,132 @@
+"""Tests for weighted fair scheduling of queued LLM calls (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from agent.utils.adaptive_limiter import AdaptiveLimiter, ConcurrencyLimitError, LimiterSettings
+from agent.utils.fair_scheduler import FairQueue, Flow, SchedulerSettings, scheduling_context
+from agent.utils.llm_metrics import render_metrics
+
+
+def test_light_sessions_and_higher_priorities_are_not_starved() -> None:
+    queue: FairQueue[str] = FairQueue()
+    for i in range(4):
+        queue.push(f"heavy-{i}", Flow(session="heavy"), cost=1000)
+    queue.push("light-0", Flow(session="light"), cost=10)
+    queue.push("light-1", Flow(session="light"), cost=10)
+    queue.push("bg", Flow(session="light", priority="background"))
+    queue.push("teach", Flow(session="light", priority="interactive"))
+    assert queue.depths()["normal"] == {"default": {"heavy": 4, "light": 2}}
+
+    order = [queue.pop()[0] for _ in range(len(queue))]
+    assert order == ["teach", "heavy-0", "light-0", "light-1", "heavy-1", "heavy-2", "heavy-3", "bg"]
+    assert not queue and queue.depths() == {}
+
+
+def test_charged_cost_is_kept_when_each_flow_has_one_call_waiting() -> None:
+    queue: FairQueue[str] = FairQueue()
+    costs = {"quiz": 4000, "teach": 100}
+    for session in costs:
+        queue.push(session, Flow(session=session), cost=costs[session])
+    served: list[str] = []
+    for _ in range(82):
+        session, _ = queue.pop()
+        served.append(session)
+        queue.push(session, Flow(session=session), cost=costs[session])
+    # Equal token shares: about 40 small calls per large one, not round-robin.
+    assert served.count("quiz") == 2 and served.count("teach") == 80
+
+    forgetful: FairQueue[str] = FairQueue(idle_seconds=0)
+    forgetful.push("quiz", Flow(session="quiz"), cost=4000)
+    forgetful.pop()
+    forgetful.push("quiz", Flow(session="quiz"), cost=4000)
+    forgetful.push("teach", Flow(session="teach"), cost=100)
+    assert forgetful.pop()[0] == "quiz"  # its finish tag expired with the idle window
+
+
+def test_waiting_lifts_a_lower_class_so_background_is_not_starved(monkeypatch) -> None:
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("agent.utils.fair_scheduler.time.monotonic", lambda: clock["now"])
+    queue: FairQueue[str] = FairQueue(aging_seconds=5.0)
+    queue.push("bg", Flow(priority="background"))
+    clock["now"] += 11
+    for i in range(3):
+        queue.push(f"teach-{i}", Flow(priority="interactive"))
+    assert queue.pop()[0] == "teach-0"  # two ranks gained only ties with interactive
+    clock["now"] += 4
+    assert queue.pop()[0] == "bg"  # 15 s waited: three ranks
+    assert [queue.pop()[0] for _ in range(2)] == ["teach-1", "teach-2"]
+
+
+def test_tenant_weights_split_service_and_fifo_when_disabled() -> None:
+    queue: FairQueue[str] = FairQueue({"gold": 2.0})
+    for i in range(6):
+        queue.push(f"gold-{i}", Flow(tenant="gold"))
+        queue.push(f"free-{i}", Flow(tenant="free"))
+    first_six = [queue.pop()[0] for _ in range(6)]
+    assert sum(item.startswith("gold") for item in first_six) == 4
+
+    fifo: FairQueue[str] = FairQueue(fair=False)
+    for item, flow in (("a", Flow(session="x")), ("b", Flow(session="y", priority="interactive")), ("c", Flow())):
+        fifo.push(item, flow)
+    fifo.remove("c")
+    assert [fifo.pop()[0] for _ in range(len(fifo))] == ["a", "b"]
+
+
+def test_flow_comes_from_context_then_tool(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_SCHED_PRIORITIES", '{"generate_quiz": "background", "x": "urgent"}')
+    monkeypatch.setenv("LLM_SCHED_TENANT_WEIGHTS", '{"school": 3, "bad": "heavy"}')
+    settings = SchedulerSettings.from_env()
+    assert settings.tenant_weights == {"school": 3.0}
+    assert settings.flow("teach_concept") == Flow(priority="interactive")
+
+    with scheduling_context(session="s1", tenant="school"):
+        assert settings.flow("generate_quiz") == Flow("school", "s1", "background")
+        with scheduling_context(priority="interactive", tenant=None):
+            assert settings.flow("generate_quiz") == Flow("school", "s1", "interactive")
+    assert settings.flow(None) == Flow()
+
+
+def test_client_headers_are_ignored_unless_trusted(monkeypatch) -> None:
+    headers = {"x-tenant-id": "gold", "x-priority": "interactive"}
+    monkeypatch.delenv("LLM_SCHED_TRUST_HEADERS", raising=False)
+    assert SchedulerSettings.from_env().header_overrides(headers) == {}
+
+    monkeypatch.setenv("LLM_SCHED_TRUST_HEADERS", "true")
+    trusted = SchedulerSettings.from_env()
+    with scheduling_context(session="s1", **trusted.header_overrides(headers)):
+        assert trusted.flow("generate_quiz") == Flow("gold", "s1", "interactive")
+
+
+def test_limiter_grants_slots_in_fair_order() -> None:
+    limiter = AdaptiveLimiter(LimiterSettings(initial=1, max_limit=1, queue_timeout=2.0), "test", "fair")
+    served: list[str] = []
+
+    async def caller(name: str, flow: Flow, cost: float) -> None:
+        await limiter.aacquire(flow=flow, cost=cost)
+        served.append(name)
+        await asyncio.sleep(0)
+        limiter.release()
+
+    async def run() -> None:
+        limiter.acquire()
+        tasks = [asyncio.ensure_future(caller(f"heavy-{i}", Flow(session="heavy"), 2000)) for i in range(3)]
+        tasks.append(asyncio.ensure_future(caller("light", Flow(session="light"), 50)))
+        tasks.append(asyncio.ensure_future(caller("teach", Flow(session="light", priority="interactive"), 500)))
+        await asyncio.sleep(0.01)
+        queues = limiter.stats()["queues"]
+        assert queues["normal"]["default"] == {"heavy": 3, "light": 1}
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert served == ["teach", "heavy-0", "light", "heavy-1", "heavy-2"]
+    assert 'llm_sched_queue_depth{provider="test",model="fair",priority="normal",tenant="default"} 0' in render_metrics()
+
+    limiter.acquire()
+    with pytest.raises(ConcurrencyLimitError):
+        limiter.acquire(timeout=0.01, flow=Flow(session="late"))
+    assert limiter.stats()["queues"] == {}
@@ -0,0 +1,119 @@
+"""Offline tests for the fake LLM provider (LLM_PROVIDER=fake): content, latency, faults."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from agent.tools import planner_tool, quizzer_tool, teacher_tool
+from agent.utils import llm_client
+from agent.utils.fake_llm import FakeChatModel, FakeLLMError
+from agent.utils.llm_client import LLMClientRegistry, async_call_with_retry, call_with_retry
+
+
+@pytest.fixture(autouse=True)
+def _fake_provider(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.delenv("LLM_MODEL", raising=False)
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    monkeypatch.setattr(llm_client, "_LIMITERS", None)
+    monkeypatch.setattr(llm_client, "_REGISTRY", LLMClientRegistry())
+
+
+def _use(monkeypatch, llm: FakeChatModel) -> None:
+    for module in (planner_tool, teacher_tool, quizzer_tool):
+        monkeypatch.setattr(module, "get_llm_client", lambda: llm)
+
+
+def test_registry_builds_fake_client_without_http_pool() -> None:
+    llm = llm_client.get_llm_client()
+    assert isinstance(llm, FakeChatModel)
+    assert llm.model_name == "fake-model"
+    assert llm_client.get_llm_client() is llm
+    assert llm_client.llm_pool_stats()["pools"] == {}
+
+
+def test_tools_return_schema_valid_output_derived_from_prompt() -> None:
+    plan = planner_tool.plan_learning_path.invoke({"topic": "Rust", "max_concepts": 3})
+    assert [c["order"] for c in plan] == [1, 2, 3]
+    assert all("Rust" in c["concept_name"] for c in plan)
+
+    material = "# Ownership\nEvery value has one owner.\n# Borrowing\nReferences borrow values."
+    grounded = planner_tool.plan_learning_path.invoke({"topic": "Rust", "source_material": material})
+    assert [c["concept_name"] for c in grounded][:2] == ["Ownership", "Borrowing"]
+
+    lesson = teacher_tool.teach_concept_payload("Ownership", "intermediate", source_material=material)
+    assert "error" not in lesson
+    assert "intermediate" in lesson["explanation"]
+    assert lesson["takeaways"]
+
+    quiz = quizzer_tool.generate_quiz.invoke({"concept_name": "Borrowing", "num_questions": 4})
+    assert quiz["total_questions"] == 4
+    for q in quiz["questions"]:
+        assert len(q["options"]) == 4
+        assert q["correct_answer"] in q["options"]
+
+
+def test_async_tools_match_sync_output() -> None:
+    sync_quiz = quizzer_tool.generate_quiz.invoke({"concept_name": "Loops", "num_questions": 2})
+    async_quiz = asyncio.run(quizzer_tool.agenerate_quiz("Loops", num_questions=2))
+
+    def summary(quiz):
+        return [(q["question"], q["correct_answer"]) for q in quiz["questions"]]
+
+    assert summary(async_quiz) == summary(sync_quiz)
+
+
+def test_injected_503s_are_retried_and_429s_carry_retry_after() -> None:
+    flaky = FakeChatModel(unavailable_rate=0.5, seed=3)
+    outcomes = []
+    for _ in range(20):
+        try:
+            flaky.invoke("hello")
+            outcomes.append("ok")
+        except FakeLLMError as exc:
+            assert exc.status_code == 503
+            outcomes.append("503")
+    assert "ok" in outcomes and "503" in outcomes
+
+    retried = FakeChatModel(unavailable_rate=0.5, seed=3)
+    recovered = call_with_retry(retried.invoke, "hello", max_attempts=6, base_delay=0)
+    assert recovered.content.startswith("Fake response")
+
+    limited = FakeChatModel(rate_limit_rate=1.0, retry_after=2.5)
+    with pytest.raises(FakeLLMError) as info:
+        limited.invoke("hello")
+    assert info.value.status_code == 429
+    assert llm_client._retry_after_hint(info.value) == 2.5
+
+
+def test_malformed_output_exercises_repair_and_strict_retry(monkeypatch) -> None:
+    broken = FakeChatModel(malformed_rate=1.0, seed=1)
+    _use(monkeypatch, broken)
+
+    assert planner_tool.plan_learning_path.invoke({"topic": "Go"}) == []
+    quiz = quizzer_tool.generate_quiz.invoke({"concept_name": "Goroutines", "num_questions": 2})
+    assert quiz["error_code"] == "invalid_quiz_format"
+
+    prompt = 'Create a clear lesson for the concept "Channels" at beginner level.'
+    payloads = [str(broken.invoke(prompt).content) for _ in range(6)]
+    assert any('"""' in p for p in payloads)
+    repaired = teacher_tool._teach_result(next(p for p in payloads if '"""' in p))
+    assert "error" not in repaired
+    assert json.dumps(repaired)
+
+
+def test_latency_is_concurrent_on_async_path() -> None:
+    slow = FakeChatModel(latency_ms=100, tokens_per_second=0)
+
+    async def scenario() -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(async_call_with_retry(slow.ainvoke, f"prompt {i}") for i in range(5)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(scenario())
+    assert 0.1 <= elapsed < 0.4
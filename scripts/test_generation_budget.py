@@ -0,0 +1,94 @@
+"""Tests for per-tool generation budgets: max_tokens / stop plumbing and truncation metrics (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from agent.tools import planner_tool
+from agent.utils import llm_client
+from agent.utils.fake_llm import FakeChatModel
+from agent.utils.generation_budget import BudgetTable, ToolBudget, parse_budgets
+from agent.utils.llm_client import LLMClientRegistry, async_call_with_retry, call_with_retry
+from agent.utils.llm_metrics import LLM_TRUNCATED
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.delenv("LLM_GENERATION_BUDGETS", raising=False)
+    monkeypatch.delenv("LLM_MAX_TOKENS", raising=False)
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    monkeypatch.setattr(llm_client, "_LIMITERS", None)
+    monkeypatch.setattr(llm_client, "_BUDGETS", None)
+    monkeypatch.setattr(llm_client, "_REGISTRY", LLMClientRegistry())
+
+
+def test_budgets_scale_with_items_and_overlay_from_json() -> None:
+    plan = ToolBudget(max_tokens=100, base_tokens=10, tokens_per_item=20)
+    assert plan.limit() == 100
+    assert plan.limit(3) == 70
+    assert plan.limit(50) == 100
+
+    budgets = parse_budgets(
+        '{"teach_concept": {"max_tokens": 300, "stop": ["END"]}, "plan_learning_path": {"max_tokens": null}}'
+    )
+    assert budgets["teach_concept"] == ToolBudget(max_tokens=300, stop=("END",))
+    assert budgets["plan_learning_path"].limit(5) == 32 + 24 * 5
+    assert budgets["generate_quiz"].limit(3) == 900
+    assert parse_budgets('{"teach_concept": {"colour": "red"}}')["teach_concept"].max_tokens == 2048
+    assert parse_budgets("[1, 2]") == parse_budgets("")
+
+    table = BudgetTable(budgets)
+    assert table.kwargs("teach_concept") == {"max_tokens": 300, "stop": ["END"]}
+    assert table.kwargs("unknown_tool") == {}
+    assert BudgetTable(budgets, enabled=False).kwargs("teach_concept") == {}
+
+
+def test_tool_budget_caps_completion_and_truncation_is_counted(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_GENERATION_BUDGETS", '{"teach_concept": {"max_tokens": 8}}')
+    llm = FakeChatModel()
+    prompt = 'Create a clear lesson for the concept "Closures" at beginner level.'
+    truncated_before = LLM_TRUNCATED.value(tool="teach_concept", model="fake-model", endpoint="none")
+
+    capped = call_with_retry(llm.invoke, prompt, cache=False, tool="teach_concept")
+    assert len(capped.content) == 32
+    assert capped.response_metadata["finish_reason"] == "length"
+    assert LLM_TRUNCATED.value(tool="teach_concept", model="fake-model", endpoint="none") == truncated_before + 1
+
+    full = call_with_retry(llm.invoke, prompt, cache=False, tool="teach_concept", max_tokens=None)
+    assert full.response_metadata["finish_reason"] == "stop"
+    assert len(full.content) > 32
+
+    stopped = asyncio.run(async_call_with_retry(llm.ainvoke, prompt, cache=False, max_tokens=500, stop=["## Core"]))
+    assert "## Core" not in stopped.content and "## Introduction" in stopped.content
+
+
+def test_budget_is_part_of_the_cache_key() -> None:
+    llm = FakeChatModel()
+    args = ("hello",)
+    short = llm_client._prompt_fingerprint(llm.invoke, args, {"max_tokens": 10})
+    assert short is not None
+    assert short != llm_client._prompt_fingerprint(llm.invoke, args, {"max_tokens": 20})
+    assert short != llm_client._prompt_fingerprint(llm.invoke, args, {})
+    assert llm_client._prompt_fingerprint(llm.invoke, args, {"max_tokens": 10, "seed": 1}) is None
+
+
+def test_planner_cap_and_stop_follow_max_concepts(monkeypatch) -> None:
+    seen: list[dict] = []
+    llm = FakeChatModel()
+
+    def spy(fn, *args, **kwargs):
+        seen.append(kwargs)
+        return call_with_retry(fn, *args, **kwargs)
+
+    monkeypatch.setattr(planner_tool, "call_with_retry", spy)
+    monkeypatch.setattr(planner_tool, "get_llm_client", lambda: llm)
+    plan = planner_tool.plan_learning_path.invoke({"topic": "Rust", "max_concepts": 3})
+
+    assert len(plan) == 3
+    assert seen[0]["max_tokens"] == 32 + 24 * 3
+    assert seen[0]["stop"] == ["\n4."]
+    assert llm_client.initialize_llm("fake", max_tokens=64).max_tokens == 64
@@ -0,0 +1,153 @@
+"""Unit tests for hedged LLM requests (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.utils import llm_client
+from agent.utils.hedging import HedgeBudget, HedgeSettings, Hedger, LatencyTracker
+from agent.utils.llm_client import async_call_with_retry
+from agent.utils.llm_metrics import LLM_CALLS
+
+KEY = ("hedgetest", "hedge-model", "teach_concept")
+
+
+def _hedger(**overrides) -> Hedger:
+    settings = {"enabled": True, "min_samples": 3, "min_delay": 0.01, "budget": 1.0, **overrides}
+    hedger = Hedger(HedgeSettings(**settings))
+    for seconds in (0.01, 0.02, 0.03):
+        hedger.latency.record(KEY, seconds)
+    return hedger
+
+
+def test_latency_percentile_needs_min_samples_and_budget_caps_hedges() -> None:
+    tracker = LatencyTracker(window=10)
+    for i in range(1, 11):
+        tracker.record("k", i / 10)
+    assert tracker.percentile("k", 0.9) == pytest.approx(0.9)
+    assert tracker.percentile("k", 0.9, min_samples=20) is None
+
+    budget = HedgeBudget(0.25)
+    allowed = 0
+    for _ in range(8):
+        budget.earn()
+        allowed += budget.spend()
+    assert allowed == 2
+    assert Hedger(HedgeSettings(enabled=False)).hedge_delay("k") is None
+
+
+def test_sync_hedge_wins_without_waiting_for_a_slow_primary() -> None:
+    hedger = _hedger()
+
+    def slow() -> AIMessage:
+        time.sleep(2.0)
+        return AIMessage(content="primary")
+
+    started = time.perf_counter()
+    assert hedger.run(KEY, slow, lambda: AIMessage(content="hedge")).content == "hedge"
+    assert time.perf_counter() - started < 1.0
+    assert hedger.stats()["won"] == 1
+    hedger.close()
+
+
+def test_sync_hedge_covers_a_failed_primary() -> None:
+    hedger = _hedger()
+
+    def failing() -> AIMessage:
+        time.sleep(0.1)
+        raise TimeoutError("primary timed out")
+
+    assert hedger.run(KEY, failing, lambda: AIMessage(content="hedge")).content == "hedge"
+    with pytest.raises(TimeoutError):
+        hedger.run(KEY, failing, lambda: AIMessage(content=""))
+    assert hedger.run(KEY, lambda: AIMessage(content=""), lambda: AIMessage(content="")).content == ""
+    hedger.close()
+
+
+def test_empty_or_failed_hedge_falls_back_to_primary() -> None:
+    hedger = _hedger()
+
+    def slow() -> AIMessage:
+        time.sleep(0.1)
+        return AIMessage(content="primary")
+
+    assert hedger.run(KEY, slow, lambda: AIMessage(content="")).content == "primary"
+    assert hedger.stats()["lost"] == 1
+
+    async def empty() -> AIMessage:
+        await asyncio.sleep(0.05)
+        return AIMessage(content="")
+
+    assert asyncio.run(hedger.arun(KEY, empty, empty)).content == ""
+    hedger.close()
+
+
+def test_budget_exhausted_waits_for_primary() -> None:
+    hedger = _hedger(budget=0.0)
+    calls = []
+
+    def slow() -> AIMessage:
+        time.sleep(0.05)
+        return AIMessage(content="primary")
+
+    assert hedger.run(KEY, slow, lambda: calls.append(1)).content == "primary"
+    assert calls == []
+    assert hedger.stats()["budget_denied"] == 1
+    hedger.close()
+
+
+class _SlowFirstModel:
+    model_name = "hedge-model"
+    _llm_type = "hedgetest"
+    temperature = 0.0
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, prompt: str, **kwargs: object) -> AIMessage:
+        self.calls += 1
+        n = self.calls
+        try:
+            await asyncio.sleep(2.0 if n == 1 else 0.0)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return AIMessage(content=f"reply {n}")
+
+
+def test_async_call_with_retry_hedges_slow_attempt_and_cancels_loser(monkeypatch) -> None:
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    hedger = _hedger()
+    monkeypatch.setattr(llm_client, "_HEDGER", hedger)
+    model = _SlowFirstModel()
+
+    async def run() -> AIMessage:
+        return await async_call_with_retry(model.ainvoke, "explain", cache=False, tool="teach_concept")
+
+    started = time.perf_counter()
+    result = asyncio.run(run())
+    assert result.content == "reply 2"
+    assert time.perf_counter() - started < 1.0
+    assert model.cancelled == 1
+    assert hedger.stats()["fired"] == 1
+
+
+def test_winning_hedge_on_hedge_model_is_labelled_with_that_model(monkeypatch) -> None:
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    monkeypatch.setattr(llm_client, "_HEDGER", _hedger())
+    monkeypatch.setenv("LLM_HEDGE_MODEL", "hedge-alt")
+    alternate = _SlowFirstModel()
+    alternate.calls = 1  # answers at once
+    monkeypatch.setattr(llm_client, "_registry_client", lambda provider, model, temperature: alternate)
+    labels = {"tool": "teach_concept", "endpoint": "none", "outcome": "success"}
+
+    async def run() -> AIMessage:
+        return await async_call_with_retry(_SlowFirstModel().ainvoke, "explain", cache=False, tool="teach_concept")
+
+    assert asyncio.run(run()).content == "reply 2"
+    assert LLM_CALLS.value(model="hedge-alt", **labels) == 1
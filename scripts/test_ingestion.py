@@ -0,0 +1,56 @@
+"""Tests for the off-event-loop ingestion executor."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from agent.utils.content_loader import load_content_bytes
+from agent.utils.ingestion import IngestionExecutor, IngestionSettings
+from agent.utils.llm_metrics import render_metrics
+
+UPLOADS = [
+    (b"# Sorting\nQuicksort partitions around a pivot.\n", "sorting.md"),
+    (json.dumps({"title": "Heaps", "sections": [{"title": "Sift", "body": "Restore order."}]}).encode(), "heaps.json"),
+    (b"Hashing\nMaps keys to buckets with a hash function and resolves collisions.\n", "hashing.txt"),
+]
+
+
+def test_thread_mode_parses_in_parallel_and_keeps_order() -> None:
+    executor = IngestionExecutor(IngestionSettings(executor="thread", workers=2, fanout=2))
+    try:
+        loaded = asyncio.run(executor.aload_many(UPLOADS))
+        with pytest.raises(ValueError, match="Unsupported"):
+            asyncio.run(executor.aload(b"x", "slides.pptx"))
+    finally:
+        executor.shutdown()
+    assert [c.title for c in loaded] == ["Sorting", "Heaps", "hashing"]
+    assert loaded == [load_content_bytes(data, name) for data, name in UPLOADS]
+    stats = executor.stats()
+    assert stats["parsed"] == 3 and stats["failed"] == 1 and stats["queue_depth"] == {"process": 0, "thread": 0}
+    assert 'ingest_parse_seconds_count{format="md"}' in render_metrics()
+
+
+def test_process_mode_and_fallback_to_threads() -> None:
+    executor = IngestionExecutor(IngestionSettings(executor="process", workers=1))
+    try:
+        markdown = asyncio.run(executor.aload(*UPLOADS[0]))
+        assert markdown == load_content_bytes(*UPLOADS[0])
+        assert executor.stats()["executor"] == "process"
+
+        class _Broken(Executor):
+            def submit(self, fn, /, *args, **kwargs):  # type: ignore[override]
+                raise BrokenProcessPool("worker died")
+
+        executor._processes = _Broken()
+        text = asyncio.run(executor.aload(*UPLOADS[2]))
+    finally:
+        executor.shutdown()
+    assert text.title == "hashing"
+    stats = executor.stats()
+    assert stats["executor"] == "thread" and stats["process_fallbacks"] == 1
+    assert stats["queue_depth"] == {"process": 0, "thread": 0}
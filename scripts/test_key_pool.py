@@ -0,0 +1,125 @@
+"""Unit tests for API-key pooling: selection, quota tracking, ejection and rotation (no network)."""
+
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from agent.utils import llm_client
+from agent.utils.key_pool import APIKeyPool, key_id
+from agent.utils.llm_client import LLMClientRegistry, PoolSettings, call_with_retry
+
+KEYS = ["gsk_aaaaaaaaaaaa1111", "gsk_bbbbbbbbbbbb2222", "gsk_cccccccccccc3333"]
+
+
+def test_least_loaded_spreads_selection_and_prefers_idle_keys() -> None:
+    pool = APIKeyPool(KEYS)
+    assert {pool.acquire() for _ in range(3)} == set(KEYS)
+
+    pool.request_started(key_id(KEYS[0]), 1)
+    pool.request_started(key_id(KEYS[1]), 2)
+    assert pool.acquire() == KEYS[2]
+
+
+def test_round_robin_cycles_and_skips_ejected_keys() -> None:
+    pool = APIKeyPool(KEYS, strategy="round_robin")
+    assert [pool.acquire() for _ in range(4)] == [KEYS[0], KEYS[1], KEYS[2], KEYS[0]]
+
+    pool.observe(key_id(KEYS[1]), 0, 429, {"retry-after": "30"})
+    assert [pool.acquire() for _ in range(3)] == [KEYS[2], KEYS[0], KEYS[2]]
+
+
+def test_401_429_and_exhausted_quota_eject_keys_temporarily() -> None:
+    pool = APIKeyPool(KEYS, eject_seconds=0.05, auth_eject_seconds=60)
+    pool.observe(key_id(KEYS[0]), 0, 401, {})
+    pool.observe(key_id(KEYS[1]), 0, 429, {})
+    pool.observe(key_id(KEYS[2]), 0, 200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "90ms"})
+    assert pool.available() == 0
+    # Everything is cooling down: pick whichever recovers first.
+    assert pool.acquire() == KEYS[1]
+
+    time.sleep(0.1)
+    assert pool.available() == 2
+    stats = pool.stats()
+    assert stats["per_key"][key_id(KEYS[0])]["last_status"] == 401
+    assert stats["per_key"][key_id(KEYS[2])]["remaining_requests"] == 0
+    assert not any(k in str(stats) or k[:4] in str(stats) or k[-4:] in str(stats) for k in KEYS)
+
+
+def test_pooled_http_hooks_track_keys_and_skip_shared_rate_limiter(monkeypatch) -> None:
+    pool = APIKeyPool(KEYS[:2])
+    updates: list[str] = []
+    monkeypatch.setattr(
+        llm_client, "get_rate_limiter", lambda: SimpleNamespace(update_from_headers=lambda *a: updates.append(a[0]))
+    )
+    http = llm_client._PooledHTTP("", PoolSettings(), "groq", pool)
+    try:
+        request = httpx.Request("POST", "https://api.example/v1", headers={"Authorization": f"Bearer {KEYS[0]}"})
+        http._observe_request(request)
+        assert pool.stats()["per_key"][key_id(KEYS[0])]["in_flight"] == 1
+
+        http._observe_response(httpx.Response(429, headers={"retry-after": "5"}, request=request))
+        assert pool.stats()["per_key"][key_id(KEYS[0])]["in_flight"] == 0
+        assert pool.available() == 1
+        assert updates == []
+    finally:
+        http.close()
+
+
+def test_registry_builds_one_client_per_key(monkeypatch) -> None:
+    monkeypatch.setenv("GROQ_API_KEYS", ",".join(KEYS[:2]))
+    monkeypatch.delenv("PROXY_URL", raising=False)
+    registry = LLMClientRegistry()
+    try:
+        first = registry.get(provider="groq", model="m")
+        second = registry.get(provider="groq", model="m")
+        assert first is not second
+        for _ in range(5):
+            assert registry.get(provider="groq", model="m") in (first, second)
+        per_key = registry.stats()["api_keys"]["groq"]["per_key"]
+        assert sorted(entry["selected"] for entry in per_key.values()) == [1, 1]  # builds, not reuses
+        assert registry.stats()["api_keys"]["groq"]["keys"] == 2
+        assert len(registry.stats()["pools"]) == 1
+    finally:
+        registry.close()
+
+
+class _KeyedLLM:
+    _llm_type = "groq-chat"
+    model_name = "m"
+    temperature = 0.7
+
+    def __init__(self, api_key: str, pool: APIKeyPool):
+        self.api_key = api_key
+        self.pool = pool
+
+    def invoke(self, prompt: str):
+        if self.api_key == KEYS[0]:
+            self.pool.observe(key_id(self.api_key), 0, 429, {"retry-after": "30"})
+            raise RuntimeError("Error code: 429 - rate limit exceeded")
+        return SimpleNamespace(content=f"{self.api_key[-4:]}: {prompt}")
+
+
+def test_rate_limited_key_is_rotated_without_backoff(monkeypatch) -> None:
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    pool = APIKeyPool(KEYS[:2], strategy="round_robin")
+    clients = {k: _KeyedLLM(k, pool) for k in KEYS[:2]}
+    fake_registry = SimpleNamespace(
+        key_pool=lambda provider: pool,
+        get=lambda **kwargs: clients[pool.acquire()],
+    )
+    monkeypatch.setattr(llm_client, "_REGISTRY", fake_registry)
+
+    start = time.perf_counter()
+    result = call_with_retry(clients[pool.acquire()].invoke, "teach loops", base_delay=5.0)
+    assert result.content == "2222: teach loops"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_unknown_strategy_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        APIKeyPool(KEYS, strategy="random")
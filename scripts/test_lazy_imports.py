@@ -0,0 +1,45 @@
+"""Import-cost guards: packages resolve attributes lazily and provider SDKs load on first use."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _loaded_after(code: str, modules: list[str]) -> dict[str, bool]:
+    probe = f"{code}\nimport sys\nprint(','.join(str(m in sys.modules) for m in {modules!r}))"
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    return dict(zip(modules, (flag == "True" for flag in out.stdout.strip().split(","))))
+
+
+def test_content_loading_does_not_import_langchain_or_llm_client() -> None:
+    loaded = _loaded_after(
+        "from agent.utils import load_content",
+        ["agent.utils.llm_client", "langchain_core", "langchain_groq", "httpx"],
+    )
+    assert not any(loaded.values()), loaded
+
+
+def test_llm_client_defers_provider_sdks_until_first_initialisation() -> None:
+    loaded = _loaded_after(
+        "import agent.utils.llm_client as c\nc.initialize_llm(provider='fake')",
+        ["langchain_groq", "langchain_openai", "agent.utils.fake_llm"],
+    )
+    assert loaded == {"langchain_groq": False, "langchain_openai": False, "agent.utils.fake_llm": True}
+
+
+def test_lazy_package_attributes_resolve_and_unknown_names_raise() -> None:
+    import agent.core
+    import agent.tools
+    import agent.utils
+
+    assert agent.core.StudySessionState.__name__ == "StudySessionState"
+    assert agent.tools.evaluate_response.name == "evaluate_response"
+    assert "load_content" in dir(agent.utils)
+    with pytest.raises(AttributeError):
+        agent.utils.not_a_real_name  # noqa: B018
@@ -0,0 +1,105 @@
+"""Unit tests for the disk-backed LLM response cache (no LLM)."""
+
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agent.utils import llm_cache
+from agent.utils.llm_cache import LLMResponseCache, make_cache_key
+from agent.utils.llm_client import call_with_retry
+
+
+class _CountingLLM:
+    model_name = "llama-3.1-8b-instant"
+    temperature = 0.7
+    _llm_type = "groq-chat"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def invoke(self, prompt: str):
+        self.calls += 1
+        return SimpleNamespace(content=f"answer #{self.calls} to {prompt}")
+
+
+@pytest.fixture
+def cache_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    llm_cache.close_response_cache()
+    yield
+    llm_cache.close_response_cache()
+
+
+def test_key_depends_on_every_component() -> None:
+    base = make_cache_key("groq", "m", 0.7, "p")
+    assert base == make_cache_key("groq", "m", 0.7, "p")
+    assert base != make_cache_key("openai", "m", 0.7, "p")
+    assert base != make_cache_key("groq", "m2", 0.7, "p")
+    assert base != make_cache_key("groq", "m", 0.0, "p")
+    assert base != make_cache_key("groq", "m", 0.7, "p2")
+
+
+def test_ttl_expiry_counts_as_miss(tmp_path) -> None:
+    cache = LLMResponseCache(str(tmp_path / "c.sqlite3"), ttl_seconds=0.05)
+    cache.put("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path) -> None:
+    cache = LLMResponseCache(str(tmp_path / "c.sqlite3"), max_entries=2)
+    cache.put("a", "1")
+    time.sleep(0.01)
+    cache.put("b", "2")
+    time.sleep(0.01)
+    assert cache.get("a") == "1"  # refresh "a" so "b" is now least recently used
+    time.sleep(0.01)
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_cap_evicts_oldest(tmp_path) -> None:
+    cache = LLMResponseCache(str(tmp_path / "c.sqlite3"), max_bytes=10)
+    cache.put("a", "x" * 6)
+    time.sleep(0.01)
+    cache.put("b", "y" * 6)
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 6
+
+
+def test_call_with_retry_serves_repeat_prompts_from_cache(cache_env) -> None:
+    llm = _CountingLLM()
+    first = call_with_retry(llm.invoke, "explain loops")
+    second = call_with_retry(llm.invoke, "explain loops")
+    assert llm.calls == 1
+    assert second.content == first.content
+    response_cache = llm_cache.get_response_cache()
+    assert response_cache is not None
+    stats = response_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_bypass_forces_fresh_completion(cache_env) -> None:
+    llm = _CountingLLM()
+    call_with_retry(llm.invoke, "explain loops")
+    fresh = call_with_retry(llm.invoke, "explain loops", cache=False)
+    assert llm.calls == 2
+    assert fresh.content.startswith("answer #2")
+
+
+def test_cache_disabled_by_default(monkeypatch) -> None:
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    assert llm_cache.get_response_cache() is None
@@ -0,0 +1,89 @@
+"""Unit tests for the pooled LLM client registry (no network beyond localhost)."""
+
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agent.utils.llm_client import LLMClientRegistry, PoolSettings, _PooledHTTP
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_PROVIDER", "groq")
+    monkeypatch.delenv("PROXY_URL", raising=False)
+    reg = LLMClientRegistry(PoolSettings())
+    yield reg
+    reg.close()
+
+
+def test_same_key_returns_shared_client(registry) -> None:
+    a = registry.get(model="llama-3.1-8b-instant", temperature=0.7)
+    b = registry.get(model="llama-3.1-8b-instant", temperature=0.7)
+    assert a is b
+    stats = registry.stats()
+    assert stats["clients"] == 1
+    assert stats["client_reuses"] == 1
+
+
+def test_distinct_keys_share_one_pool(registry) -> None:
+    a = registry.get(model="llama-3.1-8b-instant", temperature=0.7)
+    b = registry.get(model="llama-3.1-8b-instant", temperature=0.0)
+    assert a is not b
+    stats = registry.stats()
+    assert stats["clients"] == 2
+    assert list(stats["pools"]) == ["groq"]
+
+
+def test_close_forgets_clients(registry) -> None:
+    a = registry.get()
+    registry.close()
+    assert registry.stats()["clients"] == 0
+    assert registry.get() is not a
+
+
+def test_close_also_closes_async_clients() -> None:
+    pool = _PooledHTTP("", PoolSettings())
+    pool.close()
+    assert pool.sync_client.is_closed and pool.async_client.is_closed
+
+
+def test_pool_reuses_keepalive_connection(local_server) -> None:
+    pool = _PooledHTTP("", PoolSettings())
+    try:
+        for _ in range(3):
+            assert pool.sync_client.get(local_server).status_code == 200
+        stats = pool.stats()
+    finally:
+        pool.close()
+    assert stats["requests"] == 3
+    assert stats["responses"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["reused_requests"] == 2
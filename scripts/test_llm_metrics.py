@@ -0,0 +1,90 @@
+"""Unit tests for per-call LLM accounting and the Prometheus /metrics endpoint (no network)."""
+
+from __future__ import annotations
+
+import pytest
+
+from agent.utils import llm_client
+from agent.utils.fake_llm import FakeChatModel
+from agent.utils.llm_client import LLMClientRegistry, call_with_retry
+from agent.utils.llm_metrics import (
+    LLM_CALLS,
+    LLM_COMPLETION_TOKENS,
+    LLM_RETRIES,
+    LLM_UPSTREAM_SECONDS,
+    MetricsRegistry,
+    endpoint_context,
+)
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+
+
+def test_registry_renders_prometheus_text_format() -> None:
+    registry = MetricsRegistry()
+    calls = registry.counter("demo_calls_total", "Demo calls.", ("tool",))
+    latency = registry.histogram("demo_seconds", "Demo latency.", ("tool",), buckets=(0.1, 1))
+    calls.inc(tool='say "hi"')
+    latency.observe(0.5, tool="t")
+    latency.observe(3, tool="t")
+
+    text = registry.render()
+    assert '# TYPE demo_calls_total counter\ndemo_calls_total{tool="say \\"hi\\""} 1' in text
+    assert 'demo_seconds_bucket{tool="t",le="0.1"} 0' in text
+    assert 'demo_seconds_bucket{tool="t",le="1"} 1' in text
+    assert 'demo_seconds_bucket{tool="t",le="+Inf"} 2' in text
+    assert 'demo_seconds_sum{tool="t"} 3.5' in text
+    assert registry.counter("demo_calls_total", "Demo calls.", ("tool",)) is calls
+    with pytest.raises(ValueError):
+        registry.gauge("demo_calls_total", "Clash.")
+
+
+def test_call_records_tool_model_endpoint_tokens_and_retries() -> None:
+    llm = FakeChatModel(model_name="acct-model", unavailable_rate=0.5, seed=3)
+    labels = {"tool": "teach_concept", "model": "acct-model", "endpoint": "POST /x"}
+    before = LLM_CALLS.value(outcome="success", **labels)
+
+    with endpoint_context("POST /x"):
+        response = call_with_retry(llm.invoke, "explain recursion", max_attempts=6, base_delay=0, tool="teach_concept")
+
+    assert LLM_CALLS.value(outcome="success", **labels) == before + 1
+    assert LLM_RETRIES.value(**labels) >= 1
+    assert LLM_COMPLETION_TOKENS.sum(**labels) == response.usage_metadata["output_tokens"]
+    assert LLM_UPSTREAM_SECONDS.count(**labels) == 1
+
+
+def test_failed_call_is_counted_with_its_outcome() -> None:
+    llm = FakeChatModel(model_name="acct-broken", unavailable_rate=1.0)
+    with pytest.raises(Exception):
+        call_with_retry(llm.invoke, "x", max_attempts=2, base_delay=0, tool="generate_quiz")
+    assert LLM_CALLS.value(tool="generate_quiz", model="acct-broken", endpoint="none", outcome="transient_error") == 1
+
+
+def test_metrics_endpoint_reports_calls_per_route(monkeypatch) -> None:
+    pytest.importorskip("fastapi", reason="fastapi not installed (web extras required)")
+    from fastapi.testclient import TestClient
+
+    from agent.core.state import StudySessionState
+    from webapi import main as webmain
+
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setenv("LLM_MODEL", "metrics-route-model")
+    monkeypatch.setattr(llm_client, "_REGISTRY", LLMClientRegistry())
+    state = StudySessionState(session_id="metrics-session", topic="Recursion")
+    state.set_loaded_content({"raw_text": "Recursion needs a base case and a recursive step."})
+    webmain.SESSIONS["metrics-session"] = state
+
+    client = TestClient(webmain.app)
+    resp = client.post("/session/metrics-session/teach", json={"concept_name": "Base cases"})
+    assert resp.status_code == 200
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'llm_calls_total{tool="teach_concept",model="metrics-route-model",'
+        'endpoint="POST /session/{session_id}/teach",outcome="success"} 1'
+    ) in metrics.text
+    assert "# TYPE llm_upstream_latency_seconds histogram" in metrics.text
@@ -0,0 +1,111 @@
+"""Tests for the per-client LLM concurrency cap (``LLM_BATCH_*``, no network)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from agent.utils import llm_client
+from agent.utils.fake_llm import FakeChatModel
+from agent.utils.llm_client import LLMClientRegistry, async_call_with_retry
+from agent.utils.micro_batcher import BatchSettings, MicroBatcher
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    monkeypatch.setattr(llm_client, "_LIMITERS", None)
+    monkeypatch.setattr(llm_client, "_REGISTRY", LLMClientRegistry())
+
+
+def _use_batcher(monkeypatch, **settings) -> MicroBatcher:
+    batcher = MicroBatcher(BatchSettings(**settings))
+    monkeypatch.setattr(llm_client, "_BATCHER", batcher)
+    return batcher
+
+
+class _EchoClient:
+    model_name = "echo"
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.peak = 0
+
+    async def ainvoke(self, prompt: str, **kwargs) -> str:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if prompt == "boom":
+                raise ValueError("bad prompt")
+            return f"echo:{prompt}:{kwargs.get('max_tokens')}"
+        finally:
+            self.in_flight -= 1
+
+
+def test_calls_go_out_at_once_and_get_their_own_results(monkeypatch) -> None:
+    batcher = _use_batcher(monkeypatch, enabled=True)
+    llm = FakeChatModel(model_name="batch-fake")
+
+    async def run() -> list:
+        prompts = [f"Explain topic {i}" for i in range(5)]
+        return await asyncio.gather(*(async_call_with_retry(llm.ainvoke, p, cache=False) for p in prompts))
+
+    responses = asyncio.run(run())
+    assert len(responses) == 5 and all(r.content for r in responses)
+    stats = batcher.stats()
+    assert stats["requests"] == 5 and stats["waited"] == 0 and stats["pending"] == 0
+
+
+def test_concurrency_is_capped_per_client(monkeypatch) -> None:
+    batcher = _use_batcher(monkeypatch, enabled=True, max_concurrency=2)
+    echo = _EchoClient()
+
+    async def run() -> list:
+        calls = [batcher.submit(echo, p, {"max_tokens": 64}, "echo", "echo") for p in ("a", "boom", "c")]
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), timeout=1.0)
+
+    results = asyncio.run(run())
+    assert results[0] == "echo:a:64" and results[2] == "echo:c:64"
+    assert isinstance(results[1], ValueError)
+    assert echo.peak == 2
+    assert batcher.stats()["waited"] == 1
+
+
+def test_cap_is_off_by_default(monkeypatch) -> None:
+    monkeypatch.delenv("LLM_BATCH_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_BATCHER", None)
+    llm = FakeChatModel(model_name="batch-off")
+    asyncio.run(async_call_with_retry(llm.ainvoke, "hello", cache=False))
+    assert llm_client.batching_stats()["enabled"] is False
+    assert llm_client.batching_stats()["requests"] == 0
+
+
+def test_cancelled_caller_cancels_its_upstream_request_and_frees_its_slot(monkeypatch) -> None:
+    batcher = _use_batcher(monkeypatch, enabled=True, max_concurrency=1)
+
+    class _SlowClient:
+        def __init__(self) -> None:
+            self.cancelled: list[str] = []
+
+        async def ainvoke(self, prompt: str, **kwargs) -> str:
+            try:
+                await asyncio.sleep(0.2 if prompt == "slow" else 0.01)
+            except asyncio.CancelledError:
+                self.cancelled.append(prompt)
+                raise
+            return f"done:{prompt}"
+
+    client = _SlowClient()
+
+    async def run() -> str:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(batcher.submit(client, "slow", {}, "slow", "slow"), timeout=0.05)
+        return await batcher.submit(client, "fast", {}, "slow", "slow")
+
+    assert asyncio.run(run()) == "done:fast"
+    assert client.cancelled == ["slow"]
+    assert batcher.stats()["pending"] == 0
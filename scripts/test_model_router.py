@@ -0,0 +1,92 @@
+"""Unit tests for task-aware model routing (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Optional
+
+import pytest
+
+from agent.utils import llm_client
+from agent.utils.fake_llm import FakeChatModel
+from agent.utils.llm_client import LLMClientRegistry, async_call_with_retry, call_with_retry
+from agent.utils.model_router import ModelRouter, Route, parse_routes
+
+ROUTES = [
+    {"name": "plan-fast", "tools": ["plan_learning_path"], "model": "fake-small", "timeout": 5},
+    {
+        "name": "advanced-teach",
+        "tools": ["teach_concept"],
+        "difficulties": ["advanced"],
+        "model": "fake-large",
+        "fallback_model": "fake-small",
+        "input_cost_per_1k": 1.0,
+        "output_cost_per_1k": 2.0,
+    },
+    {"name": "long-prompts", "min_prompt_tokens": 1000, "model": "fake-long"},
+    {"name": "reteach", "tools": ["teach_concept"], "min_retry_attempt": 1, "model": "fake-retry"},
+]
+
+
+@pytest.fixture()
+def router(monkeypatch) -> ModelRouter:
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setattr(llm_client, "_REGISTRY", LLMClientRegistry())
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    table = ModelRouter([Route.from_dict(r) for r in ROUTES])
+    monkeypatch.setattr(llm_client, "_ROUTER", table)
+    return table
+
+
+def test_select_matches_tool_difficulty_tokens_and_retry_in_order() -> None:
+    table = ModelRouter(parse_routes(json.dumps(ROUTES)))
+
+    def chosen(*args: Any, **kwargs: Any) -> Optional[str]:
+        route = table.select(*args, **kwargs)
+        return route.name if route else None
+
+    assert chosen("plan_learning_path") == "plan-fast"
+    assert chosen("teach_concept", "advanced") == "advanced-teach"
+    assert chosen("teach_concept", "beginner") is None
+    assert chosen("generate_quiz", prompt_tokens=1500) == "long-prompts"
+    assert chosen("teach_concept", "beginner", retry_attempt=2) == "reteach"
+    assert parse_routes('[{"name": "x", "colour": "red"}]') == []
+    assert parse_routes("not json") == []
+
+
+def test_call_is_rebound_to_route_model_and_stats_accumulate(router: ModelRouter) -> None:
+    default = FakeChatModel(model_name="fake-default")
+    prompt = 'Create a clear lesson for the concept "Closures" at advanced level.'
+    response = call_with_retry(default.invoke, prompt, cache=False, tool="teach_concept", difficulty="advanced")
+    assert response.response_metadata["model_name"] == "fake-large"
+
+    stats = router.stats()["advanced-teach"]
+    assert stats["calls"] == 1 and stats["errors"] == 0
+    assert stats["completion_tokens"] == response.usage_metadata["output_tokens"]
+    assert stats["cost_usd"] > 0
+
+    unrouted = call_with_retry(default.invoke, "hello", cache=False, tool="generate_quiz")
+    assert unrouted.response_metadata["model_name"] == "fake-default"
+
+
+def test_route_timeout_then_fallback(router: ModelRouter, monkeypatch) -> None:
+    slow = FakeChatModel(model_name="fake-large", latency_ms=500)
+    route = Route(name="slow", tools=("teach_concept",), model="fake-large", timeout=0.05, fallback_model="fake-small")
+    monkeypatch.setattr(llm_client, "_ROUTER", ModelRouter([route]))
+
+    def fake_get(provider=None, model=None, temperature=0.7):
+        return slow if model == "fake-large" else FakeChatModel(model_name=model or "fake-model")
+
+    monkeypatch.setattr(llm_client._REGISTRY, "get", fake_get)
+    default = FakeChatModel(model_name="fake-default")
+
+    response = call_with_retry(default.invoke, "x", max_attempts=1, cache=False, tool="teach_concept")
+    assert response.response_metadata["model_name"] == "fake-small"
+    assert llm_client.routing_stats()["slow"]["fallbacks"] == 1
+
+    async def run() -> Any:
+        return await async_call_with_retry(default.ainvoke, "x", max_attempts=1, cache=False, tool="teach_concept")
+
+    assert asyncio.run(run()).response_metadata["model_name"] == "fake-small"
+    assert llm_client.routing_stats()["slow"]["fallbacks"] == 2
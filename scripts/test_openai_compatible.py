@@ -0,0 +1,99 @@
+"""Tests for the OpenAI-compatible provider against a local stand-in chat-completions server."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+
+import pytest
+
+pytest.importorskip("langchain_openai", reason="langchain-openai not installed")
+
+from agent.utils import llm_client  # noqa: E402
+from agent.utils.llm_client import LLMClientRegistry, LLMConfigError, async_call_with_retry, call_with_retry  # noqa: E402
+
+
+class _ChatCompletions(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+    requests: list[dict[str, Any]] = []
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append({"path": self.path, "auth": self.headers.get("Authorization"), **body})
+        prompt = body["messages"][-1]["content"]
+        payload = json.dumps({
+            "id": "chatcmpl-local",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"echo: {prompt}"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture()
+def server(monkeypatch) -> Iterator[str]:
+    _ChatCompletions.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletions)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{httpd.server_address[1]}/v1"
+    monkeypatch.setenv("LLM_PROVIDER", "openai_compatible")
+    monkeypatch.setenv("LLM_BASE_URL", base_url)
+    monkeypatch.setenv("LLM_MODEL", "local-llama")
+    monkeypatch.setenv("PROXY_URL", "http://proxy.invalid:3128")
+    monkeypatch.setenv("LLM_OPENAI_COMPATIBLE_HTTP_MAX_CONNECTIONS", "4")
+    monkeypatch.setenv("LLM_OPENAI_COMPATIBLE_CONCURRENCY_ENABLED", "true")
+    monkeypatch.setenv("LLM_OPENAI_COMPATIBLE_CONCURRENCY_INITIAL", "2")
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_REGISTRY", LLMClientRegistry())
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    monkeypatch.setattr(llm_client, "_LIMITERS", None)
+    yield base_url
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_calls_reach_base_url_through_a_pooled_unproxied_client(server: str) -> None:
+    llm = llm_client.get_llm_client()
+    assert llm._llm_type == "openai_compatible-chat"
+
+    for i in range(3):
+        response = call_with_retry(llm.invoke, f"hello {i}", cache=False, tool="teach_concept")
+    assert response.content == "echo: hello 2"
+    assert response.usage_metadata["output_tokens"] == 3
+
+    reply = asyncio.run(async_call_with_retry(llm.ainvoke, "async hi", cache=False))
+    assert reply.content == "echo: async hi"
+
+    sent = _ChatCompletions.requests
+    assert [r["path"] for r in sent] == ["/v1/chat/completions"] * 4
+    assert {r["model"] for r in sent} == {"local-llama"}
+    assert sent[0]["auth"] == "Bearer EMPTY"
+
+    pool = llm_client.llm_pool_stats()["pools"]["openai_compatible"]
+    assert pool["max_connections"] == 4
+    assert pool["responses"] == 4
+    assert pool["connections_opened"] <= 2  # one sync + one async connection, reused
+    assert llm_client.concurrency_stats()["openai_compatible/local-llama"]["acquired"] == 4
+
+
+def test_missing_base_url_or_model_is_a_config_error(server: str, monkeypatch) -> None:
+    monkeypatch.delenv("LLM_MODEL")
+    with pytest.raises(LLMConfigError, match="LLM_MODEL"):
+        llm_client.get_llm_client()
+    monkeypatch.setenv("LLM_MODEL", "local-llama")
+    monkeypatch.delenv("LLM_BASE_URL")
+    with pytest.raises(LLMConfigError, match="LLM_BASE_URL"):
+        llm_client.get_llm_client()
@@ -0,0 +1,70 @@
+"""Tests for process-pool PDF page extraction."""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import Future
+from typing import Any
+
+import pytest
+
+from agent.utils import content_loader
+
+fitz = pytest.importorskip("fitz", reason="pymupdf not installed")
+
+
+def _pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        if n != 3:  # one blank page: skipped, but later pages keep their numbers
+            page.insert_text((72, 72), f"Topic {n + 1}: divide and conquer")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_parallel_extraction_matches_serial_page_order(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("PDF_PARALLEL_WORKERS", "3")
+    data = _pdf(8)
+    path = tmp_path / "algorithms.pdf"
+    path.write_bytes(data)
+    try:
+        serial = content_loader.load_pdf_file(str(path), parallel=False)
+        from_path = content_loader.load_pdf_file(str(path), parallel=True)
+        from_bytes = content_loader.load_pdf_file("algorithms.pdf", data, parallel=True)
+    finally:
+        content_loader.shutdown_pdf_pool()
+    assert from_path == serial
+    assert from_bytes.sections == serial.sections and from_bytes.raw_text == serial.raw_text
+    assert [s.page_number for s in serial.sections] == [1, 2, 3, 5, 6, 7, 8]
+
+
+def test_page_count_threshold_decides(monkeypatch) -> None:
+    monkeypatch.setenv("PDF_PARALLEL_WORKERS", "4")
+    monkeypatch.setenv("PDF_PARALLEL_MIN_PAGES", "500")
+    assert content_loader._parallel_page_texts(b"", 499, None) is None
+    assert content_loader._parallel_page_texts(b"", 10_000, False) is None
+    monkeypatch.setenv("PDF_PARALLEL_WORKERS", "1")
+    assert content_loader._parallel_page_texts(b"", 10_000, True) is None
+
+
+def test_workers_get_one_spooled_path_instead_of_the_bytes(monkeypatch) -> None:
+    monkeypatch.setenv("PDF_PARALLEL_WORKERS", "3")
+    submitted: list[tuple] = []
+
+    class _Pool:
+        def submit(self, fn: object, *args: Any) -> Future[list[str]]:
+            submitted.append(args)
+            future: Future[list[str]] = Future()
+            future.set_result(content_loader._pdf_page_texts(*args))
+            return future
+
+    monkeypatch.setattr(content_loader, "_pdf_pool", lambda workers: _Pool())
+    loaded = content_loader.load_pdf_file("algorithms.pdf", _pdf(8), parallel=True)
+
+    assert len(submitted) == 3
+    assert all(isinstance(path, str) for path, _, _ in submitted)
+    assert len({path for path, _, _ in submitted}) == 1
+    assert not os.path.exists(submitted[0][0])
+    assert [s.page_number for s in loaded.sections] == [1, 2, 3, 5, 6, 7, 8]
@@ -0,0 +1,71 @@
+"""Tests for the cache-friendly prompt layout and cached-token accounting (no network)."""
+
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from agent.tools import planner_tool, quizzer_tool, teacher_tool
+from agent.tools.prompt_layout import MATERIAL_CONTEXT_CHARS, material_prefix
+from agent.utils import llm_client
+from agent.utils.fake_llm import FakeChatModel
+from agent.utils.llm_client import DirectChatClient, LLMClientRegistry, call_with_retry
+from agent.utils.llm_metrics import LLM_CACHED_PROMPT_TOKENS, cached_prompt_tokens
+
+MATERIAL = "# Ownership\nEvery value has one owner.\n# Borrowing\nReferences borrow values.\n" * 40
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(llm_client, "_BREAKERS", llm_client.BreakerBoard())
+    monkeypatch.setattr(llm_client, "_LIMITERS", None)
+    monkeypatch.setattr(llm_client, "_REGISTRY", LLMClientRegistry())
+
+
+def test_every_tool_prompt_starts_with_the_same_material_block() -> None:
+    prefix = material_prefix(MATERIAL)
+    prompts = [
+        planner_tool._build_plan_prompt("Rust", "beginner", 5, MATERIAL),
+        teacher_tool._build_teach_prompt("Ownership", "advanced", "", MATERIAL, 2, "alternative_approach"),
+        quizzer_tool._build_quiz_prompt("Borrowing", "intermediate", 4, MATERIAL),
+        quizzer_tool._strict_quiz_prompt(quizzer_tool._build_quiz_prompt("Ownership", "beginner", 3, MATERIAL)),
+    ]
+    assert prefix and all(p.startswith(prefix) for p in prompts)
+    assert material_prefix(MATERIAL * 10) == material_prefix((MATERIAL * 10)[:MATERIAL_CONTEXT_CHARS])
+    assert material_prefix("  ") == ""
+    assert planner_tool._build_plan_prompt("Rust", "beginner", 5, "").startswith("Task:")
+
+
+def test_repeated_material_prefix_is_reported_as_cached_tokens(monkeypatch) -> None:
+    llm = FakeChatModel()
+    for module in (planner_tool, teacher_tool, quizzer_tool):
+        monkeypatch.setattr(module, "get_llm_client", lambda: llm)
+    labels = {"tool": "teach_concept", "model": "fake-model", "endpoint": "none"}
+    observed = LLM_CACHED_PROMPT_TOKENS.count(**labels)
+    cached_sum = LLM_CACHED_PROMPT_TOKENS.sum(**labels)
+
+    first = call_with_retry(llm.invoke, quizzer_tool._build_quiz_prompt("Borrowing", "beginner", 3, MATERIAL), cache=False)
+    assert cached_prompt_tokens(first) == 0
+
+    lesson = teacher_tool.teach_concept_payload("Ownership", "beginner", source_material=MATERIAL)
+    assert "error" not in lesson
+    assert LLM_CACHED_PROMPT_TOKENS.count(**labels) == observed + 1
+    assert LLM_CACHED_PROMPT_TOKENS.sum(**labels) - cached_sum == len(material_prefix(MATERIAL)) // 4
+
+
+def test_direct_client_reports_provider_cached_tokens() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "model": "m",
+            "choices": [{"message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 2, "prompt_tokens_details": {"cached_tokens": 768}},
+        })
+
+    transport = httpx.MockTransport(handler)
+    client = DirectChatClient(
+        "openai", "m", 0.0, "sk-test", "https://api.openai.com/v1",
+        httpx.Client(transport=transport), httpx.AsyncClient(transport=transport),
+    )
+    assert cached_prompt_tokens(client.invoke("hi")) == 768
@@ -88,6 +88,29 @@ def test_generate_quiz_recovers_from_invalid_first_response(monkeypatch) -> None
         assert question["correct_answer"] in question["options"]
 
 
+def test_generate_quiz_retries_a_truncated_response(monkeypatch) -> None:
+    question = {
+        "question_number": 1,
+        "question_type": "multiple_choice",
+        "question": "What is an agent?",
+        "options": ["A tool", "An autonomous system", "A UI", "A file"],
+        "correct_answer": "An autonomous system",
+        "explanation": "",
+    }
+    complete = json.dumps({"questions": [question, {**question, "question_number": 2}], "total_questions": 2})
+    truncated = complete[: complete.index('"question_number": 2') - 3]
+
+    fake_llm = _FakeLLM([truncated, complete])
+    monkeypatch.setattr(quizzer_tool, "get_llm_client", lambda: fake_llm)
+    monkeypatch.setattr(quizzer_tool, "call_with_retry", lambda fn, *a, **k: fn(*a))
+
+    result = quizzer_tool.generate_quiz.invoke({"concept_name": "Agent Basics", "num_questions": 2})
+
+    assert "error" not in result
+    assert len(result["questions"]) == 2
+    assert fake_llm._idx == 2
+
+
 def test_generate_quiz_returns_invalid_format_error_when_all_attempts_bad(monkeypatch) -> None:
     always_bad = json.dumps(
         {
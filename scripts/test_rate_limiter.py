@@ -0,0 +1,123 @@
+"""Unit tests for the proactive LLM rate limiter (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from agent.utils.llm_client import (
+    LLMRateLimitError,
+    RateLimiter,
+    RateLimits,
+    _parse_rate_limits,
+    _parse_reset_seconds,
+)
+
+
+def test_parse_rate_limits_per_provider_and_model() -> None:
+    limits = _parse_rate_limits("groq=30/6000, groq:llama-3.3-70b-versatile=60/, bad, openai=/90000")
+    assert limits[("groq", "")] == RateLimits(30, 6000)
+    assert limits[("groq", "llama-3.3-70b-versatile")] == RateLimits(60, None)
+    assert limits[("openai", "")] == RateLimits(None, 90000)
+    assert len(limits) == 3
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [("12", 12.0), ("7.66s", 7.66), ("2m59.5s", 179.5), ("120ms", 0.12), ("1h", 3600.0), ("", None), ("soon", None)],
+)
+def test_parse_reset_seconds(raw: str, expected: float | None) -> None:
+    result = _parse_reset_seconds(raw)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected)
+
+
+def test_unconfigured_model_is_not_paced() -> None:
+    limiter = RateLimiter()
+    for _ in range(100):
+        assert limiter.acquire("groq", "m", tokens=10_000) == 0.0
+
+
+def test_requests_bucket_queues_then_rejects_beyond_max_wait() -> None:
+    # 600 RPM = 10 requests/second refill; capacity 600 is consumed instantly.
+    limiter = RateLimiter({("groq", ""): RateLimits(requests_per_minute=600)}, max_wait=0.5)
+    for _ in range(600):
+        limiter.acquire("groq", "m")
+    start = time.monotonic()
+    waited = limiter.acquire("groq", "m")
+    assert 0.05 <= waited <= 0.3
+    assert time.monotonic() - start >= 0.05
+
+    strict = RateLimiter({("groq", ""): RateLimits(requests_per_minute=6)}, max_wait=0.1)
+    for _ in range(6):
+        strict.acquire("groq", "m")
+    with pytest.raises(LLMRateLimitError):
+        strict.acquire("groq", "m")
+    assert strict.stats()["groq/m"]["rejected"] == 1
+
+
+def test_model_override_beats_provider_default() -> None:
+    limiter = RateLimiter(
+        {("groq", ""): RateLimits(tokens_per_minute=100), ("groq", "big"): RateLimits(tokens_per_minute=10_000)},
+        max_wait=0,
+    )
+    limiter.acquire("groq", "big", tokens=5_000)
+    limiter.acquire("groq", "small", tokens=100)
+    with pytest.raises(LLMRateLimitError):
+        limiter.acquire("groq", "small", tokens=100)
+
+
+def test_headers_learn_token_limit_and_remaining() -> None:
+    limiter = RateLimiter(max_wait=0)
+    limiter.update_from_headers(
+        "groq",
+        "m",
+        {"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "100"},
+    )
+    stats = limiter.stats()["groq/m"]
+    assert stats["tokens_per_minute"] == 6000
+    assert stats["tokens_available"] == pytest.approx(100, abs=1)
+    with pytest.raises(LLMRateLimitError):
+        limiter.acquire("groq", "m", tokens=500)
+
+
+def test_429_retry_after_pauses_all_callers() -> None:
+    limiter = RateLimiter(max_wait=5)
+    limiter.update_from_headers("groq", "m", {"retry-after": "0.2"}, status_code=429)
+    waited = limiter.acquire("groq", "m")
+    assert waited >= 0.15
+
+
+def test_exhausted_remaining_requests_pause_until_reset() -> None:
+    limiter = RateLimiter(max_wait=0.05)
+    limiter.update_from_headers(
+        "groq", "m", {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "30s"}
+    )
+    assert limiter.stats()["groq/m"]["paused_for"] > 25
+    with pytest.raises(LLMRateLimitError):
+        limiter.acquire("groq", "m")
+
+
+def test_async_acquire_queues_without_blocking_loop() -> None:
+    limiter = RateLimiter(max_wait=5)
+    limiter.update_from_headers("groq", "m", {"retry-after": "0.1"}, status_code=429)
+
+    async def scenario() -> tuple[float, int]:
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            for _ in range(5):
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        waited, _ = await asyncio.gather(limiter.aacquire("groq", "m"), ticker())
+        return waited, ticks
+
+    waited, ticks = asyncio.run(scenario())
+    assert waited >= 0.05
+    assert ticks == 5
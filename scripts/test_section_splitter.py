@@ -0,0 +1,89 @@
+"""Tests that the streaming section splitters match the previous list-based ones."""
+
+from __future__ import annotations
+
+import random
+import re
+
+from agent.utils.content_loader import (
+    ContentSection,
+    _parse_markdown_sections,
+    _split_into_sections,
+    iter_markdown_sections,
+    iter_text_sections,
+)
+
+
+def _legacy_split(text: str, source_file: str = "", min_section_length: int = 50) -> list[ContentSection]:
+    paragraphs = re.split(r"\n\s*\n", text.strip())
+    sections: list[ContentSection] = []
+    for idx, para in enumerate(paragraphs):
+        para = para.strip()
+        if not para:
+            continue
+        lines = para.split("\n", 1)
+        if len(lines) == 2 and len(lines[0]) < 80:
+            title, body = lines[0].strip(), lines[1].strip()
+        else:
+            title, body = "", para
+        if len(body) < min_section_length and idx > 0 and sections:
+            sections[-1].body += "\n\n" + body
+            continue
+        sections.append(ContentSection(title=title, body=body, source_file=source_file, section_index=len(sections)))
+    return sections
+
+
+def _legacy_markdown(text: str, source_file: str = "") -> list[ContentSection]:
+    matches = list(re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE).finditer(text))
+    if not matches:
+        return _legacy_split(text, source_file)
+    sections: list[ContentSection] = []
+    pre_heading = text[: matches[0].start()].strip()
+    if pre_heading:
+        sections.append(ContentSection(title="Introduction", body=pre_heading, source_file=source_file))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        sections.append(
+            ContentSection(
+                title=match.group(2).strip(),
+                body=text[match.end():end].strip(),
+                source_file=source_file,
+                section_index=len(sections),
+            )
+        )
+    return sections
+
+
+def _random_document(rng: random.Random, markdown: bool) -> str:
+    pieces = ["", " ", "\n", "\n\n", " \n \n", "\t\n\n\n"]
+    words = ["graph", "node", "edge", "cycle", "tree", "x" * 90]
+    out: list[str] = []
+    for _ in range(rng.randint(0, 40)):
+        if markdown and rng.random() < 0.2:
+            out.append(rng.choice(["#", "##", "###", "####"]) + rng.choice([" ", "\n", "  "]) + rng.choice(words))
+        else:
+            out.append(" ".join(rng.choice(words) for _ in range(rng.randint(0, 20))))
+        out.append(rng.choice(pieces))
+    return "".join(out)
+
+
+def test_streaming_splitters_match_the_legacy_output() -> None:
+    rng = random.Random(7)
+    for _ in range(400):
+        text = _random_document(rng, markdown=False)
+        assert _split_into_sections(text, "a.txt") == _legacy_split(text, "a.txt"), repr(text)
+        assert _split_into_sections(text, min_section_length=5) == _legacy_split(text, min_section_length=5)
+        md = _random_document(rng, markdown=True)
+        assert _parse_markdown_sections(md, "a.md") == _legacy_markdown(md, "a.md"), repr(md)
+
+
+def test_sections_are_yielded_incrementally() -> None:
+    tiny = "\n\n".join(["Intro paragraph long enough to stand as its own section here."] + ["ok"] * 5000)
+    sections = iter_text_sections(tiny + "\n\nNext heading\n" + "b" * 60)
+    first = next(sections)
+    assert first.body.count("\n\nok") == 5000 and first.section_index == 0
+    assert next(sections).title == "Next heading"
+
+    headings = iter_markdown_sections("preface\n# One\nfirst\n## Two\nsecond")
+    assert next(headings).title == "Introduction"
+    assert [s.title for s in headings] == ["One", "Two"]
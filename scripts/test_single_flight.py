@@ -0,0 +1,185 @@
+"""Unit tests for single-flight coalescing of identical LLM calls (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agent.utils.deadline import deadline_context
+from agent.utils.llm_client import async_call_with_retry, call_with_retry
+from agent.utils.single_flight import SingleFlight
+
+
+def test_threads_share_one_execution() -> None:
+    group = SingleFlight()
+    calls = {"n": 0}
+    start = threading.Barrier(5)
+
+    def work() -> str:
+        calls["n"] += 1
+        time.sleep(0.1)
+        return "result"
+
+    results: list[str] = []
+
+    def caller() -> None:
+        start.wait()
+        results.append(group.do("k", work))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls["n"] == 1
+    assert results == ["result"] * 5
+    stats = group.stats()
+    assert stats["leaders"] == 1
+    assert stats["collapsed"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_errors_propagate_to_every_waiter() -> None:
+    group = SingleFlight()
+
+    async def boom() -> str:
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream failed")
+
+    async def scenario() -> list[BaseException | str]:
+        return await asyncio.gather(*(group.ado("k", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert group.stats()["leaders"] == 1
+
+
+def test_cancelled_follower_does_not_cancel_shared_call() -> None:
+    group = SingleFlight()
+    calls = {"n": 0}
+
+    async def work() -> str:
+        calls["n"] += 1
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario() -> str:
+        first = asyncio.ensure_future(group.ado("k", work))
+        second = asyncio.ensure_future(group.ado("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+    assert calls["n"] == 1
+
+
+def test_upstream_cancelled_when_every_waiter_leaves() -> None:
+    group = SingleFlight()
+    finished = {"value": False}
+
+    async def work() -> str:
+        await asyncio.sleep(0.2)
+        finished["value"] = True
+        return "late"
+
+    async def scenario() -> None:
+        waiters = [asyncio.ensure_future(group.ado("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for w in waiters:
+            w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0.25)
+
+    asyncio.run(scenario())
+    assert finished["value"] is False
+    assert group.stats()["abandoned"] == 1
+
+
+class _SlowLLM:
+    model_name = "llama-3.1-8b-instant"
+    temperature = 0.7
+    _llm_type = "groq-chat"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def invoke(self, prompt: str):
+        self.calls += 1
+        time.sleep(0.1)
+        return SimpleNamespace(content=f"lesson for {prompt}")
+
+    async def ainvoke(self, prompt: str):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        return SimpleNamespace(content=f"lesson for {prompt}")
+
+
+@pytest.fixture(autouse=True)
+def _no_response_cache(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+
+
+def test_call_with_retry_coalesces_concurrent_identical_prompts() -> None:
+    llm = _SlowLLM()
+    results: list[str] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(call_with_retry(llm.invoke, "Teach loops").content))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert llm.calls == 1
+    assert results == ["lesson for Teach loops"] * 4
+
+
+def test_async_call_with_retry_coalesces_but_keeps_distinct_prompts_apart() -> None:
+    llm = _SlowLLM()
+
+    async def scenario() -> list[str]:
+        responses = await asyncio.gather(
+            async_call_with_retry(llm.ainvoke, "Teach loops"),
+            async_call_with_retry(llm.ainvoke, "Teach loops"),
+            async_call_with_retry(llm.ainvoke, "Teach functions"),
+        )
+        return [r.content for r in responses]
+
+    contents = asyncio.run(scenario())
+    assert llm.calls == 2
+    assert contents[0] == contents[1]
+    assert contents[2] == "lesson for Teach functions"
+
+
+def test_coalescing_can_be_disabled(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_COALESCE_ENABLED", "false")
+    llm = _SlowLLM()
+
+    async def scenario() -> None:
+        await asyncio.gather(*(async_call_with_retry(llm.ainvoke, "Teach loops") for _ in range(3)))
+
+    asyncio.run(scenario())
+    assert llm.calls == 3
+
+
+def test_callers_with_different_deadlines_or_no_cache_are_not_coalesced() -> None:
+    llm = _SlowLLM()
+
+    async def under(seconds: float) -> str:
+        with deadline_context(seconds):
+            return (await async_call_with_retry(llm.ainvoke, "Teach loops")).content
+
+    async def fresh() -> str:
+        return (await async_call_with_retry(llm.ainvoke, "Teach loops", cache=False)).content
+
+    async def scenario() -> list[str]:
+        return await asyncio.gather(under(5), under(30), fresh(), fresh())
+
+    assert asyncio.run(scenario()) == ["lesson for Teach loops"] * 4
+    assert llm.calls == 4
@@ -0,0 +1,86 @@
+"""Tests for in-memory content loading and streamed, size-capped uploads (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+
+import pytest
+
+from agent.utils.content_loader import load_content, load_content_bytes
+
+SAMPLE_MD = "# Graphs\r\nNodes and edges.\r\n\r\n## Traversal\r\nBreadth-first and depth-first search.\r\n"
+
+
+def test_bytes_and_streams_parse_like_files(tmp_path) -> None:
+    path = tmp_path / "graphs.md"
+    path.write_bytes(SAMPLE_MD.encode("utf-8"))
+    from_disk = load_content(str(path))
+    from_bytes = load_content_bytes(SAMPLE_MD.encode("utf-8"), "graphs.md")
+    from_stream = load_content_bytes(io.BytesIO(SAMPLE_MD.encode("utf-8")), "graphs.md")
+    assert from_bytes == from_disk == from_stream
+    assert from_bytes.metadata["size_bytes"] == len(SAMPLE_MD.encode("utf-8"))
+
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        load_content_bytes(b"x", "notes.docx")
+
+
+def test_pdf_opens_from_memory() -> None:
+    fitz = pytest.importorskip("fitz", reason="pymupdf not installed")
+    doc = fitz.open()
+    for text in ("Recursion basics", "Base cases and recursive cases"):
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+
+    loaded = load_content_bytes(data, "recursion.pdf")
+    assert [s.title for s in loaded.sections] == ["Page 1", "Page 2"]
+    assert "Base cases" in loaded.raw_text and loaded.title == "recursion"
+    assert loaded.metadata["page_count"] == 2 and loaded.metadata["size_bytes"] == len(data)
+
+
+def test_uploads_are_hashed_and_capped(monkeypatch) -> None:
+    pytest.importorskip("fastapi", reason="fastapi not installed (web extras required)")
+    from fastapi.testclient import TestClient
+
+    from webapi import main as webmain
+
+    client = TestClient(webmain.app)
+    body = SAMPLE_MD.encode("utf-8")
+    response = client.post("/session/from-upload", files={"files": ("graphs.md", body, "text/markdown")})
+    assert response.status_code == 200
+    assert response.json()["materials"][0]["metadata"]["sha256"] == hashlib.sha256(body).hexdigest()
+    assert response.json()["topic"] == "Graphs"
+
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "32")
+    response = client.post("/upload", files={"file": ("graphs.md", body, "text/markdown")})
+    assert response.status_code == 413 and response.json()["max_bytes"] == 32
+
+    monkeypatch.setenv("UPLOAD_MAX_REQUEST_BYTES", "64")
+    response = client.post("/upload", files={"file": ("graphs.md", body, "text/markdown")})
+    assert response.status_code == 413 and response.json()["error"] == "Upload is too large"
+
+
+def test_upload_is_read_in_one_sized_read(monkeypatch) -> None:
+    pytest.importorskip("fastapi", reason="fastapi not installed (web extras required)")
+    from fastapi import UploadFile
+
+    from webapi import main as webmain
+
+    body = SAMPLE_MD.encode("utf-8")
+    reads: list[int] = []
+
+    class _Spooled(io.BytesIO):
+        def read(self, size: int | None = -1) -> bytes:
+            reads.append(-1 if size is None else size)
+            return super().read(size)
+
+    upload = asyncio.run(webmain._read_upload(UploadFile(_Spooled(body), size=len(body), filename="graphs.md")))
+    assert upload.data == body and upload.sha256 == hashlib.sha256(body).hexdigest()
+    assert reads == [len(body)]
+
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "32")
+    with pytest.raises(webmain.UploadTooLargeError):
+        asyncio.run(webmain._read_upload(UploadFile(_Spooled(body), filename="graphs.md")))
+    assert reads[-1] == 33
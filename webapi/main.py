@@ -1,29 +1,166 @@
+import asyncio
+import contextlib
+import hashlib
 import logging
 import os
 import re
-import tempfile
 import traceback
 import uuid
-from typing import Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Coroutine, NamedTuple
 
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from fastapi.routing import APIRoute
 from pydantic import BaseModel, Field
 
-from agent.utils.content_loader import SUPPORTED_EXTENSIONS, load_content
+from agent.utils.content_loader import SUPPORTED_EXTENSIONS, LoadedContent, shutdown_pdf_pool
 from agent.core.decision_rules import DecisionRules
 from agent.core.state import DifficultyLevel, StudySessionState
 from agent.tools.adapter_tool import adapt_difficulty
 from agent.tools.evaluator_tool import evaluate_response
-from agent.tools.planner_tool import plan_learning_path
-from agent.tools.quizzer_tool import generate_quiz
-from agent.tools.teacher_tool import teach_concept_payload
+from agent.tools.planner_tool import aplan_learning_path
+from agent.tools.prompt_layout import MATERIAL_CONTEXT_CHARS
+from agent.tools.quizzer_tool import agenerate_quiz
+from agent.tools.teacher_tool import ateach_concept_payload
+from agent.utils.content_cache import CachedContent, get_content_cache
+from agent.utils.deadline import deadline_context, parse_deadline_header
+from agent.utils.fair_scheduler import scheduling_context
+from agent.utils.ingestion import get_ingestion_executor, shutdown_ingestion_executor
+from agent.utils.llm_cache import close_response_cache, get_response_cache
+from agent.utils.llm_client import (
+    ashutdown_llm_clients,
+    batching_stats,
+    circuit_breaker_stats,
+    coalescing_stats,
+    concurrency_stats,
+    generation_budget_stats,
+    get_concurrency_limiters,
+    get_rate_limiter,
+    hedging_stats,
+    llm_pool_stats,
+    routing_stats,
+)
+from agent.utils.llm_metrics import PROMETHEUS_CONTENT_TYPE, endpoint_context, get_metrics, render_metrics
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger("webapi")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    yield
+    # Release pooled LLM connections (sync + async httpx clients) on shutdown.
+    await ashutdown_llm_clients()
+    close_response_cache()
+    shutdown_ingestion_executor()
+    shutdown_pdf_pool()
+
+
+# Default request deadlines (seconds) for the LLM-backed routes; a client may send a
+# shorter or longer budget in X-Request-Deadline, capped at _MAX_DEADLINE_SECONDS.
+_DEADLINE_DEFAULTS = {
+    "/session/{session_id}/plan": 60.0,
+    "/session/{session_id}/teach": 60.0,
+    "/session/{session_id}/quiz": 90.0,
+}
+_MAX_DEADLINE_SECONDS = 300.0
+_DISCONNECT_POLL_SECONDS = 0.25
+_CANCELLED_REQUESTS = get_metrics().counter(
+    "http_requests_cancelled_total", "LLM-backed requests cancelled because the client disconnected.", ("endpoint",)
+)
+
+
+async def _run_until_disconnect(
+    request: Request, handler: Callable[[Request], Coroutine[Any, Any, Response]], label: str
+) -> Response:
+    """Run *handler*, cancelling it — and the upstream LLM calls it awaits — if the client goes away."""
+    await request.body()  # buffer the body so the disconnect probe below cannot consume it
+    task = asyncio.ensure_future(handler(request))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=_DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+                _CANCELLED_REQUESTS.inc(endpoint=label)
+                logger.info("Client disconnected during %s; cancelled its LLM calls", label)
+                return Response(status_code=499)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+def _env_bytes(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+# Upload limits, read on every request: a file larger than UPLOAD_MAX_BYTES is rejected without
+# being read into memory; a whole multipart body declared larger than UPLOAD_MAX_REQUEST_BYTES
+# is refused before it is parsed.
+def _upload_max_bytes() -> int:
+    return _env_bytes("UPLOAD_MAX_BYTES", 50 * 1024 * 1024)
+
+
+def _upload_max_request_bytes() -> int:
+    return _env_bytes("UPLOAD_MAX_REQUEST_BYTES", 200 * 1024 * 1024)
+
+
+_UPLOAD_ROUTES = {"/upload", "/session/from-upload", "/session/{session_id}/upload"}
+
+
+def _declared_length(request: Request) -> int:
+    try:
+        return int(request.headers.get("content-length") or 0)
+    except ValueError:
+        return 0
+
+
+class MeteredRoute(APIRoute):
+    """Label LLM calls made while handling a request with the route template (``POST /session/{session_id}/teach``).
+
+    Calls are also attributed to the path's session for fair scheduling, and to the
+    ``X-Tenant-ID`` / ``X-Priority`` headers only when ``LLM_SCHED_TRUST_HEADERS`` is set. Upload routes refuse bodies declared larger than
+    ``UPLOAD_MAX_REQUEST_BYTES`` before the multipart form is parsed. LLM-backed routes run under a request deadline
+    (``X-Request-Deadline`` or the route's default) and are cancelled when the client disconnects.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        label = f"{'|'.join(sorted(self.methods or ()))} {self.path}"
+        default_deadline = _DEADLINE_DEFAULTS.get(self.path)
+        upload_route = self.path in _UPLOAD_ROUTES
+
+        async def metered_handler(request: Request) -> Response:
+            if upload_route and _declared_length(request) > (max_request_bytes := _upload_max_request_bytes()):
+                return JSONResponse(
+                    status_code=413,
+                    content={"error": "Upload is too large", "max_bytes": max_request_bytes},
+                )
+            scheduling = scheduling_context(
+                session=request.path_params.get("session_id"),
+                **get_concurrency_limiters().scheduler.header_overrides(request.headers),
+            )
+            if default_deadline is None:
+                with endpoint_context(label), scheduling:
+                    return await handler(request)
+            header = parse_deadline_header(request.headers.get("x-request-deadline"), _MAX_DEADLINE_SECONDS)
+            with endpoint_context(label), scheduling, deadline_context(default_deadline if header is None else header):
+                return await _run_until_disconnect(request, handler, label)
+
+        return metered_handler
+
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = MeteredRoute
 
 
 class CreateSessionRequest(BaseModel):
@@ -58,6 +195,85 @@ class PlanRequest(BaseModel):
 SESSIONS: dict[str, StudySessionState] = {}
 # Single-file PDF uploads only: original bytes for in-browser PDF preview (session bar → View source).
 SESSION_ORIGINAL_BLOBS: dict[str, tuple[bytes, str, str]] = {}
+# Recently uploaded PDFs by SHA-256, so sessions uploading the same file reference one bytes object.
+# Bounded like the parsed-content cache (CONTENT_CACHE_MAX_ENTRIES / CONTENT_CACHE_MAX_BYTES).
+_PDF_BYTES_BY_SHA256: OrderedDict[str, bytes] = OrderedDict()
+
+
+class UploadTooLargeError(ValueError):
+    """An uploaded file passed ``UPLOAD_MAX_BYTES`` while it was being read."""
+
+
+class _Upload(NamedTuple):
+    data: bytes
+    sha256: str
+
+
+async def _read_upload(file: UploadFile) -> _Upload:
+    """Read *file* into one bytes object and hash it; at most one copy of the upload is held.
+
+    The multipart parser has already spooled the part (to disk past 1 MiB), so its size is
+    known and checked before anything is read. The read then allocates exactly that size,
+    rather than collecting chunks and joining them into a second copy. A part without a size
+    is read at most one byte past the limit.
+    """
+    max_bytes = _upload_max_bytes()
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(f"{file.filename or 'Upload'} is larger than {max_bytes} bytes")
+    data = await file.read(file.size if file.size is not None else max_bytes + 1)
+    if len(data) > max_bytes:
+        raise UploadTooLargeError(f"{file.filename or 'Upload'} is larger than {max_bytes} bytes")
+    return _Upload(data, hashlib.sha256(data).hexdigest())
+
+
+async def _parse_upload(upload: _Upload, filename: str) -> CachedContent:
+    """Parsed content for *upload*, shared with every earlier upload of the same file.
+
+    Cache misses are parsed off the event loop with the hash recorded in the
+    metadata; the result is read-only, so sessions can hold it by reference.
+    """
+
+    async def parse() -> LoadedContent:
+        loaded = await get_ingestion_executor().aload(upload.data, filename)
+        loaded.metadata["sha256"] = upload.sha256
+        return loaded
+
+    return await get_content_cache().aget_or_load(upload.sha256, filename, parse)
+
+
+async def _load_upload(file: UploadFile, filename: str) -> tuple[CachedContent, _Upload]:
+    """Stream *file* into memory and return its (possibly cached) parsed content."""
+    upload = await _read_upload(file)
+    return await _parse_upload(upload, filename), upload
+
+
+def _shared_pdf_bytes(upload: _Upload) -> bytes:
+    """The bytes object already held for this PDF, if any; LRU past the content cache's bounds."""
+    cache = get_content_cache()
+    if not cache.enabled:
+        return upload.data
+    data = _PDF_BYTES_BY_SHA256.setdefault(upload.sha256, upload.data)
+    _PDF_BYTES_BY_SHA256.move_to_end(upload.sha256)
+    total = sum(len(blob) for blob in _PDF_BYTES_BY_SHA256.values())
+    while len(_PDF_BYTES_BY_SHA256) > 1 and (len(_PDF_BYTES_BY_SHA256) > cache.max_entries or total > cache.max_bytes):
+        total -= len(_PDF_BYTES_BY_SHA256.popitem(last=False)[1])
+    return data
+
+
+def _retain_original_pdf(session_id: str, upload: _Upload, filename: str) -> None:
+    """Keep *upload* for the session's PDF preview, sharing the bytes of identical uploads."""
+    data = _shared_pdf_bytes(upload)
+    SESSION_ORIGINAL_BLOBS[session_id] = (data, "application/pdf", os.path.basename(filename) or "document.pdf")
+
+
+def _upload_too_large(exc: UploadTooLargeError) -> JSONResponse:
+    return JSONResponse(status_code=413, content={"error": str(exc), "max_bytes": _upload_max_bytes()})
+
+
+def _loader_title(loaded: LoadedContent, filename: str) -> str:
+    """The loader's title unless it merely echoes the file name (topic suggestion has its own fallback)."""
+    title = loaded.title.strip()
+    return "" if title == os.path.splitext(os.path.basename(filename))[0].strip() else title
 
 
 _ACTION_LABELS: dict[str, str] = {
@@ -93,11 +309,17 @@ _RATE_LIMIT_HINTS = ("rate limit", "ratelimit", "429", "too many requests")
 _TIMEOUT_HINTS = ("timeout", "timed out", "connection")
 _AUTH_HINTS = ("api key", "authentication", "unauthorized", "401", "403")
 _QUIZ_FORMAT_HINTS = ("invalid_quiz_format", "valid multiple-choice questions")
+_UNAVAILABLE_HINTS = ("circuit breaker is open",)
+_DEADLINE_HINTS = ("deadline exceeded",)
 
 
 def _classify_error(exc: Exception) -> tuple[str, str]:
     """Return (error_code, user_message) for a caught exception."""
     msg = str(exc).lower()
+    if any(s in msg for s in _UNAVAILABLE_HINTS):
+        return "provider_unavailable", "The LLM provider is temporarily unavailable. Please try again shortly."
+    if any(s in msg for s in _DEADLINE_HINTS):
+        return "deadline_exceeded", "The request ran out of time before the LLM could answer. Please try again."
     if any(s in msg for s in _RATE_LIMIT_HINTS):
         return "rate_limit", "The LLM is rate-limited. Please wait a moment and try again."
     if any(s in msg for s in _TIMEOUT_HINTS):
@@ -338,11 +560,9 @@ async def upload_file(file: UploadFile = File(...)):
                 "supported": sorted(SUPPORTED_EXTENSIONS),
             },
         )
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
     try:
-        content = load_content(tmp_path)
+        entry, _ = await _load_upload(file, filename)
+        content = entry.content
         return {
             "section_titles": content.get_section_titles(),
             "preview": content.get_summary_context(1200),
@@ -350,16 +570,46 @@ async def upload_file(file: UploadFile = File(...)):
             "title": content.title,
             "raw_text": content.raw_text,
         }
+    except UploadTooLargeError as e:
+        return _upload_too_large(e)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
-    finally:
-        os.unlink(tmp_path)
 
 @app.get("/ping")
 def ping():
     return {"status": "ok"}
 
 
+@app.get("/llm/stats")
+def llm_stats() -> dict[str, Any]:
+    """Shared LLM client state: registry, pools, cache, limits, coalescing, breakers, hedging, batching, routes and budgets."""
+    response_cache = get_response_cache()
+    return {
+        "registry": llm_pool_stats(),
+        "cache": response_cache.stats() if response_cache is not None else {"enabled": False},
+        "rate_limits": get_rate_limiter().stats(),
+        "coalescing": coalescing_stats(),
+        "concurrency": concurrency_stats(),
+        "circuit_breakers": circuit_breaker_stats(),
+        "hedging": hedging_stats(),
+        "batching": batching_stats(),
+        "routes": routing_stats(),
+        "budgets": generation_budget_stats(),
+    }
+
+
+@app.get("/ingest/stats")
+def ingest_stats() -> dict[str, Any]:
+    """Upload parsing executor (mode, workers, fan-out, queue depth, counts) and the parsed-content cache."""
+    return {**get_ingestion_executor().stats(), "content_cache": get_content_cache().stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Prometheus exposition of per-call LLM accounting (calls, tokens, queue time, latency, retries)."""
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.post("/session/from-upload")
 async def create_session_from_upload(
     files: list[UploadFile] = File(...),
@@ -369,7 +619,6 @@ async def create_session_from_upload(
     if not files:
         return JSONResponse(status_code=400, content={"error": "No files provided"})
 
-    temp_paths: list[str] = []
     loaded_list: list[dict[str, Any]] = []
     all_section_titles: list[str] = []
     all_titles: list[str] = []
@@ -377,7 +626,7 @@ async def create_session_from_upload(
     raw_text_parts: list[str] = []
 
     try:
-        last_file_bytes: bytes = b""
+        uploads: list[_Upload] = []
         for file in files:
             filename = file.filename or "uploaded_file"
             filenames.append(filename)
@@ -390,14 +639,15 @@ async def create_session_from_upload(
                         "supported": sorted(SUPPORTED_EXTENSIONS),
                     },
                 )
+            uploads.append(await _read_upload(file))
 
-            last_file_bytes = await file.read()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-                tmp.write(last_file_bytes)
-                tmp_path = tmp.name
-            temp_paths.append(tmp_path)
-
-            loaded = load_content(tmp_path)
+        # Parse all files concurrently off the event loop (INGEST_FANOUT at a time), keeping upload
+        # order; files seen before come straight from the parsed-content cache.
+        entries = await get_ingestion_executor().aload_many(
+            list(zip(uploads, filenames)), load=lambda item: _parse_upload(*item)
+        )
+        last_upload = uploads[-1] if uploads else None
+        for filename, loaded in zip(filenames, (entry.content for entry in entries)):
             loaded_list.append(
                 {
                     "filename": filename,
@@ -406,11 +656,12 @@ async def create_session_from_upload(
                 }
             )
             all_section_titles.extend(loaded.get_section_titles())
-            all_titles.append(loaded.title)
+            all_titles.append(_loader_title(loaded, filename))
             if loaded.raw_text.strip():
                 raw_text_parts.append(loaded.raw_text.strip())
 
-        merged_raw_text = "\n\n".join(raw_text_parts)
+        # One file: keep the cached parse's text object, so sessions of the same upload share it.
+        merged_raw_text = raw_text_parts[0] if len(raw_text_parts) == 1 else "\n\n".join(raw_text_parts)
         merged_loaded_content = {
             "title": _suggest_topic(all_titles, filenames, raw_text_parts),
             "source_file": "multiple" if len(filenames) > 1 else (filenames[0] if filenames else ""),
@@ -435,12 +686,8 @@ async def create_session_from_upload(
         if len(filenames) == 1:
             sole = filenames[0]
             sole_ext = os.path.splitext(sole)[1].lower()
-            if sole_ext == ".pdf" and last_file_bytes:
-                SESSION_ORIGINAL_BLOBS[session_id] = (
-                    last_file_bytes,
-                    "application/pdf",
-                    os.path.basename(sole) or "document.pdf",
-                )
+            if sole_ext == ".pdf" and last_upload is not None and last_upload.data:
+                _retain_original_pdf(session_id, last_upload, sole)
             else:
                 SESSION_ORIGINAL_BLOBS.pop(session_id, None)
         else:
@@ -457,15 +704,11 @@ async def create_session_from_upload(
             "section_titles": section_titles,
             "preview": _truncate(merged_raw_text, 1200),
         }
+    except UploadTooLargeError as e:
+        return _upload_too_large(e)
     except Exception as e:
         logger.error(f"Error in /session/from-upload: {e}", exc_info=True)
         return JSONResponse(status_code=500, content={"error": str(e), "type": type(e).__name__})
-    finally:
-        for p in temp_paths:
-            try:
-                os.unlink(p)
-            except OSError:
-                pass
 
 
 @app.post("/session")
@@ -519,6 +762,8 @@ def get_session_source(session_id: str) -> dict[str, Any]:
     for item in sources:
         if isinstance(item, dict) and item.get("filename"):
             filenames.append(str(item["filename"]))
+    if not filenames and lc.get("source_file"):
+        filenames.append(str(lc["source_file"]))
     pdf_available = session_id in SESSION_ORIGINAL_BLOBS
     out: dict[str, Any] = {
         "text": raw,
@@ -570,23 +815,16 @@ async def upload_to_session(session_id: str, file: UploadFile = File(...)) -> di
             },
         )
 
-    file_bytes = await file.read()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        tmp.write(file_bytes)
-        tmp_path = tmp.name
-
     try:
-        loaded = load_content(tmp_path)
-        state.set_loaded_content(loaded.model_dump())
-        if (loaded_title := loaded.title.strip()):
+        entry, upload = await _load_upload(file, filename)
+        loaded = entry.content
+        # Shared with every session that uploaded the same file; sessions never mutate it.
+        state.set_loaded_content(entry.shared)
+        if (loaded_title := _loader_title(loaded, filename)):
             state.topic = loaded_title
 
-        if ext == ".pdf" and file_bytes:
-            SESSION_ORIGINAL_BLOBS[session_id] = (
-                file_bytes,
-                "application/pdf",
-                os.path.basename(filename) or "document.pdf",
-            )
+        if ext == ".pdf" and upload.data:
+            _retain_original_pdf(session_id, upload, filename)
         else:
             SESSION_ORIGINAL_BLOBS.pop(session_id, None)
 
@@ -599,14 +837,14 @@ async def upload_to_session(session_id: str, file: UploadFile = File(...)) -> di
             "metadata": loaded.metadata,
             "title": loaded.title,
         }
+    except UploadTooLargeError as e:
+        return _upload_too_large(e)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
-    finally:
-        os.unlink(tmp_path)
 
 
 @app.post("/session/{session_id}/plan")
-def session_plan(session_id: str, req: PlanRequest) -> dict[str, Any]:
+async def session_plan(session_id: str, req: PlanRequest) -> dict[str, Any]:
     state = SESSIONS.get(session_id)
     if state is None:
         return JSONResponse(status_code=410, content={"error": "Session expired. Please re-upload your material.", "error_code": "session_expired"})
@@ -626,13 +864,11 @@ def session_plan(session_id: str, req: PlanRequest) -> dict[str, Any]:
     state.overall_difficulty = _normalize_difficulty(difficulty)
 
     try:
-        concepts = plan_learning_path.invoke(
-            {
-                "topic": topic,
-                "difficulty_level": difficulty,
-                "max_concepts": max_concepts,
-                "source_material": state.get_content_context(max_chars=3000),
-            }
+        concepts = await aplan_learning_path(
+            topic=topic,
+            difficulty_level=difficulty,
+            max_concepts=max_concepts,
+            source_material=state.get_content_context(max_chars=MATERIAL_CONTEXT_CHARS),
         )
         # Cache the planned concept names for UI convenience
         state.concepts_planned = [str(c.get("concept_name", "")).strip() for c in concepts if c.get("concept_name")]
@@ -658,7 +894,7 @@ def session_plan(session_id: str, req: PlanRequest) -> dict[str, Any]:
 
 
 @app.post("/session/{session_id}/teach")
-def session_teach(session_id: str, req: TeachRequest) -> dict[str, Any]:
+async def session_teach(session_id: str, req: TeachRequest) -> dict[str, Any]:
     state = SESSIONS.get(session_id)
     if state is None:
         return JSONResponse(status_code=410, content={"error": "Session expired. Please re-upload your material.", "error_code": "session_expired"})
@@ -673,11 +909,11 @@ def session_teach(session_id: str, req: TeachRequest) -> dict[str, Any]:
     state.overall_difficulty = _normalize_difficulty(difficulty)
 
     try:
-        payload = teach_concept_payload(
+        payload = await ateach_concept_payload(
             concept_name=concept,
             difficulty_level=difficulty,
             context=req.context or "",
-            source_material=state.get_content_context(max_chars=3000),
+            source_material=state.get_content_context(max_chars=MATERIAL_CONTEXT_CHARS),
         )
         state.add_concept(concept)
         state.mark_concept_taught(concept)
@@ -710,7 +946,7 @@ def session_teach(session_id: str, req: TeachRequest) -> dict[str, Any]:
 
 
 @app.post("/session/{session_id}/quiz")
-def session_quiz(session_id: str, req: QuizRequest) -> dict[str, Any]:
+async def session_quiz(session_id: str, req: QuizRequest) -> dict[str, Any]:
     state = SESSIONS.get(session_id)
     if state is None:
         return JSONResponse(status_code=410, content={"error": "Session expired. Please re-upload your material.", "error_code": "session_expired"})
@@ -720,14 +956,12 @@ def session_quiz(session_id: str, req: QuizRequest) -> dict[str, Any]:
         return JSONResponse(status_code=400, content={"error": "concept_name is required"})
 
     try:
-        quiz = generate_quiz.invoke(
-            {
-                "concept_name": concept,
-                "difficulty_level": req.difficulty_level,
-                "num_questions": req.num_questions,
-                "question_types": req.question_types,
-                "source_material": state.get_content_context(max_chars=4000) if state.has_loaded_content() else "",
-            }
+        quiz = await agenerate_quiz(
+            concept_name=concept,
+            difficulty_level=req.difficulty_level,
+            num_questions=req.num_questions,
+            question_types=req.question_types,
+            source_material=state.get_content_context(max_chars=MATERIAL_CONTEXT_CHARS) if state.has_loaded_content() else "",
         )
         # Tool may return a dict with an error key if all retries failed
         if isinstance(quiz, dict) and "error" in quiz: